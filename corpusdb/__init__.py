@@ -0,0 +1,30 @@
+"""
+Offline corpus tooling for the session JSON files that the frontend saves
+into data/ and uploads/: a streaming row reader (RowReader), columnar
+storage (CorpusStore, command line in corpusdb.convert) with the spectrum
+bins packed into one float32 matrix (vectorized helpers in
+corpusdb.spectra), a harmonic query index (HarmonicIndex,
+corpusdb.index), streaming XLSX export (corpusdb.xlsx), an incremental
+normalisation pass into typed JSON Lines (corpusdb.normalize) and
+per-session statistics cached by content hash (corpusdb.analytics).
+"""
+import importlib
+
+from .blobs import BlobStore
+from .reader import RowReader, read_rows
+
+__all__ = ["BlobStore", "CorpusStore", "HarmonicIndex", "RowReader", "Session", "read_rows"]
+
+# numpy-backed classes, imported on first use: the reader and the blob store
+# work without numpy, and `python -m corpusdb.index` does not find its own
+# module already imported by the package.
+_LAZY = {"CorpusStore": "store", "Session": "store", "HarmonicIndex": "index"}
+
+
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,382 @@
+"""
+Session statistics over the whole corpus, cached by file content.
+
+    python -m corpusdb.analytics data uploads
+    python -m corpusdb.analytics data uploads -o report.json -j 4
+
+Each session file is read once with the streaming reader into typed
+arrays (session_arrays): Bar, Tempo and jsSenMem per row, PitchClassSet
+as a 12-bit mask, ChordCode as a code into the session's chord strings,
+MidNum and FER flattened.  session_stats() reduces them without a Python
+loop over rows:
+
+    pc_hist        rows whose PitchClassSet holds each pitch class
+    note_hist      MidNum notes per pitch class
+    transitions    chord -> next different chord counts (rows of `chords`)
+    bars, tempo,   per-bar means of Tempo and jsSenMem; drift() gives the
+    sen_mem        change per bar
+    fer            FER value counts (index = value)
+
+The aggregates of a session are stored as <cache>/<sha256>.npz under the
+sha256 of the file, so a re-run only reads sessions whose content is new;
+<cache>/files.json remembers size and mtime per path so unchanged files
+are not even hashed again.  combine() sums the sessions into one report,
+mapping every session's chords onto one vocabulary.
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .index import _CHORD, pc_mask, session_files
+from .normalize import file_sha256
+from .reader import RowReader
+from .spectra import per_bar_mean
+from .values import parse_float, parse_int, parse_intlist
+
+VERSION = 1  # bump when an aggregate changes; every cached session is redone
+ANALYTICS_COLUMNS = ("Bar", "Tempo", "jsSenMem", "FER", "PitchClassSet", "MidNum", "ChordCode")
+STAT_NAMES = ("pc_hist", "note_hist", "chords", "transitions", "bars", "tempo", "sen_mem", "fer")
+
+
+def session_arrays(path):
+    """Typed columns of one session file as arrays (missing: -1 for ints, NaN for floats)."""
+    bar, tempo, sen_mem, pcs, chord = [], [], [], [], []
+    notes, fer = [], []
+    chords, chord_codes = [], {}
+    reader = RowReader(path, columns=ANALYTICS_COLUMNS)
+    for row in reader:
+        value = parse_int(row.get("Bar"))
+        bar.append(-1 if value is None else value)
+        value = parse_float(row.get("Tempo"))
+        tempo.append(np.nan if value is None else value)
+        value = parse_float(row.get("jsSenMem"))
+        sen_mem.append(np.nan if value is None else value)
+        pcs.append(pc_mask(parse_intlist(row.get("PitchClassSet")) or ()))
+        notes.extend(parse_intlist(row.get("MidNum")) or ())
+        fer.extend(parse_intlist(row.get("FER")) or ())
+        value = row.get("ChordCode") or ""
+        if _CHORD.match(value) is None:
+            chord.append(-1)
+            continue
+        code = chord_codes.get(value)
+        if code is None:
+            code = chord_codes[value] = len(chords)
+            chords.append(value)
+        chord.append(code)
+    if reader.layout == "object" and not bar and "rows" not in reader.meta:
+        raise ValueError("not a corpus session (no rows)")
+    return {
+        "bar": np.asarray(bar, dtype=np.int64),
+        "tempo": np.asarray(tempo, dtype=np.float64),
+        "sen_mem": np.asarray(sen_mem, dtype=np.float64),
+        "pcs": np.asarray(pcs, dtype=np.uint16),
+        "chord": np.asarray(chord, dtype=np.int32),
+        "chords": np.asarray(chords, dtype=str),
+        "notes": np.asarray(notes, dtype=np.int64),
+        "fer": np.asarray(fer, dtype=np.int64),
+    }
+
+
+def pc_histogram(masks):
+    """Rows per pitch class: bit i of every 12-bit mask, summed."""
+    masks = np.asarray(masks, dtype=np.uint16)
+    return ((masks[:, None] >> np.arange(12, dtype=np.uint16)) & 1).sum(axis=0, dtype=np.int64)
+
+
+def transition_matrix(codes, n):
+    """
+    (n, n) counts of chord i followed by a different chord j.  A chord held
+    over several rows counts once; rows without a chord (-1) are skipped.
+    """
+    codes = np.asarray(codes)
+    codes = codes[codes >= 0]
+    if codes.size:
+        codes = codes[np.r_[True, codes[1:] != codes[:-1]]]
+    flat = codes[:-1].astype(np.int64) * n + codes[1:]
+    return np.bincount(flat, minlength=n * n).reshape(n, n)
+
+
+def drift(bars, means):
+    """Change per bar between consecutive bars with a mean ((len(bars) - 1,) float64)."""
+    bars = np.asarray(bars, dtype=np.float64)
+    means = np.asarray(means, dtype=np.float64)
+    keep = ~np.isnan(means)
+    return np.diff(means[keep]) / np.diff(bars[keep])
+
+
+def session_stats(arrays):
+    """The cached aggregates of one session (see the module docstring)."""
+    bars, means = per_bar_mean(np.column_stack([arrays["tempo"], arrays["sen_mem"]]), arrays["bar"])
+    fer = arrays["fer"]
+    notes = arrays["notes"]
+    return {
+        "rows": np.int64(len(arrays["bar"])),
+        "pc_hist": pc_histogram(arrays["pcs"]),
+        "note_hist": np.bincount(notes[notes >= 0] % 12, minlength=12),
+        "chords": arrays["chords"],
+        "transitions": transition_matrix(arrays["chord"], len(arrays["chords"])),
+        "bars": bars,
+        "tempo": means[:, 0],
+        "sen_mem": means[:, 1],
+        "fer": np.bincount(fer[fer >= 0]) if fer.size else np.zeros(0, dtype=np.int64),
+    }
+
+
+def analyse_file(path, output):
+    """Aggregates of `path` into the .npz `output`; returns (rows, seconds)."""
+    started = time.perf_counter()
+    stats = session_stats(session_arrays(path))
+    tmp = f"{output}.tmp-{os.getpid()}.npz"
+    try:
+        np.savez(tmp, version=np.int64(VERSION), **stats)
+        os.replace(tmp, output)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return int(stats["rows"]), time.perf_counter() - started
+
+
+def _try_analyse(task):
+    try:
+        return analyse_file(*task)
+    except (ValueError, OSError) as e:
+        return e
+
+
+def combine(results):
+    """
+    Sum of the per-session aggregates: pitch-class and FER histograms,
+    transitions over the union of the chord strings (in order of first
+    appearance).  `results` is a list of session_stats() dicts.
+    """
+    vocabulary = {}
+    for stats in results:
+        for chord in stats["chords"].tolist():
+            vocabulary.setdefault(chord, len(vocabulary))
+    n = len(vocabulary)
+    transitions = np.zeros((n, n), dtype=np.int64)
+    fer = np.zeros(max((len(s["fer"]) for s in results), default=0), dtype=np.int64)
+    pc_hist = np.zeros(12, dtype=np.int64)
+    note_hist = np.zeros(12, dtype=np.int64)
+    for stats in results:
+        ids = np.array([vocabulary[c] for c in stats["chords"].tolist()], dtype=np.int64)
+        transitions[np.ix_(ids, ids)] += stats["transitions"]
+        fer[:len(stats["fer"])] += stats["fer"]
+        pc_hist += stats["pc_hist"]
+        note_hist += stats["note_hist"]
+    return {
+        "rows": int(sum(int(s["rows"]) for s in results)),
+        "pc_hist": pc_hist,
+        "note_hist": note_hist,
+        "chords": sorted(vocabulary, key=vocabulary.get),
+        "transitions": transitions,
+        "fer": fer,
+    }
+
+
+class AnalyticsCache:
+    """
+    Cache directory:
+
+        <root>/files.json        path -> size, mtime, sha256 (skips rehashing unchanged files)
+        <root>/<sha256>.npz      session_stats() of one file content
+
+    Two files with the same bytes share one entry; entries of files that
+    are gone stay until prune().
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._files_path = os.path.join(root, "files.json")
+        self.files = {}  # abspath -> {"size", "mtime_ns", "sha256"}
+        if os.path.exists(self._files_path):
+            with open(self._files_path, encoding="utf-8") as f:
+                catalog = json.load(f)
+            if catalog.get("version") == VERSION:
+                self.files = catalog["files"]
+        self.analysed = self.cached = 0  # sessions of the last stats() call
+
+    def path(self, digest):
+        return os.path.join(self.root, digest + ".npz")
+
+    def digest(self, abspath):
+        """sha256 of the file, reused while its size and mtime are unchanged."""
+        st = os.stat(abspath)
+        entry = self.files.get(abspath)
+        if entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+            return entry["sha256"]
+        digest = file_sha256(abspath)
+        self.files[abspath] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": digest}
+        return digest
+
+    def load(self, digest):
+        with np.load(self.path(digest)) as data:
+            if int(data["version"]) != VERSION:
+                return None
+            return {name: data[name] for name in ("rows",) + STAT_NAMES}
+
+    def stats(self, paths, jobs=None, log=None):
+        """
+        [(path, sha256, session_stats())] for the session files among `paths`,
+        analysing only contents without a cache entry (in parallel on a
+        process pool).  Files that do not read as a session are logged and left out.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        known = dict(self.files)
+        wanted = [(os.path.abspath(p), p) for p in paths]
+        digests = {abspath: self.digest(abspath) for abspath, _ in wanted}
+        loaded, tasks, pending = {}, [], []
+        for abspath, _ in wanted:
+            digest = digests[abspath]
+            if digest in loaded:
+                continue
+            loaded[digest] = self.load(digest) if os.path.exists(self.path(digest)) else None
+            if loaded[digest] is None:
+                tasks.append((abspath, self.path(digest)))
+                pending.append(digest)
+
+        started = time.perf_counter()
+        jobs = min(jobs or os.cpu_count() or 1, len(tasks))
+        if jobs > 1:
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                results = list(pool.map(_try_analyse, tasks))
+        else:
+            results = [_try_analyse(task) for task in tasks]
+        failed = {}
+        total_rows = 0
+        paths = dict(wanted)
+        for (abspath, _), digest, result in zip(tasks, pending, results):
+            if isinstance(result, Exception):
+                failed[digest] = result
+                continue
+            rows, elapsed = result
+            total_rows += rows
+            if log:
+                log(f"stats  {paths[abspath]}: {rows} rows in {elapsed * 1000:.0f} ms")
+        if log and len(tasks) > len(failed):
+            elapsed = max(time.perf_counter() - started, 1e-6)
+            log(f"{len(tasks) - len(failed)} sessions, {total_rows} rows in {elapsed:.2f} s "
+                f"({total_rows / elapsed:.0f} rows/s, {jobs} jobs)")
+
+        for abspath in [a for a in self.files if a not in digests]:
+            del self.files[abspath]
+        if self.files != known:
+            tmp = self._files_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"version": VERSION, "files": self.files}, f, ensure_ascii=False, indent=1)
+            os.replace(tmp, self._files_path)
+
+        self.analysed = len(tasks) - len(failed)
+        self.cached = len(loaded) - len(tasks)
+        sessions = []
+        for abspath, path in wanted:
+            digest = digests[abspath]
+            if digest in failed:
+                if log:
+                    log(f"skip   {path}: {failed[digest]}")
+                continue
+            if loaded[digest] is None:
+                loaded[digest] = self.load(digest)
+            sessions.append((path, digest, loaded[digest]))
+        return sessions
+
+    def prune(self, keep):
+        """Remove cache entries whose sha256 is not in `keep`; returns how many."""
+        removed = 0
+        for name in os.listdir(self.root):
+            if name.endswith(".npz") and name[:-4] not in keep:
+                os.remove(os.path.join(self.root, name))
+                removed += 1
+        return removed
+
+
+def _floats(values):
+    return [None if np.isnan(v) else float(v) for v in np.asarray(values, dtype=np.float64)]
+
+
+def session_report(path, digest, stats):
+    """JSON-ready summary of one session: per-bar means and their drift."""
+    bars = stats["bars"]
+    report = {"path": path, "sha256": digest, "rows": int(stats["rows"]), "bars": bars.tolist()}
+    for name, column in (("tempo", "Tempo"), ("sen_mem", "jsSenMem")):
+        means = stats[name]
+        steps = drift(bars, means)
+        report[column] = {
+            "per_bar": _floats(means),
+            "drift_per_bar": float(steps.mean()) if steps.size else None,
+            "max_step": float(np.abs(steps).max()) if steps.size else None,
+        }
+    return report
+
+
+def corpus_report(sessions):
+    """JSON-ready report over [(path, sha256, stats)] as returned by AnalyticsCache.stats()."""
+    total = combine([stats for _, _, stats in sessions])
+    transitions = total["transitions"]
+    chords = total["chords"]
+    order = np.argsort(transitions, axis=None, kind="stable")[::-1]
+    top = [{"from": chords[i], "to": chords[j], "count": int(transitions[i, j])}
+           for i, j in zip(*np.unravel_index(order, transitions.shape)) if transitions[i, j]]
+    return {
+        "version": VERSION,
+        "sessions": [session_report(*session) for session in sessions],
+        "rows": total["rows"],
+        "PitchClassSet": total["pc_hist"].tolist(),
+        "MidNum": total["note_hist"].tolist(),
+        "FER": {str(v): int(c) for v, c in enumerate(total["fer"]) if c},
+        "chords": chords,
+        "transitions": transitions.tolist(),
+        "top_transitions": top,
+    }
+
+
+def print_report(report, limit=10):
+    print(f"{report['rows']} rows in {len(report['sessions'])} sessions")
+    print("PitchClassSet rows per pc  ", " ".join(f"{c:5d}" for c in report["PitchClassSet"]))
+    print("MidNum notes per pc        ", " ".join(f"{c:5d}" for c in report["MidNum"]))
+    fer = sorted(report["FER"].items(), key=lambda item: -item[1])[:limit]
+    print("FER (most frequent)        ", ", ".join(f"{v}: {c}" for v, c in fer))
+    for t in report["top_transitions"][:limit]:
+        print(f"  {t['count']:5d}  {t['from']} -> {t['to']}")
+    for session in report["sessions"]:
+        tempo, sen_mem = session["Tempo"], session["jsSenMem"]
+        print(f"  {session['rows']:6d} rows {len(session['bars']):4d} bars  "
+              f"Tempo drift {_fmt(tempo['drift_per_bar'])}/bar  "
+              f"jsSenMem drift {_fmt(sen_mem['drift_per_bar'])}/bar  {session['path']}")
+
+
+def _fmt(value):
+    return "    -" if value is None else f"{value:+.3f}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Corpus statistics with a per-session cache.")
+    parser.add_argument("paths", nargs="+", help="session files or directories (data, uploads)")
+    parser.add_argument("--cache", default=os.environ.get("CORPUS_ANALYTICS", os.path.join("store", "analytics")),
+                        help="cache directory (default %(default)s, or $CORPUS_ANALYTICS)")
+    parser.add_argument("-o", "--output", help="write the full report as JSON to this file")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="sessions analysed in parallel (default: number of CPUs)")
+    parser.add_argument("--prune", action="store_true", help="drop cache entries of files not listed")
+    parser.add_argument("--limit", type=int, default=10, help="transitions / FER values to print")
+    args = parser.parse_args(argv)
+    cache = AnalyticsCache(args.cache)
+    sessions = cache.stats(session_files(args.paths), args.jobs, log=print)
+    print(f"{cache.analysed} analysed, {cache.cached} cached")
+    if args.prune:
+        print(f"{cache.prune({digest for _, digest, _ in sessions})} cache entries pruned")
+    report = corpus_report(sessions)
+    if args.output:
+        tmp = args.output + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, args.output)
+    print_report(report, args.limit)
+
+
+if __name__ == "__main__":
+    main()
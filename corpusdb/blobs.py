@@ -0,0 +1,43 @@
+import collections
+import hashlib
+import os
+
+
+class BlobStore:
+    """
+    Content-addressed, write-once file store: the bytes of a blob live at
+    `<root>/<first two hex digits>/<sha256 hex>`.  Putting the same bytes
+    twice (the same photo in a data/ and an uploads/ session) stores them
+    once.  Writes go through a temp file and a rename, so a reader never
+    sees half a blob.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.stats = collections.Counter()
+
+    def path(self, hexdigest):
+        return os.path.join(self.root, hexdigest[:2], hexdigest)
+
+    def __contains__(self, hexdigest):
+        return os.path.exists(self.path(hexdigest))
+
+    def put(self, data):
+        """Store `data`; returns its raw 32-byte sha256 digest."""
+        digest = hashlib.sha256(data).digest()
+        path = self.path(digest.hex())
+        if os.path.exists(path):
+            self.stats["deduped"] += 1
+            return digest
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        self.stats["written"] += 1
+        self.stats["bytes_written"] += len(data)
+        return digest
+
+    def get(self, hexdigest):
+        with open(self.path(hexdigest), "rb") as f:
+            return f.read()
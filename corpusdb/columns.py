@@ -0,0 +1,396 @@
+"""
+Column codecs: one JSON column (a list of cell values) <-> typed arrays.
+
+Every codec is lossless.  A cell that does not fit the column's type ("-",
+"", "---", "[-]", a header echo such as "Fz", or a non-string JSON value)
+is kept as an *exception*: `tags[i] = k` points at `exceptions[k - 1]`
+and the typed slot holds a filler.  Columns without exceptions carry no
+tags array at all.
+
+Kinds and their arrays (plain fixed-width arrays, so they can be memory-mapped):
+
+    int      values int32/int64                             "78", "-3"
+    float    values float64, decimals int8 (or constant)     "0.19", "3.0769..."
+    intlist  offsets int64 (n + 1), items int32/int64        "[48, 67, 72]", "[0 - 4 - 7]"
+    str      codes uint8/16/32 into `dictionary`             anything else
+    blob     digests uint8 n x 32 (sha256), prefix codes     "data:image/jpeg;base64,..."
+
+Blob cells store only the digest; the bytes live in the BlobStore.
+
+Column groups of the same float kind (the 256 spectrum bins) are packed
+into one rows x columns float32 matrix instead, see encode_matrix().
+"""
+import base64
+import json
+import re
+
+import numpy as np
+
+from .values import FLOAT as _FLOAT, INT as _INT, INTLIST as _INTLIST
+
+MAX_EXCEPTIONS = 16  # distinct odd values a typed column may carry before it falls back to str
+
+_DATA_URL = re.compile(r"(data:[\w/+.-]+;base64,)")
+
+
+def _key(value):
+    # Exceptions and dictionary entries are JSON values; "1" and 1 must stay apart.
+    return json.dumps(value, ensure_ascii=False)
+
+
+class _Exceptions:
+    def __init__(self):
+        self.values = []
+        self._index = {}
+
+    def tag(self, value):
+        key = _key(value)
+        k = self._index.get(key)
+        if k is None:
+            self.values.append(value)
+            k = self._index[key] = len(self.values)
+        return k
+
+
+def _smallest_uint(n):
+    for dtype in (np.uint8, np.uint16, np.uint32):
+        if n <= np.iinfo(dtype).max:
+            return dtype
+    return np.uint64
+
+
+# --- encoders: (values, present) -> (spec, arrays) or None if the kind does not fit ---
+
+def _encode_int(values, present, forced):
+    exc = _Exceptions()
+    out = np.zeros(len(values), dtype=np.int64)
+    tags = np.zeros(len(values), dtype=np.uint8)
+    ok = 0
+    for i, v in enumerate(values):
+        if not present[i]:
+            continue
+        if isinstance(v, str) and _INT.match(v) and len(v) < 19:
+            out[i] = int(v)
+            ok += 1
+        else:
+            tags[i] = exc.tag(v)
+            if len(exc.values) > MAX_EXCEPTIONS:
+                return None
+    if not ok and not forced:
+        return None
+    small = out.size == 0 or (out.min() >= np.iinfo(np.int32).min and out.max() <= np.iinfo(np.int32).max)
+    arrays = {"values": out.astype(np.int32) if small else out}
+    return _with_tags({"kind": "int"}, arrays, tags, exc)
+
+
+def _encode_float(values, present, forced):
+    exc = _Exceptions()
+    out = np.full(len(values), np.nan)
+    decimals = np.zeros(len(values), dtype=np.int8)
+    tags = np.zeros(len(values), dtype=np.uint8)
+    ok = 0
+    for i, v in enumerate(values):
+        if not present[i]:
+            continue
+        m = _FLOAT.match(v) if isinstance(v, str) else None
+        if m:
+            d = len(m.group(1) or "")
+            f = float(v)
+            if d <= 17 and f"{f:.{d}f}" == v:
+                out[i] = f
+                decimals[i] = d
+                ok += 1
+                continue
+        tags[i] = exc.tag(v)
+        if len(exc.values) > MAX_EXCEPTIONS:
+            return None
+    if not ok and not forced:
+        return None
+    spec = {"kind": "float"}
+    arrays = {"values": out}
+    used = decimals[(tags == 0) & present]
+    if used.size and (used == used[0]).all():
+        spec["decimals"] = int(used[0])
+    else:
+        arrays["decimals"] = decimals
+    return _with_tags(spec, arrays, tags, exc)
+
+
+def _encode_intlist(values, present, forced):
+    exc = _Exceptions()
+    offsets = np.zeros(len(values) + 1, dtype=np.int64)
+    items = []
+    tags = np.zeros(len(values), dtype=np.uint8)
+    sep = None
+    ok = 0
+    for i, v in enumerate(values):
+        m = _INTLIST.match(v) if present[i] and isinstance(v, str) else None
+        if m and (m.group(2) is None or sep in (None, m.group(2))):
+            parts = m.group(1).split(m.group(2) or ",") if m.group(1) else []
+            if all(_INT.match(p) for p in parts):
+                sep = sep or m.group(2)
+                items.extend(int(p) for p in parts)
+                ok += 1
+                offsets[i + 1] = len(items)
+                continue
+        if present[i]:
+            tags[i] = exc.tag(v)
+            if len(exc.values) > MAX_EXCEPTIONS:
+                return None
+        offsets[i + 1] = len(items)
+    if not ok and not forced:
+        return None
+    items = np.asarray(items, dtype=np.int64)
+    if not items.size or (items.min() >= np.iinfo(np.int32).min and items.max() <= np.iinfo(np.int32).max):
+        items = items.astype(np.int32)
+    arrays = {"offsets": offsets, "items": items}
+    return _with_tags({"kind": "intlist", "sep": sep or ", "}, arrays, tags, exc)
+
+
+def _encode_str(values, present):
+    index = {}
+    dictionary = []
+    codes = []
+    for i, v in enumerate(values):
+        if not present[i]:
+            codes.append(0)
+            continue
+        key = _key(v)
+        k = index.get(key)
+        if k is None:
+            k = index[key] = len(dictionary)
+            dictionary.append(v)
+        codes.append(k)
+    arrays = {"codes": np.asarray(codes, dtype=_smallest_uint(len(dictionary)))}
+    return {"kind": "str", "dictionary": dictionary}, arrays
+
+
+def _encode_blob(values, present, blobs):
+    exc = _Exceptions()
+    digests = np.zeros((len(values), 32), dtype=np.uint8)
+    prefix_codes = np.zeros(len(values), dtype=np.uint8)
+    prefixes = []
+    tags = np.zeros(len(values), dtype=np.uint16)  # odd cells are not capped here
+    for i, v in enumerate(values):
+        if not present[i]:
+            continue
+        m = _DATA_URL.match(v) if isinstance(v, str) else None
+        if m:
+            text = v[m.end():]
+            try:
+                data = base64.b64decode(text, validate=True)
+            except ValueError:
+                data = None
+            # Only canonical base64 round-trips byte for byte.
+            if data is not None and base64.b64encode(data).decode("ascii") == text:
+                digests[i] = np.frombuffer(blobs.put(data), dtype=np.uint8)
+                if m.group(1) not in prefixes:
+                    prefixes.append(m.group(1))
+                prefix_codes[i] = prefixes.index(m.group(1))
+                continue
+        tags[i] = exc.tag(v)
+    spec = {"kind": "blob", "prefixes": prefixes}
+    arrays = {"digests": digests, "prefix": prefix_codes}
+    return _with_tags(spec, arrays, tags, exc)
+
+
+def _with_tags(spec, arrays, tags, exc):
+    if exc.values:
+        spec["exceptions"] = exc.values
+        arrays["tags"] = tags
+    return spec, arrays
+
+
+def encode(values, present, kind=None, blobs=None):
+    """
+    Encode one column.  `present[i]` is False where row i lacks the key.
+    `kind` forces a codec (a forced typed kind still keeps odd cells as
+    exceptions); otherwise int, float and intlist are tried in that order.
+    """
+    if kind == "blob":
+        return _encode_blob(values, present, blobs)
+    if kind == "str":
+        return _encode_str(values, present)
+    for name, encoder in (("int", _encode_int), ("float", _encode_float), ("intlist", _encode_intlist)):
+        if kind in (None, name):
+            encoded = encoder(values, present, forced=kind == name)
+            if encoded is not None:
+                return encoded
+    return _encode_str(values, present)
+
+
+def encode_matrix(columns_values, present):
+    """
+    Pack k float columns into one (rows, k) float32 matrix.  A cell goes in
+    as a number when its text comes back from the float32 value with its
+    own number of decimals; everything else ("", "-", digits float32 cannot
+    hold) is an exception, with the float32 approximation still in the
+    matrix when the text is numeric (NaN otherwise).  `present` is
+    (rows, k) bool.
+    """
+    n, k = present.shape
+    values = np.full((n, k), np.nan, dtype=np.float32)
+    decimals = np.zeros((n, k), dtype=np.int8)
+    tags = np.zeros((n, k), dtype=np.uint32)
+    exc = _Exceptions()
+    for j, column in enumerate(columns_values):
+        for i, v in enumerate(column):
+            if not present[i, j]:
+                continue
+            m = _FLOAT.match(v) if isinstance(v, str) else None
+            if m:
+                d = len(m.group(1) or "")
+                f = np.float32(v)
+                values[i, j] = f
+                if d <= 17 and f"{float(f):.{d}f}" == v:
+                    decimals[i, j] = d
+                    continue
+            tags[i, j] = exc.tag(v)
+    spec = {"kind": "matrix"}
+    arrays = {"values": values}
+    used = decimals[(tags == 0) & present]
+    if used.size and (used == used[0]).all():
+        spec["decimals"] = int(used[0])
+    elif used.size:
+        arrays["decimals"] = decimals
+    else:
+        spec["decimals"] = 0
+    if exc.values:
+        spec["exceptions"] = exc.values
+        arrays["tags"] = tags.astype(_smallest_uint(len(exc.values)))
+    return spec, arrays
+
+
+# --- decoding ---
+
+class Column:
+    """
+    A stored column: typed arrays (memory-mapped when loaded from disk) plus
+    the spec from the manifest.  `typed()` gives the numeric view with a
+    validity mask; `cell(i)` gives back the original JSON value.
+    """
+
+    def __init__(self, name, spec, arrays, blobs=None):
+        self.name = name
+        self.spec = spec
+        self.kind = spec["kind"]
+        self.arrays = arrays
+        self.exceptions = spec.get("exceptions", [])
+        self._blobs = blobs
+
+    def __len__(self):
+        first = next(iter(self.arrays.values()))
+        return len(first) - 1 if self.kind == "intlist" else len(first)
+
+    @property
+    def tags(self):
+        return self.arrays.get("tags")
+
+    def valid(self):
+        """Boolean mask of rows holding a typed value (not an exception)."""
+        tags = self.tags
+        return np.ones(len(self), dtype=bool) if tags is None else tags == 0
+
+    def typed(self):
+        """
+        The typed array for int/float columns, or (offsets, items) for
+        intlist; exception rows hold a filler, see valid().
+        """
+        if self.kind in ("int", "float"):
+            return self.arrays["values"]
+        if self.kind == "intlist":
+            return self.arrays["offsets"], self.arrays["items"]
+        if self.kind == "str":
+            return self.arrays["codes"]
+        return self.arrays["digests"]
+
+    def items(self, i):
+        """The integers of intlist row `i` (a view)."""
+        offsets = self.arrays["offsets"]
+        return self.arrays["items"][offsets[i]:offsets[i + 1]]
+
+    def digest(self, i):
+        """Hex sha256 of blob row `i`, or None for an exception cell."""
+        if self.tags is not None and self.tags[i]:
+            return None
+        return self.arrays["digests"][i].tobytes().hex()
+
+    def cell(self, i):
+        tags = self.tags
+        if tags is not None and tags[i]:
+            return self.exceptions[tags[i] - 1]
+        kind = self.kind
+        if kind == "str":
+            return self.spec["dictionary"][self.arrays["codes"][i]]
+        if kind == "int":
+            return str(int(self.arrays["values"][i]))
+        if kind == "float":
+            d = self.spec.get("decimals")
+            if d is None:
+                d = int(self.arrays["decimals"][i])
+            return f"{float(self.arrays['values'][i]):.{d}f}"
+        if kind == "intlist":
+            return "[" + self.spec["sep"].join(str(int(x)) for x in self.items(i)) + "]"
+        prefix = self.spec["prefixes"][self.arrays["prefix"][i]]
+        data = self._blobs.get(self.arrays["digests"][i].tobytes().hex())
+        return prefix + base64.b64encode(data).decode("ascii")
+
+
+class Matrix:
+    """
+    A packed float group: `values` is the (rows, k) float32 matrix (a view
+    of the memory-mapped data file), `labels` the k column names.
+    """
+
+    def __init__(self, name, spec, arrays):
+        self.name = name
+        self.spec = spec
+        self.labels = spec["columns"]
+        self.arrays = arrays
+        self.values = arrays["values"]
+        self.exceptions = spec.get("exceptions", [])
+
+    def __len__(self):
+        return self.values.shape[0]
+
+    @property
+    def edges(self):
+        """(k, 2) float array of [low, high) per column, or None when the labels carry none."""
+        edges = self.spec.get("edges")
+        return None if edges is None else np.asarray(edges, dtype=np.float64)
+
+    def valid(self):
+        """(rows, k) mask of cells holding a number (NaN elsewhere in `values`)."""
+        return ~np.isnan(self.values)
+
+    def cell(self, i, j):
+        tags = self.arrays.get("tags")
+        if tags is not None and tags[i, j]:
+            return self.exceptions[tags[i, j] - 1]
+        d = self.spec.get("decimals")
+        if d is None:
+            d = int(self.arrays["decimals"][i, j])
+        return f"{float(self.values[i, j]):.{d}f}"
+
+
+class MatrixColumn:
+    """One column of a Matrix, with the Column interface (typed() is a strided view)."""
+
+    kind = "float"
+
+    def __init__(self, matrix, j):
+        self.matrix = matrix
+        self.j = j
+        self.name = matrix.labels[j]
+
+    def __len__(self):
+        return len(self.matrix)
+
+    def valid(self):
+        return ~np.isnan(self.typed())
+
+    def typed(self):
+        return self.matrix.values[:, self.j]
+
+    def cell(self, i):
+        return self.matrix.cell(i, self.j)
@@ -0,0 +1,104 @@
+"""
+JSON session files <-> columnar store.
+
+    python -m corpusdb.convert import data/*.json uploads/table_*.json
+    python -m corpusdb.convert export corpus_2025-09-27T05-47-09-841Z -o out.json
+    python -m corpusdb.convert verify data/*.json
+
+`import --verify` (and `verify`) re-exports every imported session and
+compares it with the source file byte for byte.
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+from .store import CorpusStore, dump_json, session_name
+
+
+def dir_size(path):
+    total = 0
+    for dirpath, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(dirpath, f)) for f in files)
+    return total
+
+
+def roundtrip_matches(store, name, path):
+    out = io.StringIO()
+    dump_json(store.open(name).document(), out)
+    with open(path, encoding="utf-8") as f:
+        return out.getvalue() == f.read()
+
+
+def import_files(store, paths, verify=False):
+    failed = 0
+    for path in paths:
+        name = session_name(path)
+        started = time.perf_counter()
+        try:
+            session = store.import_json(path, name)
+        except ValueError as e:
+            print(f"skip   {path}: {e}")
+            continue
+        elapsed = time.perf_counter() - started
+        line = (f"import {path}: {len(session)} rows, {len(session.columns)} columns, "
+                f"{os.path.getsize(path) / 1024:.0f} KiB -> {dir_size(session.path) / 1024:.0f} KiB "
+                f"(+ blobs) in {elapsed * 1000:.0f} ms")
+        if verify:
+            ok = roundtrip_matches(store, name, path)
+            failed += not ok
+            line += ", round trip " + ("ok" if ok else "MISMATCH")
+        print(line)
+    stats = store.blobs.stats
+    print(f"blobs: {stats['written']} written ({stats['bytes_written'] / 1024:.0f} KiB), "
+          f"{stats['deduped']} deduplicated")
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert corpus JSON sessions to and from the columnar store.")
+    parser.add_argument("--store", default=os.environ.get("CORPUS_STORE", "store"),
+                        help="store directory (default %(default)s, or $CORPUS_STORE)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("import", help="convert JSON session files into the store")
+    p.add_argument("files", nargs="+")
+    p.add_argument("--verify", action="store_true", help="check each session round-trips byte for byte")
+
+    p = sub.add_parser("export", help="write a stored session back as JSON")
+    p.add_argument("session")
+    p.add_argument("-o", "--output", help="output file (default <session>.json)")
+
+    p = sub.add_parser("verify", help="check stored sessions against their JSON files")
+    p.add_argument("files", nargs="+")
+
+    sub.add_parser("list", help="list stored sessions")
+
+    args = parser.parse_args(argv)
+    store = CorpusStore(args.store)
+
+    if args.command == "import":
+        failed = import_files(store, args.files, args.verify)
+    elif args.command == "export":
+        output = args.output or f"{args.session}.json"
+        store.export_json(args.session, output)
+        print(f"export {args.session} -> {output}")
+        failed = 0
+    elif args.command == "verify":
+        failed = 0
+        for path in args.files:
+            name = session_name(path)
+            ok = name in store and roundtrip_matches(store, name, path)
+            failed += not ok
+            print(f"{'ok      ' if ok else 'MISMATCH'} {path}")
+    else:
+        for name in store.sessions():
+            session = store.open(name)
+            print(f"{name}\t{len(session)} rows\t{session.manifest['source']}")
+        failed = 0
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
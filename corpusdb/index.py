@@ -0,0 +1,387 @@
+"""
+Harmonic query index over every session file.
+
+    python -m corpusdb.index update data uploads
+    python -m corpusdb.index query --contains 0,4,7 --tempo 70:90 --bar 20:40
+    python -m corpusdb.index query --chord-root 0
+
+One segment per session file holds the indexed columns as arrays:
+PitchClassSet as a 12-bit mask, ChordCode as root/bass/soprano plus a
+code into the session's chord strings, Bass, SopPc, Key, Tempo, Bar and
+Performance Date.  `update()` re-reads only files whose size or mtime
+changed (with the streaming reader, Photo never decoded) and drops
+segments of files that are gone or no longer read as a session; the
+merged arrays and the sort orders behind the range queries are rebuilt
+only when a segment changed.
+"""
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+
+import numpy as np
+
+from .reader import RowReader
+from .values import parse_datetime, parse_float, parse_int, parse_intlist
+
+VERSION = 1
+INDEX_COLUMNS = ("#", "PitchClassSet", "ChordCode", "Bass", "SopPc", "Key", "Tempo", "Bar",
+                 "Performance Date")
+RANGE_FIELDS = ("tempo", "bar", "date")  # fields with a sorted range index
+
+# Per-row arrays of a segment.
+SEGMENT_DTYPES = {"number": np.int32, "pcs": np.uint16, "has_pcs": bool, "root": np.int8,
+                  "chord_bass": np.int8, "chord_sop": np.int8, "chord": np.int32, "bass": np.int8,
+                  "sop": np.int8, "key": np.int8, "tempo": np.float64, "bar": np.float64,
+                  "date": np.float64}
+
+_CHORD = re.compile(r"\[R(\d+)\]\[B(\d+)\]\[Code[^\]]*\]\[s(\d+)\]")
+
+
+def pc_mask(pcs):
+    mask = 0
+    for pc in pcs:
+        mask |= 1 << (pc % 12)
+    return mask
+
+
+def parse_date(value):
+    """Performance Date -> POSIX seconds (wall clock read as UTC), or NaN."""
+    dt = parse_datetime(value)
+    if dt is None:
+        return float("nan")
+    return dt.replace(tzinfo=datetime.timezone.utc).timestamp()
+
+
+def date_arg(value):
+    """'2025-09-26' or '2025-09-26T06:37' -> POSIX seconds, same convention as parse_date."""
+    dt = datetime.datetime.fromisoformat(value)
+    return dt.replace(tzinfo=datetime.timezone.utc).timestamp()
+
+
+def _small(value, missing=-1):
+    return missing if value is None else value
+
+
+def build_segment(path):
+    """Indexed arrays of one session file, read with the streaming reader."""
+    rows = {name: [] for name in SEGMENT_DTYPES}
+    chords, chord_codes = [], {}
+    for row in RowReader(path, columns=INDEX_COLUMNS):
+        pcs = parse_intlist(row.get("PitchClassSet"))
+        key = parse_intlist(row.get("Key"))
+        chord = row.get("ChordCode") or ""
+        m = _CHORD.match(chord)
+        code = chord_codes.get(chord)
+        if code is None:
+            code = chord_codes[chord] = len(chords)
+            chords.append(chord)
+        bar = parse_int(row.get("Bar"))
+        rows["number"].append(_small(parse_int(row.get("#"))))
+        rows["pcs"].append(pc_mask(pcs or ()))
+        rows["has_pcs"].append(bool(pcs))
+        rows["root"].append(int(m.group(1)) if m else -1)
+        rows["chord_bass"].append(int(m.group(2)) if m else -1)
+        rows["chord_sop"].append(int(m.group(3)) if m else -1)
+        rows["chord"].append(code)
+        rows["bass"].append(_small(parse_int(row.get("Bass"))))
+        rows["sop"].append(_small(parse_int(row.get("SopPc"))))
+        rows["key"].append(key[0] if key else -1)
+        rows["tempo"].append(_small(parse_float(row.get("Tempo")), float("nan")))
+        rows["bar"].append(float("nan") if bar is None else bar)
+        rows["date"].append(parse_date(row.get("Performance Date")))
+    arrays = {name: np.asarray(values, dtype=SEGMENT_DTYPES[name]) for name, values in rows.items()}
+    arrays["chords"] = np.asarray(chords, dtype=str)
+    return arrays
+
+
+class HarmonicIndex:
+    """
+    Persistent index directory:
+
+        <root>/index.json            indexed files (size, mtime, rows, segment name)
+        <root>/segments/<name>.npz   one per session file
+        <root>/merged.npz            all segments concatenated, plus sort orders
+
+    query() answers from merged.npz: pitch-class predicates are mask
+    tests over the uint16 column, equality predicates compare small ints,
+    and range predicates take a slice of a precomputed argsort via
+    searchsorted.  All predicates AND together.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.segments_dir = os.path.join(root, "segments")
+        self._catalog_path = os.path.join(root, "index.json")
+        self._merged_path = os.path.join(root, "merged.npz")
+        self.files = {}  # abspath -> {"path", "size", "mtime_ns", "rows", "segment"}
+        if os.path.exists(self._catalog_path):
+            with open(self._catalog_path, encoding="utf-8") as f:
+                catalog = json.load(f)
+            if catalog.get("version") == VERSION:
+                self.files = catalog["files"]
+        self._merged = None
+
+    # --- building ---------------------------------------------------------
+
+    def update(self, paths, log=None):
+        """
+        Bring the index in line with `paths` (session files): new or changed
+        files are (re)indexed, files no longer listed are dropped, and so
+        are changed files that no longer read as a session.  Returns
+        (added, updated, removed) counts.
+        """
+        os.makedirs(self.segments_dir, exist_ok=True)
+        wanted = {os.path.abspath(p): p for p in paths}
+        added = updated = failed = 0
+        for abspath, path in sorted(wanted.items()):
+            st = os.stat(abspath)
+            entry = self.files.get(abspath)
+            if entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+                continue
+            started = time.perf_counter()
+            try:
+                arrays = build_segment(abspath)
+            except ValueError as e:
+                if entry:
+                    # The old segment no longer matches the file: drop it with the entry.
+                    self._remove_segment(self.files.pop(abspath))
+                    failed += 1
+                if log:
+                    log(f"skip   {path}: {e}")
+                continue
+            name = segment_name(abspath)
+            np.savez(os.path.join(self.segments_dir, name + ".npz"), **arrays)
+            if entry:
+                updated += 1
+            else:
+                added += 1
+            self.files[abspath] = {"path": path, "size": st.st_size, "mtime_ns": st.st_mtime_ns,
+                                   "rows": len(arrays["pcs"]), "segment": name}
+            if log:
+                log(f"index  {path}: {len(arrays['pcs'])} rows in "
+                    f"{(time.perf_counter() - started) * 1000:.0f} ms")
+        removed = [abspath for abspath in self.files if abspath not in wanted]
+        for abspath in removed:
+            self._remove_segment(self.files.pop(abspath))
+        if added or updated or failed or removed or not os.path.exists(self._merged_path):
+            self._write_merged()
+            tmp = self._catalog_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"version": VERSION, "files": self.files}, f, ensure_ascii=False, indent=1)
+            os.replace(tmp, self._catalog_path)
+        return added, updated, len(removed) + failed
+
+    def _remove_segment(self, entry):
+        segment = os.path.join(self.segments_dir, entry["segment"] + ".npz")
+        if os.path.exists(segment):
+            os.remove(segment)
+
+    def _write_merged(self):
+        parts, chord_index = [], {}
+        sources = []
+        for file_id, abspath in enumerate(sorted(self.files)):
+            entry = self.files[abspath]
+            sources.append(entry["path"])
+            with np.load(os.path.join(self.segments_dir, entry["segment"] + ".npz")) as seg:
+                seg = dict(seg)
+            # Session-local chord codes -> one dictionary for the whole corpus.
+            remap = np.array([chord_index.setdefault(c, len(chord_index))
+                              for c in seg.pop("chords").tolist()], dtype=np.int32)
+            seg["chord"] = remap[seg["chord"]] if remap.size else seg["chord"]
+            seg["source"] = np.full(len(seg["pcs"]), file_id, dtype=np.int32)
+            seg["row"] = np.arange(len(seg["pcs"]), dtype=np.int32)
+            parts.append(seg)
+        chords = sorted(chord_index, key=chord_index.get)
+        if parts:
+            merged = {name: np.concatenate([p[name] for p in parts]) for name in parts[0]}
+        else:
+            merged = {name: np.zeros(0, dtype=dt)
+                      for name, dt in {**SEGMENT_DTYPES, "source": np.int32, "row": np.int32}.items()}
+        for name in RANGE_FIELDS:
+            values = merged[name]
+            order = np.argsort(values, kind="stable")  # NaN (missing) sorts last
+            order = order[~np.isnan(values[order])]
+            merged[name + "_order"] = order.astype(np.int32)
+            merged[name + "_sorted"] = values[order]
+        merged["chords"] = np.asarray(chords, dtype=str)
+        merged["sources"] = np.asarray(sources, dtype=str)
+        tmp = self._merged_path + ".tmp.npz"
+        np.savez(tmp, **merged)
+        os.replace(tmp, self._merged_path)
+        self._merged = None
+
+    # --- querying ---------------------------------------------------------
+
+    @property
+    def merged(self):
+        if self._merged is None:
+            with np.load(self._merged_path) as data:
+                self._merged = dict(data)
+        return self._merged
+
+    def __len__(self):
+        return len(self.merged["pcs"]) if os.path.exists(self._merged_path) else 0
+
+    def _range(self, name, lo, hi):
+        m = self.merged
+        sorted_values = m[name + "_sorted"]
+        i = 0 if lo is None else np.searchsorted(sorted_values, lo, side="left")
+        j = len(sorted_values) if hi is None else np.searchsorted(sorted_values, hi, side="right")
+        mask = np.zeros(len(m["pcs"]), dtype=bool)
+        mask[m[name + "_order"][i:j]] = True
+        return mask
+
+    def query(self, contains=None, within=None, equals=None, chord=None, chord_root=None,
+              bass=None, sop=None, key=None, tempo=None, bar=None, date=None):
+        """
+        Row selection as a QueryResult.
+
+        contains / within / equals: pitch classes the row's PitchClassSet
+        must contain (superset), stay within (subset) or match exactly.
+        chord: exact ChordCode string; chord_root / bass / sop / key: ints.
+        tempo / bar / date: (lo, hi) inclusive, either end may be None;
+        date bounds in POSIX seconds (see date_arg).
+        """
+        m = self.merged
+        pcs = m["pcs"]
+        mask = np.ones(len(pcs), dtype=bool)
+        if contains is not None:
+            q = pc_mask(contains)
+            mask &= (pcs & q) == q
+        if within is not None:
+            q = pc_mask(within)
+            mask &= m["has_pcs"] & ((pcs & ~np.uint16(q) & 0xFFF) == 0)
+        if equals is not None:
+            mask &= m["has_pcs"] & (pcs == pc_mask(equals))
+        if chord is not None:
+            codes = np.flatnonzero(m["chords"] == chord)
+            mask &= np.isin(m["chord"], codes)
+        for field, value in (("root", chord_root), ("bass", bass), ("sop", sop), ("key", key)):
+            if value is not None:
+                mask &= m[field] == value
+        for field, bounds in (("tempo", tempo), ("bar", bar), ("date", date)):
+            if bounds is not None:
+                mask &= self._range(field, *bounds)
+        return QueryResult(self, np.flatnonzero(mask))
+
+
+class QueryResult:
+    """Matching rows: `ids` index the merged arrays; iterate for (source path, row index)."""
+
+    def __init__(self, index, ids):
+        self.index = index
+        self.ids = ids
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        m = self.index.merged
+        sources = m["sources"]
+        for i in self.ids:
+            yield str(sources[m["source"][i]]), int(m["row"][i])
+
+    def sessions(self):
+        """Source path -> number of matching rows."""
+        m = self.index.merged
+        files, counts = np.unique(m["source"][self.ids], return_counts=True)
+        return {str(m["sources"][f]): int(c) for f, c in zip(files, counts)}
+
+    def describe(self, i):
+        """One hit as a dict of its indexed values (for printing)."""
+        m = self.index.merged
+        j = self.ids[i]
+        pcs = int(m["pcs"][j])
+        return {
+            "source": str(m["sources"][m["source"][j]]),
+            "row": int(m["row"][j]),
+            "#": int(m["number"][j]),
+            "PitchClassSet": [pc for pc in range(12) if pcs >> pc & 1] if m["has_pcs"][j] else None,
+            "ChordCode": str(m["chords"][m["chord"][j]]),
+            "Tempo": float(m["tempo"][j]),
+            "Bar": None if np.isnan(m["bar"][j]) else int(m["bar"][j]),
+        }
+
+
+def segment_name(abspath):
+    """File name stem unique per input path: basename plus a hash of the absolute path."""
+    return (os.path.splitext(os.path.basename(abspath))[0] + "-"
+            + hashlib.sha1(abspath.encode("utf-8")).hexdigest()[:8])
+
+
+def session_files(paths):
+    """Expand directories to their corpus_*.json / table_*.json files."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(os.path.join(path, name) for name in sorted(os.listdir(path))
+                         if name.endswith(".json") and name.startswith(("corpus_", "table_")))
+        else:
+            files.append(path)
+    return files
+
+
+def _pcs_arg(value):
+    return {int(p) for p in value.split(",") if p.strip()}
+
+
+def _range_arg(convert):
+    def parse(value):
+        lo, sep, hi = value.partition(":")
+        if not sep:
+            return convert(lo), convert(lo)
+        return (convert(lo) if lo else None), (convert(hi) if hi else None)
+    return parse
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Harmonic query index over the corpus sessions.")
+    parser.add_argument("--index", default=os.environ.get("CORPUS_INDEX", os.path.join("store", "index")),
+                        help="index directory (default %(default)s, or $CORPUS_INDEX)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("update", help="index new/changed session files, drop missing ones")
+    p.add_argument("paths", nargs="+", help="session files or directories (data, uploads)")
+
+    p = sub.add_parser("query", help="find rows")
+    p.add_argument("--contains", type=_pcs_arg, metavar="PCS", help="PitchClassSet ⊇ PCS, e.g. 0,4,7")
+    p.add_argument("--within", type=_pcs_arg, metavar="PCS", help="PitchClassSet ⊆ PCS")
+    p.add_argument("--equals", type=_pcs_arg, metavar="PCS", help="PitchClassSet = PCS")
+    p.add_argument("--chord", help="exact ChordCode, e.g. '[R0][B0][Code4 - 7][s4]'")
+    p.add_argument("--chord-root", type=int)
+    p.add_argument("--bass", type=int)
+    p.add_argument("--sop", type=int)
+    p.add_argument("--key", type=int)
+    p.add_argument("--tempo", type=_range_arg(float), metavar="LO:HI")
+    p.add_argument("--bar", type=_range_arg(float), metavar="LO:HI")
+    p.add_argument("--date", type=_range_arg(date_arg), metavar="FROM:TO", help="ISO dates/times")
+    p.add_argument("--limit", type=int, default=20, help="hits to print (default %(default)s)")
+
+    args = parser.parse_args(argv)
+    index = HarmonicIndex(args.index)
+    if args.command == "update":
+        added, updated, removed = index.update(session_files(args.paths), log=print)
+        print(f"{len(index)} rows from {len(index.files)} files "
+              f"({added} added, {updated} updated, {removed} removed)")
+        return
+    if not len(index):
+        sys.exit("index is empty; run `python -m corpusdb.index update data uploads` first")
+    started = time.perf_counter()
+    result = index.query(contains=args.contains, within=args.within, equals=args.equals,
+                         chord=args.chord, chord_root=args.chord_root, bass=args.bass, sop=args.sop,
+                         key=args.key, tempo=args.tempo, bar=args.bar, date=args.date)
+    elapsed = time.perf_counter() - started
+    print(f"{len(result)} of {len(index)} rows in {elapsed * 1000:.2f} ms")
+    for source, count in result.sessions().items():
+        print(f"  {count:5d}  {source}")
+    for i in range(min(args.limit, len(result))):
+        print("  ", result.describe(i))
+
+
+if __name__ == "__main__":
+    main()
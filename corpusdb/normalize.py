@@ -0,0 +1,270 @@
+"""
+Incremental normalisation of the session files into one canonical typed form.
+
+    python -m corpusdb.normalize data uploads
+    python -m corpusdb.normalize data uploads -o store/normalized -j 4
+
+Each session becomes <out>/sessions/<name>-<path hash>.jsonl (the same
+naming as the index segments, so equal basenames in different directories
+do not collide), one JSON object per row,
+same keys in the same order, every value parsed once:
+
+    "-", "", "---", "[-]"           null
+    #, Bar, Tempo, jsSenMem, ...    numbers (values.column_kind)
+    "[0 - 4 - 7]", "[48, 67, 72]"   [0, 4, 7], [48, 67, 72]
+    "9/27/2025, 1:44:58 AM"         "2025-09-27T01:44:58"
+    "[R0][B0][Code4 - 7][s4]"       {"root": 0, "bass": 0, "code": [4, 7], "sop": 4}
+    acc1..3, block columns          numbers
+    elec1..8 "[1.5, 0.25, ...]"     [1.5, 0.25, ...] (older uploads: "Fz: 0.02" -> [0.02])
+    Photo data URL                  "sha256:<hex>", bytes in <out>/blobs
+
+Cells of a typed column that do not parse become null and are counted in
+the report.  <out>/manifest.json records the sha256 of every input, so a
+re-run only processes new or changed files (and drops outputs of files
+that are gone); files are normalised in parallel on a process pool.
+"""
+import argparse
+import base64
+import binascii
+import hashlib
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .blobs import BlobStore
+from .index import segment_name, session_files
+from .reader import RowReader
+from .values import BLOCK_COLUMN, MISSING, PARSERS, column_kind, parse_datetime, parse_float
+
+VERSION = 1  # bump when the canonical form changes; every file is redone
+HASH_CHUNK = 1 << 20
+
+_CHORD = re.compile(r"\[R(\d+)\]\[B(\d+)\]\[Code([^\]]*)\]\[s(\d+)\]\Z")
+_FLOATLIST = re.compile(r"\[([^\]]*)\]\Z")
+_LABELLED = re.compile(r"[A-Za-z0-9]+: (\S+)\Z")  # "Fz: 0.02"
+_DATA_URL = re.compile(r"data:[\w/+.-]+;base64,")
+_ACC = re.compile(r"acc[1-3]\Z")
+_ELEC = re.compile(r"elec[1-8]\Z")
+
+
+def _chord(value):
+    m = _CHORD.match(value)
+    if m is None:
+        return None
+    code = [int(p) for p in m.group(3).split(" - ") if p.isdigit()]
+    return {"root": int(m.group(1)), "bass": int(m.group(2)), "code": code, "sop": int(m.group(4))}
+
+
+def _date(value):
+    dt = parse_datetime(value)
+    return None if dt is None else dt.isoformat()
+
+
+def _floatlist(value):
+    m = _FLOATLIST.match(value)
+    if m is None:
+        m = _LABELLED.match(value)
+        number = parse_float(m.group(1)) if m else None
+        return None if number is None else [number]
+    parts = [parse_float(p.strip()) for p in m.group(1).split(",")] if m.group(1) else []
+    return None if None in parts else parts
+
+
+def parser_for(name):
+    """The function turning a cell of column `name` into its canonical value, or None for text."""
+    if name == "ChordCode":
+        return _chord
+    if name == "Performance Date":
+        return _date
+    if _ELEC.match(name):
+        return _floatlist
+    if _ACC.match(name) or BLOCK_COLUMN.match(name):
+        return parse_float
+    return PARSERS.get(column_kind(name))
+
+
+class Normalizer:
+    """Canonical rows of one session; photos go to `blobs`, `dropped` counts unparsable cells."""
+
+    def __init__(self, blobs):
+        self.blobs = blobs
+        self.dropped = 0
+        self._parsers = {}
+
+    def value(self, name, value):
+        if not isinstance(value, str):
+            return value
+        if value in MISSING:
+            return None
+        if name == "Photo":
+            m = _DATA_URL.match(value)
+            if m is not None:
+                try:
+                    return "sha256:" + self.blobs.put(base64.b64decode(value[m.end():], validate=True)).hex()
+                except (binascii.Error, ValueError):
+                    pass
+            self.dropped += 1
+            return None
+        parser = self._parsers.get(name, False)
+        if parser is False:
+            parser = self._parsers[name] = parser_for(name)
+        if parser is None:
+            return value
+        parsed = parser(value)
+        if parsed is None:
+            self.dropped += 1
+        return parsed
+
+    def row(self, row):
+        return {name: self.value(name, value) for name, value in row.items()}
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def normalize_file(path, output, blobs_root):
+    """Stream `path` into the JSON Lines file `output`; returns (rows, dropped cells, seconds)."""
+    started = time.perf_counter()
+    normalizer = Normalizer(BlobStore(blobs_root))
+    tmp = f"{output}.tmp-{os.getpid()}"
+    rows = 0
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            reader = RowReader(path)
+            for row in reader:
+                f.write(json.dumps(normalizer.row(row), ensure_ascii=False, separators=(",", ":")))
+                f.write("\n")
+                rows += 1
+            if reader.layout == "object" and not rows and "rows" not in reader.meta:
+                raise ValueError("not a corpus session (no rows)")
+        os.replace(tmp, output)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return rows, normalizer.dropped, time.perf_counter() - started
+
+
+def _try_normalize(task):
+    try:
+        return normalize_file(*task)
+    except (ValueError, OSError) as e:
+        return e
+
+
+class NormalizedCorpus:
+    """
+    Output directory of the pipeline:
+
+        <root>/manifest.json         input path -> sha256, output, rows
+        <root>/sessions/<name>.jsonl
+        <root>/blobs/                photos (BlobStore)
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.sessions_dir = os.path.join(root, "sessions")
+        self.blobs_dir = os.path.join(root, "blobs")
+        self._manifest_path = os.path.join(root, "manifest.json")
+        self.files = {}  # abspath -> {"path", "sha256", "output", "rows", "dropped"}
+        if os.path.exists(self._manifest_path):
+            with open(self._manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get("version") == VERSION:
+                self.files = manifest["files"]
+
+    def update(self, paths, jobs=None, log=None):
+        """
+        Normalise new or changed files among `paths` (by content hash) and
+        forget files no longer listed.  Returns (processed, skipped, removed).
+        """
+        os.makedirs(self.sessions_dir, exist_ok=True)
+        wanted = {os.path.abspath(p): p for p in paths}
+        tasks, pending = [], []
+        skipped = 0
+        for abspath, path in sorted(wanted.items()):
+            digest = file_sha256(abspath)
+            entry = self.files.get(abspath)
+            if (entry and entry["sha256"] == digest
+                    and os.path.exists(os.path.join(self.sessions_dir, entry["output"]))):
+                skipped += 1
+                continue
+            output = segment_name(abspath) + ".jsonl"
+            tasks.append((abspath, os.path.join(self.sessions_dir, output), self.blobs_dir))
+            pending.append((abspath, path, digest, output))
+
+        started = time.perf_counter()
+        processed = failed = total_bytes = total_rows = 0
+        jobs = min(jobs or os.cpu_count() or 1, len(tasks))
+        if jobs > 1:
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                results = list(pool.map(_try_normalize, tasks))
+        else:
+            results = [_try_normalize(task) for task in tasks]
+        for (abspath, path, digest, output), result in zip(pending, results):
+            if isinstance(result, Exception):
+                failed += 1
+                # The previous output no longer matches the input: drop it with the entry.
+                self._remove_output(self.files.pop(abspath, None))
+                if log:
+                    log(f"skip   {path}: {result}")
+                continue
+            rows, dropped, elapsed = result
+            elapsed = max(elapsed, 1e-6)
+            size = os.path.getsize(abspath)
+            processed += 1
+            total_bytes += size
+            total_rows += rows
+            previous = self.files.get(abspath)
+            if previous and previous["output"] != output:
+                self._remove_output(previous)  # written under an older naming
+            self.files[abspath] = {"path": path, "sha256": digest, "output": output,
+                                   "rows": rows, "dropped": dropped}
+            if log:
+                log(f"normal {path}: {rows} rows, {size / 1024:.0f} KiB in {elapsed * 1000:.0f} ms "
+                    f"({size / 1048576 / elapsed:.1f} MiB/s), {dropped} unparsable cells")
+
+        removed = [abspath for abspath in self.files if abspath not in wanted]
+        for abspath in removed:
+            self._remove_output(self.files.pop(abspath))
+        if processed or failed or removed or not os.path.exists(self._manifest_path):
+            tmp = self._manifest_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"version": VERSION, "files": self.files}, f, ensure_ascii=False, indent=1)
+            os.replace(tmp, self._manifest_path)
+        if log and processed:
+            elapsed = max(time.perf_counter() - started, 1e-6)
+            log(f"{processed} files, {total_rows} rows, {total_bytes / 1048576:.1f} MiB in {elapsed:.2f} s "
+                f"({total_bytes / 1048576 / elapsed:.1f} MiB/s, {total_rows / elapsed:.0f} rows/s, {jobs} jobs)")
+        return processed, skipped, len(removed)
+
+    def _remove_output(self, entry):
+        if entry is None:
+            return
+        output = os.path.join(self.sessions_dir, entry["output"])
+        if os.path.exists(output):
+            os.remove(output)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Normalise corpus sessions into typed JSON Lines.")
+    parser.add_argument("paths", nargs="+", help="session files or directories (data, uploads)")
+    parser.add_argument("-o", "--output", default=os.environ.get("CORPUS_NORMALIZED",
+                                                                 os.path.join("store", "normalized")),
+                        help="output directory (default %(default)s, or $CORPUS_NORMALIZED)")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="files normalised in parallel (default: number of CPUs)")
+    args = parser.parse_args(argv)
+    corpus = NormalizedCorpus(args.output)
+    processed, skipped, removed = corpus.update(session_files(args.paths), args.jobs, log=print)
+    print(f"{processed} normalised, {skipped} unchanged, {removed} removed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+"""
+Streaming row reader for session JSON files.
+
+    for row in RowReader("data/corpus_2025-09-27T05-47-09-841Z.json", skip_heavy=True):
+        row["Bar"], row.typed("MidNum")        # "20", [48, 67, 72, 76]
+
+Both on-disk variants are read the same way: data/ files are
+{"rows": [...], "meta": ...}, uploads/ files a bare list of rows.  The
+file is read in fixed-size chunks and rows are yielded as they complete,
+so memory holds one row plus one chunk however large the session is.
+Projected-out values (`columns=`, `skip_heavy=`) are stepped over without
+being decoded; a base64 Photo costs one str.find, not a 30 KB string.
+"""
+import json
+import re
+
+from .values import is_heavy, parse
+
+CHUNK = 1 << 16
+
+_NON_WHITESPACE = re.compile(r"[^ \t\n\r]")
+# Fast path for the common cell: "key": "value" without escapes, then ',' or '}'.
+# Match objects slice lazily, so a skipped Photo is never copied out.
+_PLAIN_PAIR = re.compile(r'[ \t\n\r]*"([^"\\]*)"[ \t\n\r]*:[ \t\n\r]*"([^"\\]*)"[ \t\n\r]*([,}])')
+# Characters a JSON number can be made of: if they run to the end of the
+# buffer, the number may go on in the next chunk ("1." + "5", "-2" + "e3").
+_NUMBER_END = re.compile(r"[^0-9+\-.eE]")
+_decoder = json.JSONDecoder()
+_scanstring = json.decoder.scanstring
+
+
+class Row(dict):
+    """A row of raw cell strings; typed() parses one cell on demand (see values.parse)."""
+
+    __slots__ = ()
+
+    def typed(self, key, default=None):
+        value = self.get(key)
+        if value is None:
+            return default
+        parsed = parse(key, value)
+        return default if parsed is None else parsed
+
+
+class RowReader:
+    """
+    Iterate the rows of one session file.  `columns` keeps only those keys
+    (or those it returns true for, if callable); `skip_heavy` drops Photo
+    and the spectrum bins.  After iteration,
+    `layout` is "list" or "object" and `meta` holds the object variant's
+    other top-level values.
+    """
+
+    def __init__(self, path, columns=None, skip_heavy=False, chunk=CHUNK):
+        self.path = path
+        self.chunk = chunk
+        self.layout = None
+        self.meta = {}
+        if callable(columns):
+            self._keep = columns
+        elif columns is not None:
+            wanted = frozenset(columns)
+            self._keep = wanted.__contains__
+        elif skip_heavy:
+            decided = {}
+
+            def keep(key):
+                k = decided.get(key)
+                if k is None:
+                    k = decided[key] = not is_heavy(key)
+                return k
+            self._keep = keep
+        else:
+            self._keep = None
+        self._f = None
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def __iter__(self):
+        with open(self.path, encoding="utf-8") as f:
+            self._f, self._buf, self._pos, self._eof = f, "", 0, False
+            c = self._peek()
+            if c == "[":
+                self.layout = "list"
+                yield from self._rows()
+            elif c == "{":
+                self.layout = "object"
+                yield from self._object_rows()
+            else:
+                raise ValueError(f"{self.path}: not a corpus session (starts with {c!r})")
+            self._f = None
+
+    # --- document structure -----------------------------------------------
+
+    def _object_rows(self):
+        self._pos += 1
+        if self._peek() == "}":
+            return
+        while True:
+            key = self._string()
+            self._expect(":")
+            if key == "rows" and self._peek() == "[":
+                yield from self._rows()
+            else:
+                self.meta[key] = self._value()
+            if self._separator("}"):
+                return
+
+    def _rows(self):
+        self._pos += 1
+        if self._peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            if self._peek() != "{":
+                raise ValueError(f"{self.path}: not a corpus session (rows must be objects)")
+            yield self._row()
+            if self._separator("]"):
+                return
+
+    def _row(self):
+        keep = self._keep
+        row = Row()
+        self._pos += 1
+        if self._peek() == "}":
+            self._pos += 1
+            return row
+        plain = _PLAIN_PAIR.match
+        while True:
+            buf, pos = self._buf, self._pos
+            m = plain(buf, pos)
+            while m is not None:
+                key, close = m.group(1, 3)
+                if keep is None or keep(key):
+                    row[key] = m.group(2)
+                pos = m.end()
+                if close == "}":
+                    self._pos = pos
+                    return row
+                m = plain(buf, pos)
+            self._pos = pos
+            key = self._string()
+            self._expect(":")
+            if keep is None or keep(key):
+                row[key] = self._value()
+            else:
+                self._skip_value()
+            if self._separator("}"):
+                return row
+
+    # --- tokens -------------------------------------------------------------
+
+    def _fill(self):
+        """Drop what has been consumed and append the next chunk; False at end of file."""
+        if self._eof:
+            return False
+        # Read at least as much as is pending, so a token spanning many chunks
+        # (a long photo) is rescanned a logarithmic number of times, not once per chunk.
+        data = self._f.read(max(self.chunk, len(self._buf) - self._pos))
+        if not data:
+            self._eof = True
+            return False
+        self._buf = self._buf[self._pos:] + data
+        self._pos = 0
+        return True
+
+    def _peek(self):
+        while True:
+            m = _NON_WHITESPACE.search(self._buf, self._pos)
+            if m is not None:
+                self._pos = m.start()
+                return m.group()
+            self._pos = len(self._buf)
+            if not self._fill():
+                return ""
+
+    def _expect(self, char):
+        if self._peek() != char:
+            raise ValueError(f"{self.path}: expected {char!r} at offset {self._pos}")
+        self._pos += 1
+
+    def _separator(self, close):
+        """Consume ',' (False) or the closing bracket (True)."""
+        c = self._peek()
+        self._pos += 1
+        if c == ",":
+            return False
+        if c == close:
+            return True
+        raise ValueError(f"{self.path}: expected ',' or {close!r}, got {c!r}")
+
+    def _string(self):
+        if self._peek() != '"':
+            raise ValueError(f"{self.path}: expected a string at offset {self._pos}")
+        while True:
+            try:
+                value, end = _scanstring(self._buf, self._pos + 1)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            self._pos = end
+            return value
+
+    def _value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # A number reaching the end of the buffer may continue in the next chunk.
+            if (isinstance(value, (int, float)) and _NUMBER_END.search(self._buf, self._pos) is None
+                    and self._fill()):
+                continue
+            self._pos = end
+            return value
+
+    def _skip_value(self):
+        if self._peek() != '"':
+            self._value()  # numbers, literals and (rare) nested values: small, just decode
+            return
+        pos = self._pos + 1
+        while True:
+            buf = self._buf
+            j = buf.find('"', pos)
+            if j == -1:
+                # Keep a trailing run of backslashes: whether the next quote is escaped depends on it.
+                pos = len(buf.rstrip("\\"))
+                self._pos = pos
+                if not self._fill():
+                    raise ValueError(f"{self.path}: unterminated string")
+                pos = 0
+                continue
+            k = j
+            while k > pos and buf[k - 1] == "\\":
+                k -= 1
+            if (j - k) % 2 == 0:
+                self._pos = j + 1
+                return
+            pos = j + 1
+
+
+def read_rows(path, columns=None, skip_heavy=False):
+    """Shorthand for iterating RowReader(path, columns, skip_heavy)."""
+    return iter(RowReader(path, columns=columns, skip_heavy=skip_heavy))
+
+
+def column_names(path):
+    """Every key of a session in first-seen order; one pass, no value is decoded."""
+    names = {}
+
+    def keep(key):
+        names.setdefault(key, None)
+        return False
+    for _ in RowReader(path, columns=keep):
+        pass
+    return list(names)
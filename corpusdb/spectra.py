@@ -0,0 +1,117 @@
+"""
+Vectorized access to the packed spectrum matrix of a stored session.
+
+    session = CorpusStore("store").open("corpus_2025-09-27T05-47-09-841Z")
+    spectrum = session.matrix("spectrum")          # rows x 256 float32, memory-mapped
+    bars, means = per_bar_mean(spectrum.values, bar_numbers(session))
+    bands = band_aggregate(spectrum.values, spectrum.edges)
+    stats = spectral_stats(spectrum.values, spectrum.edges)
+
+Cells without a number are NaN in the matrix; every helper here ignores
+them instead of propagating them, and reports NaN only where a row (or
+bar) has no numbers at all.
+"""
+import numpy as np
+
+# Audio bands over the 0-24 kHz bins, in Hz.
+AUDIO_BANDS = {
+    "sub": (0.0, 60.0),
+    "bass": (60.0, 250.0),
+    "low_mid": (250.0, 500.0),
+    "mid": (500.0, 2000.0),
+    "high_mid": (2000.0, 4000.0),
+    "presence": (4000.0, 6000.0),
+    "brilliance": (6000.0, 24000.0),
+}
+
+
+def bar_numbers(session, column="Bar"):
+    """Bar of every row as int64, -1 where the cell holds none."""
+    col = session.column(column)
+    return np.where(col.valid(), col.typed(), -1).astype(np.int64)
+
+
+def per_bar_mean(values, bars, valid=None):
+    """
+    Mean of each column over the rows of each bar: (bar numbers, (bars, k)
+    float64 means).  Rows with a negative bar, or False in `valid`, are
+    left out; NaN cells are skipped per column.
+    """
+    bars = np.asarray(bars)
+    keep = bars >= 0
+    if valid is not None:
+        keep &= np.asarray(valid, dtype=bool)
+    rows = np.flatnonzero(keep)
+    rows = rows[np.argsort(bars[rows], kind="stable")]
+    if not rows.size:
+        return np.zeros(0, dtype=np.int64), np.zeros((0,) + values.shape[1:])
+    sorted_bars = bars[rows]
+    starts = np.flatnonzero(np.r_[True, sorted_bars[1:] != sorted_bars[:-1]])
+    block = np.asarray(values[rows], dtype=np.float64)
+    present = ~np.isnan(block)
+    sums = np.add.reduceat(np.where(present, block, 0.0), starts, axis=0)
+    counts = np.add.reduceat(present, starts, axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = sums / counts
+    return sorted_bars[starts].astype(np.int64), means
+
+
+def band_weights(edges, bands):
+    """
+    (k, len(bands)) matrix: the fraction of each bin's [low, high) that
+    falls inside each band, so values @ weights sums power per band.
+    """
+    edges = np.asarray(edges, dtype=np.float64)
+    lo, hi = edges[:, 0:1], edges[:, 1:2]
+    band_lo = np.array([b[0] for b in bands.values()])
+    band_hi = np.array([b[1] for b in bands.values()])
+    overlap = np.clip(np.minimum(hi, band_hi) - np.maximum(lo, band_lo), 0.0, None)
+    width = np.where(hi > lo, hi - lo, 1.0)
+    return overlap / width
+
+
+def band_aggregate(values, edges, bands=AUDIO_BANDS):
+    """
+    Sum of the bins in each band, per row: {band: (rows,) float64}.  NaN
+    bins count as zero; a row with no numbers in a band gives NaN.
+    """
+    weights = band_weights(edges, bands)
+    values = np.asarray(values, dtype=np.float64)
+    present = ~np.isnan(values)
+    sums = np.where(present, values, 0.0) @ weights
+    covered = present.astype(np.float64) @ (weights > 0)
+    sums[covered == 0] = np.nan
+    return {name: sums[:, b] for b, name in enumerate(bands)}
+
+
+def spectral_stats(values, edges, rolloff=0.85):
+    """
+    Per-row spectral descriptors of a magnitude matrix, {name: (rows,) float64}:
+    centroid and spread (Hz), flatness (geometric over arithmetic mean),
+    rolloff (Hz below which `rolloff` of the total lies), peak (Hz of the
+    largest bin) and total.  NaN bins are treated as zero.
+    """
+    edges = np.asarray(edges, dtype=np.float64)
+    centers = edges.mean(axis=1)
+    values = np.asarray(values, dtype=np.float64)
+    present = ~np.isnan(values)
+    x = np.where(present, np.abs(values), 0.0)
+    total = x.sum(axis=1)
+    empty = ~present.any(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        centroid = (x @ centers) / total
+        spread = np.sqrt((x @ centers ** 2) / total - centroid ** 2)
+        n = np.maximum(present.sum(axis=1), 1)
+        log_mean = np.where(present, np.log(np.where(x > 0, x, 1e-12)), 0.0).sum(axis=1) / n
+        flatness = np.exp(log_mean) / (total / n)
+    cumulative = np.cumsum(x, axis=1)
+    k = (cumulative < rolloff * total[:, None]).sum(axis=1)
+    stats = {
+        "centroid": centroid,
+        "spread": spread,
+        "flatness": flatness,
+        "rolloff": np.where(total > 0, centers[np.minimum(k, len(centers) - 1)], np.nan),
+        "peak": np.where(total > 0, centers[np.argmax(x, axis=1)], np.nan),
+        "total": total,
+    }
+    return {name: np.where(empty, np.nan, column) for name, column in stats.items()}
@@ -0,0 +1,273 @@
+import json
+import os
+import shutil
+
+import numpy as np
+
+from . import columns
+from .blobs import BlobStore
+from .values import MATRIX_GROUPS, column_edges, column_kind
+
+FORMAT = "corpusdb/2"
+
+DATA_FILE = "columns.bin"
+ALIGN = 64  # every array starts on a 64-byte boundary of the data file
+
+
+def session_name(path):
+    """data/corpus_2025-09-26T10-38-32-428Z.json -> corpus_2025-09-26T10-38-32-428Z"""
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def dump_json(document, f):
+    # The frontend saves with JSON.stringify(..., null, 2); this reproduces it byte for byte.
+    json.dump(document, f, indent=2, ensure_ascii=False)
+
+
+def split_document(document):
+    """
+    (rows, layout) for either on-disk variant: data/ files are
+    {"rows": [...], "meta": ...}, uploads/ files a bare list of rows.
+    """
+    if isinstance(document, list):
+        rows, layout = document, {"type": "list"}
+    elif isinstance(document, dict) and isinstance(document.get("rows"), list):
+        rows = document["rows"]
+        layout = {"type": "object", "keys": list(document),
+                  "extra": {k: v for k, v in document.items() if k != "rows"}}
+    else:
+        raise ValueError("not a corpus session (expected a row list or {\"rows\": [...]})")
+    if not all(isinstance(row, dict) for row in rows):
+        raise ValueError("not a corpus session (rows must be objects)")
+    return rows, layout
+
+
+class _ArrayWriter:
+    """Appends arrays to one data file; each gets a [dtype, shape, offset] entry for the manifest."""
+
+    def __init__(self, f):
+        self.f = f
+        self.offset = 0
+
+    def add(self, array):
+        array = np.ascontiguousarray(array)
+        pad = -self.offset % ALIGN
+        if pad:
+            self.f.write(b"\0" * pad)
+            self.offset += pad
+        entry = [array.dtype.str, list(array.shape), self.offset]
+        self.f.write(array.tobytes())
+        self.offset += array.nbytes
+        return entry
+
+
+def _view(data, entry):
+    dtype, shape, offset = entry
+    dtype = np.dtype(dtype)
+    count = int(np.prod(shape, dtype=np.int64))
+    return data[offset:offset + count * dtype.itemsize].view(dtype).reshape(shape)
+
+
+class CorpusStore:
+    """
+    Columnar corpus storage.
+
+        <root>/blobs/ab/ab12...          photos, content-addressed (BlobStore)
+        <root>/sessions/<name>/manifest.json
+        <root>/sessions/<name>/columns.bin
+
+    A session is one JSON file, column by column: typed arrays packed
+    (aligned) into columns.bin, which opens memory-mapped; dtype, shape
+    and offset of every array, string dictionaries and column specs in
+    the manifest; photos as sha256 digests.  The spectrum bins and the
+    numbered block columns are each one rows x k float32 matrix, with
+    the bin edges kept once in the manifest.  import_json() and
+    export_json() round-trip the original file byte for byte.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.blobs = BlobStore(os.path.join(root, "blobs"))
+        self.sessions_dir = os.path.join(root, "sessions")
+
+    def sessions(self):
+        if not os.path.isdir(self.sessions_dir):
+            return []
+        return sorted(name for name in os.listdir(self.sessions_dir)
+                      if os.path.exists(os.path.join(self.sessions_dir, name, "manifest.json")))
+
+    def __contains__(self, name):
+        return os.path.exists(os.path.join(self.sessions_dir, name, "manifest.json"))
+
+    def open(self, name, mmap=True):
+        return Session(os.path.join(self.sessions_dir, name), self.blobs, mmap=mmap)
+
+    # --- JSON <-> columns --------------------------------------------------
+
+    def import_json(self, path, name=None):
+        with open(path, encoding="utf-8") as f:
+            document = json.load(f)
+        return self.write_session(name or session_name(path), document, source=os.path.basename(path))
+
+    def export_json(self, name, path):
+        document = self.open(name).document()
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            dump_json(document, f)
+        os.replace(tmp, path)
+
+    def write_session(self, name, document, source=None):
+        rows, layout = split_document(document)
+
+        names, seen = [], set()
+        orders, order_index = [], {}
+        row_order = np.zeros(len(rows), dtype=np.uint16)
+        for i, row in enumerate(rows):
+            keys = tuple(row)
+            k = order_index.get(keys)
+            if k is None:
+                k = order_index[keys] = len(orders)
+                orders.append(list(keys))
+                for key in keys:
+                    if key not in seen:
+                        seen.add(key)
+                        names.append(key)
+            row_order[i] = k
+
+        tmp = os.path.join(self.sessions_dir, f".{name}.tmp-{os.getpid()}")
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        grouped = {group: [c for c in names if pattern.match(c)] for group, pattern in MATRIX_GROUPS.items()}
+        in_group = {c for cols in grouped.values() for c in cols}
+        specs, groups = [], []
+        with open(os.path.join(tmp, DATA_FILE), "wb") as f:
+            writer = _ArrayWriter(f)
+            for group, cols in grouped.items():
+                if not cols:
+                    continue
+                present = np.array([[c in row for c in cols] for row in rows], dtype=bool)
+                present = present.reshape(len(rows), len(cols))
+                spec, arrays = columns.encode_matrix([[row.get(c) for row in rows] for c in cols], present)
+                edges = [column_edges(c) for c in cols]
+                spec = {"name": group, "columns": cols,
+                        "edges": None if None in edges else [list(e) for e in edges], **spec,
+                        "arrays": {part: writer.add(array) for part, array in arrays.items()}}
+                groups.append(spec)
+            for column in names:
+                if column in in_group:
+                    continue
+                present = np.fromiter((column in row for row in rows), dtype=bool, count=len(rows))
+                values = [row.get(column) for row in rows]
+                spec, arrays = columns.encode(values, present, column_kind(column), self.blobs)
+                spec = {"name": column, **spec,
+                        "arrays": {part: writer.add(array) for part, array in arrays.items()}}
+                specs.append(spec)
+            row_order = writer.add(row_order) if len(orders) > 1 else None
+
+        manifest = {"format": FORMAT, "source": source, "rows": len(rows), "layout": layout,
+                    "orders": orders, "row_order": row_order, "names": names, "columns": specs,
+                    "groups": groups}
+        with open(os.path.join(tmp, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False)
+
+        final = os.path.join(self.sessions_dir, name)
+        old = f"{final}.old-{os.getpid()}"
+        if os.path.exists(final):
+            os.replace(final, old)
+        os.replace(tmp, final)
+        shutil.rmtree(old, ignore_errors=True)
+        return self.open(name)
+
+
+class Session:
+    """
+    One stored session.  Columns load on first use (memory-mapped unless
+    `mmap=False`); photos are read from the blob store only when a Photo
+    cell or photo() is asked for.
+    """
+
+    def __init__(self, path, blobs, mmap=True):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.blobs = blobs
+        with open(os.path.join(path, "manifest.json"), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("format") != FORMAT:
+            raise ValueError(f"{path}: store format {self.manifest.get('format')!r}, "
+                             f"expected {FORMAT!r}; re-import the session")
+        data = os.path.join(path, DATA_FILE)
+        if mmap and os.path.getsize(data):
+            self._data = np.memmap(data, dtype=np.uint8, mode="r")
+        else:
+            self._data = np.fromfile(data, dtype=np.uint8)
+        self._specs = {spec["name"]: spec for spec in self.manifest["columns"]}
+        self._groups = {spec["name"]: spec for spec in self.manifest["groups"]}
+        self._group_of = {c: (spec["name"], j) for spec in self.manifest["groups"]
+                          for j, c in enumerate(spec["columns"])}
+        self._matrices = {}
+        self._columns = {}
+        self._row_order = None
+
+    def __len__(self):
+        return self.manifest["rows"]
+
+    @property
+    def columns(self):
+        return list(self.manifest["names"])
+
+    def column(self, name):
+        col = self._columns.get(name)
+        if col is None:
+            if name in self._group_of:
+                group, j = self._group_of[name]
+                col = columns.MatrixColumn(self.matrix(group), j)
+            else:
+                spec = self._specs[name]
+                arrays = {part: _view(self._data, entry) for part, entry in spec["arrays"].items()}
+                col = columns.Column(name, spec, arrays, self.blobs)
+            self._columns[name] = col
+        return col
+
+    def matrix(self, group="spectrum"):
+        """The packed float32 matrix of a column group ("spectrum" or "blocks"), or None."""
+        m = self._matrices.get(group)
+        if m is None:
+            spec = self._groups.get(group)
+            if spec is None:
+                return None
+            arrays = {part: _view(self._data, entry) for part, entry in spec["arrays"].items()}
+            m = self._matrices[group] = columns.Matrix(group, spec, arrays)
+        return m
+
+    def photo(self, i, column="Photo"):
+        """Raw image bytes of row `i`, or None where the cell holds no photo."""
+        hexdigest = self.column(column).digest(i)
+        return None if hexdigest is None else self.blobs.get(hexdigest)
+
+    def row_keys(self, i):
+        orders = self.manifest["orders"]
+        if len(orders) == 1:
+            return orders[0]
+        if self._row_order is None:
+            self._row_order = _view(self._data, self.manifest["row_order"])
+        return orders[self._row_order[i]]
+
+    def row(self, i, keys=None):
+        """Row `i` as the original dict; `keys` limits it to those columns."""
+        row_keys = self.row_keys(i)
+        if keys is not None:
+            row_keys = [k for k in row_keys if k in keys]
+        return {k: self.column(k).cell(i) for k in row_keys}
+
+    def rows(self, keys=None):
+        for i in range(len(self)):
+            yield self.row(i, keys)
+
+    def document(self):
+        """The session as the JSON value it was imported from."""
+        rows = list(self.rows())
+        layout = self.manifest["layout"]
+        if layout["type"] == "list":
+            return rows
+        extra = layout["extra"]
+        return {k: rows if k == "rows" else extra[k] for k in layout["keys"]}
@@ -0,0 +1,109 @@
+"""
+Cell grammar of the session files, shared by the columnar codecs and the
+streaming reader.  Every cell is a string; the typed ones look like
+
+    int      "78", "-3"
+    float    "0.19", "3.076923076923077", "-472821.00"
+    intlist  "[48, 67, 72, 76]" (MidNum), "[0 - 4 - 7]" (PitchClassSet), "[36]"
+
+and "-", "", "---", "[-]" mean "no value".  The parse_* helpers return
+None for anything that does not fit.
+"""
+import datetime
+import re
+
+MISSING = frozenset(("-", "", "---", "[-]"))
+DATE_FORMAT = "%m/%d/%Y, %I:%M:%S %p"  # "9/26/2025, 6:37:55 AM" (toLocaleString en-US)
+
+INT = re.compile(r"(?:0|-?[1-9][0-9]*)\Z")  # canonical spelling only (what the codecs can rebuild)
+_DIGITS = re.compile(r"-?[0-9]+\Z")
+FLOAT = re.compile(r"-?[0-9]+(?:\.([0-9]+))?\Z")
+INTLIST = re.compile(r"\[(-?[0-9]+(?:(, | - )-?[0-9]+)*)?\]\Z")
+
+# Codec per column where the type is known up front; anything else is inferred
+# (see columns.encode).  A typed column keeps odd cells ("-", "", "[-]") verbatim.
+COLUMN_KINDS = {
+    "Photo": "blob",
+    "#": "int",
+    "Tempo": "float",
+    "ms": "float",
+    "Qua": "int",
+    "Beat": "int",
+    "Bar": "int",
+    "jsSenMem": "float",
+    "Bass": "int",
+    "SopPc": "int",
+    "FER": "intlist",
+    "Key": "intlist",
+    "PitchClassSet": "intlist",
+    "UpdatedMod": "intlist",
+    "MidNum": "intlist",
+}
+
+# "0.0–93.8 Hz" ... "23906.2–24000.0 Hz": the 256 spectrum bins.
+SPECTRUM_COLUMN = re.compile(r"([0-9.]+)–([0-9.]+) Hz\Z")
+# "1.3" ... "8.0": the numbered block columns (data-block="1-3" in index.html).
+BLOCK_COLUMN = re.compile(r"[0-9]\.[0-9]\Z")
+
+# Column families stored as one packed float32 matrix each (see columns.encode_matrix).
+MATRIX_GROUPS = {"spectrum": SPECTRUM_COLUMN, "blocks": BLOCK_COLUMN}
+
+
+def column_kind(name):
+    if name in COLUMN_KINDS:
+        return COLUMN_KINDS[name]
+    if SPECTRUM_COLUMN.match(name):
+        return "float"
+    return None
+
+
+def column_edges(name):
+    """(low, high) in Hz from a spectrum label, else None."""
+    m = SPECTRUM_COLUMN.match(name)
+    return (float(m.group(1)), float(m.group(2))) if m else None
+
+
+def is_heavy(name):
+    """Photo and the spectrum bins: the columns an analysis scan usually skips."""
+    return name == "Photo" or SPECTRUM_COLUMN.match(name) is not None
+
+
+def parse_int(value):
+    if isinstance(value, str) and _DIGITS.match(value):
+        return int(value)
+    return None
+
+
+def parse_float(value):
+    if isinstance(value, str) and FLOAT.match(value):
+        return float(value)
+    return None
+
+
+def parse_intlist(value):
+    m = INTLIST.match(value) if isinstance(value, str) else None
+    if m is None:
+        return None
+    if not m.group(1):
+        return []
+    parts = m.group(1).split(m.group(2) or ",")
+    if not all(_DIGITS.match(p) for p in parts):
+        return None  # mixed separators
+    return [int(p) for p in parts]
+
+
+def parse_datetime(value):
+    """Performance Date -> naive datetime (local wall clock of the recording), or None."""
+    try:
+        return datetime.datetime.strptime(value, DATE_FORMAT)
+    except (TypeError, ValueError):
+        return None
+
+
+PARSERS = {"int": parse_int, "float": parse_float, "intlist": parse_intlist}
+
+
+def parse(name, value):
+    """`value` of column `name` as int / float / list of ints, by column_kind(); else unchanged."""
+    parser = PARSERS.get(column_kind(name))
+    return value if parser is None else parser(value)
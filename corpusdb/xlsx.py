@@ -0,0 +1,188 @@
+"""
+Streaming XLSX export of session JSON files.
+
+    python -m corpusdb.xlsx data/*.json uploads/table_*.json -o exports -j 4
+    python -m corpusdb.xlsx data/corpus_2025-09-27T05-47-09-841Z.json --photos link
+
+Rows go from RowReader straight into an xlsxwriter workbook in
+constant_memory mode, which flushes each row to a temp file as soon as the
+next one starts, and photos are spooled to files the packager reads at
+close, so memory holds one row and one photo however long the session is.
+The sheet follows the frontend's "Export XLSX": one "Data" sheet, frozen
+header, every cell as its original text, photos as 72 px pictures in their
+cell.  `--photos link` writes them to <name>_photos/ next to the workbook
+and links the cell instead; `--photos omit` leaves the column out.
+
+Needs xlsxwriter (pip install xlsxwriter).
+"""
+import argparse
+import base64
+import binascii
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .reader import RowReader, column_names
+from .store import session_name
+
+PHOTO_MODES = ("embed", "link", "omit")
+PHOTO_COLUMN = "Photo"
+PHOTO_PX = 72     # thumbnail size of the frontend's export
+ROW_HEIGHT = 54   # points, = 72 px
+PHOTO_WIDTH = 12  # characters
+
+_DATA_URL = re.compile(r"data:image/([\w+.-]+);base64,")
+_EXTENSIONS = {"jpeg": "jpg", "svg+xml": "svg"}
+
+
+def _photo(cell):
+    """(bytes, extension) of a data-URL photo cell, else None."""
+    m = _DATA_URL.match(cell) if isinstance(cell, str) else None
+    if m is None:
+        return None
+    try:
+        data = base64.b64decode(cell[m.end():], validate=True)
+    except (binascii.Error, ValueError):
+        return None
+    return data, _EXTENSIONS.get(m.group(1), m.group(1))
+
+
+def _save(directory, data, ext):
+    """Write photo bytes once under their sha256 and return the path."""
+    path = os.path.join(directory, f"{hashlib.sha256(data).hexdigest()}.{ext}")
+    if not os.path.exists(path):
+        tmp = f"{path}.tmp-{os.getpid()}"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    return path
+
+
+def export_xlsx(path, output, photos="embed"):
+    """Write session file `path` to the workbook `output`; returns the number of rows."""
+    import xlsxwriter
+    from xlsxwriter.image import Image
+
+    if photos not in PHOTO_MODES:
+        raise ValueError(f"photos must be one of {', '.join(PHOTO_MODES)}")
+    names = column_names(path)
+    if not names:
+        raise ValueError("no rows to export")
+    if photos == "omit":
+        names = [name for name in names if name != PHOTO_COLUMN]
+    col_of = {name: j for j, name in enumerate(names)}
+    photo_col = col_of.get(PHOTO_COLUMN)
+    out_dir = os.path.dirname(os.path.abspath(output))
+    link_dir = os.path.splitext(os.path.abspath(output))[0] + "_photos"
+
+    with tempfile.TemporaryDirectory(prefix="xlsx-photos-") as spool:
+        workbook = xlsxwriter.Workbook(output, {"constant_memory": True})
+        sheet = workbook.add_worksheet("Data")
+        bold = workbook.add_format({"bold": True})
+        sheet.freeze_panes(1, 0)
+        if photo_col is not None and photos == "embed":
+            sheet.set_column(photo_col, photo_col, PHOTO_WIDTH)
+        for j, name in enumerate(names):
+            sheet.write_string(0, j, name, bold)
+
+        n = 0
+        for n, row in enumerate(RowReader(path, columns=col_of), 1):
+            for key, value in row.items():
+                j = col_of[key]
+                if j == photo_col:
+                    photo = _photo(value)
+                    if photo is not None and photos == "embed":
+                        image = Image(_save(spool, *photo))
+                        sheet.set_row(n, ROW_HEIGHT)
+                        sheet.insert_image(n, j, image, {"x_scale": PHOTO_PX / image.width,
+                                                         "y_scale": PHOTO_PX / image.height,
+                                                         "object_position": 2})
+                        continue
+                    if photo is not None:
+                        os.makedirs(link_dir, exist_ok=True)
+                        target = os.path.relpath(_save(link_dir, *photo), out_dir)
+                        sheet.write_url(n, j, "external:" + target, string=os.path.basename(target))
+                        continue
+                if not isinstance(value, str):
+                    value = json.dumps(value, ensure_ascii=False)
+                if value:  # "" is a blank cell either way; most spectrum cells are empty
+                    sheet.write_string(n, j, value)
+        workbook.close()
+    return n
+
+
+def _peak_rss_kib():
+    try:
+        import resource
+    except ImportError:  # not on Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def _export_one(path, output, photos):
+    started = time.perf_counter()
+    rows = export_xlsx(path, output, photos)
+    return rows, time.perf_counter() - started, _peak_rss_kib()
+
+
+def _try_export(task):
+    try:
+        return _export_one(*task)
+    except (ValueError, OSError) as e:
+        return e
+
+
+def export_files(paths, out_dir, photos="embed", jobs=None):
+    """Export each file to <out_dir>/<name>.xlsx, `jobs` files at a time; returns the failure count."""
+    os.makedirs(out_dir, exist_ok=True)
+    tasks = [(path, os.path.join(out_dir, session_name(path) + ".xlsx"), photos) for path in paths]
+    jobs = min(jobs or os.cpu_count() or 1, len(tasks))
+    if jobs <= 1:
+        return _report(tasks, map(_try_export, tasks))
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return _report(tasks, pool.map(_try_export, tasks))
+
+
+def _report(tasks, results):
+    failed = 0
+    for (path, output, _), result in zip(tasks, results):
+        if isinstance(result, Exception):
+            failed += 1
+            print(f"skip   {path}: {result}")
+            continue
+        rows, elapsed, peak = result
+        line = (f"export {path} -> {output}: {rows} rows, "
+                f"{os.path.getsize(output) / 1024:.0f} KiB in {elapsed * 1000:.0f} ms")
+        if peak is not None:
+            line += f", worker peak RSS {peak / 1024:.0f} MiB"
+        print(line)
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export corpus JSON sessions as XLSX workbooks.")
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("-o", "--output-dir", default=".", help="directory for the workbooks (default %(default)s)")
+    parser.add_argument("--photos", choices=PHOTO_MODES, default="embed",
+                        help="embed photos in their cell, link to files next to the workbook, or omit them")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="sessions exported in parallel (default: number of CPUs)")
+    args = parser.parse_args(argv)
+    try:
+        import xlsxwriter  # noqa: F401
+    except ImportError:
+        sys.exit("xlsxwriter is required for XLSX export: pip install xlsxwriter")
+    started = time.perf_counter()
+    failed = export_files(args.files, args.output_dir, args.photos, args.jobs)
+    print(f"{len(args.files) - failed} of {len(args.files)} sessions in {time.perf_counter() - started:.1f} s")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
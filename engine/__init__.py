@@ -0,0 +1,8 @@
+"""
+Live engine: MIDI, UDP 9401 and browser control in; state frames over
+WebSocket and LiveOSC commands out.  Importing the package has no side
+effects; see Engine for the lifecycle and engine.cli for the entry point.
+"""
+from .core import Engine
+
+__all__ = ["Engine"]
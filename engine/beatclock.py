@@ -0,0 +1,138 @@
+import math
+import time
+
+GRID_UNITS = ("beat", "bar", "off")
+
+
+class BeatClock:
+    """
+    Local beat grid on the monotonic nanosecond clock, phase-locked to
+    Ableton's bar messages.
+
+    The grid is an anchor (bar number, beats into that bar, monotonic ns)
+    plus the length of a beat, so position() is a subtraction and a divmod.
+    Tempo and meter changes re-anchor at the current position: the grid
+    changes speed, it does not jump.
+
+    Every new bar number from UDP marks that bar's downbeat.  The grid's
+    distance from it is the grid error; `gain` of the error is corrected
+    at once (phase) and the beat length is nudged by `rate_gain` of it
+    (frequency), so the grid follows Ableton's tempo even when it was
+    tapped rather than sent.  The first bar, a bar number that is not the
+    next one (seek, loop) or an error beyond `resync` bars snaps the grid
+    onto the message; after a snap between consecutive bars the beat length
+    is taken from the measured bar.  Until the first bar message the grid
+    is free-running and `locked` is False.
+    """
+
+    def __init__(self, tempo=120.0, numerator=4, gain=0.5, rate_gain=0.1, resync=0.5,
+                 clock=time.monotonic_ns):
+        self.clock = clock
+        self.gain = gain
+        self.rate_gain = rate_gain
+        self.resync = resync
+        self.tempo = float(tempo) if tempo and tempo > 0 else 120.0
+        self.numerator = max(1, int(numerator))
+        self.ratio = 1.0  # frequency correction learned from the bar messages
+        self.locked = False
+        self.last_bar = None
+        self.last_error = None  # seconds, grid minus the latest bar message
+        self.resyncs = 0
+        self._bar_ns = None  # when the latest bar message arrived
+        self._bar0 = 1
+        self._beats0 = 0.0
+        self._ns0 = clock()
+        self._beat_ns = 60e9 / self.tempo
+
+    # --- position -----------------------------------------------------------
+
+    def beats(self, now=None):
+        """Beats since the downbeat of the anchor bar (float)."""
+        if now is None:
+            now = self.clock()
+        return self._beats0 + (now - self._ns0) / self._beat_ns
+
+    def position(self, now=None):
+        """(bar, beat, fraction): bar and beat are 1-based, fraction in [0, 1)."""
+        bars, in_bar = divmod(self.beats(now), self.numerator)
+        beat = int(in_bar)
+        return self._bar0 + int(bars), beat + 1, in_bar - beat
+
+    @property
+    def bpm(self):
+        """Tempo the grid is actually running at (set tempo x learned ratio)."""
+        return self.tempo * self.ratio
+
+    def boundary(self, now, unit="beat", rounding=math.ceil):
+        """
+        Monotonic ns of the `unit` boundary at or after `now` (`rounding=round`:
+        nearest); `unit` is "beat", "bar" or a length in beats (0.25: sixteenths).
+        """
+        step = self.numerator if unit == "bar" else 1 if unit == "beat" else float(unit)
+        k = rounding(self.beats(now) / step - 1e-9) * step
+        return self._ns0 + round((k - self._beats0) * self._beat_ns)
+
+    def align(self, seconds, unit="beat"):
+        """
+        Monotonic time in seconds moved forward to the next `unit` boundary;
+        unchanged while the grid is not locked or `unit` is "off".
+        """
+        if not self.locked or unit == "off":
+            return seconds
+        return self.boundary(int(seconds * 1e9), unit) / 1e9
+
+    # --- inputs -------------------------------------------------------------
+
+    def set_tempo(self, bpm, now=None):
+        if not bpm or bpm <= 0:
+            return
+        self._reanchor(now)
+        self.tempo = float(bpm)
+        self.ratio = 1.0
+        self._beat_ns = 60e9 / self.tempo
+
+    def set_numerator(self, numerator, now=None):
+        self._reanchor(now)
+        self.numerator = max(1, int(numerator))
+
+    def on_bar(self, bar, now=None):
+        """
+        Downbeat of `bar` seen at `now`; returns the grid error in seconds
+        (positive: the grid was ahead), or None when the message only
+        (re)synchronised the grid or repeated the current bar.
+        """
+        if now is None:
+            now = self.clock()
+        bar = int(bar)
+        if bar == self.last_bar:
+            return None
+        consecutive = self.last_bar is not None and bar == self.last_bar + 1
+        previous_ns, self._bar_ns = self._bar_ns, now
+        self.last_bar = bar
+        error = self.beats(now) + (self._bar0 - bar) * self.numerator  # in beats
+
+        if not (self.locked and consecutive and abs(error) <= self.resync * self.numerator):
+            if self.locked:
+                self.resyncs += 1
+            if consecutive and previous_ns is not None and now > previous_ns:
+                measured = (now - previous_ns) / self.numerator
+                self.ratio = min(2.0, max(0.5, 60e9 / self.tempo / measured))
+                self._beat_ns = 60e9 / self.bpm
+            self._bar0, self._beats0, self._ns0 = bar, 0.0, now
+            self.locked = True
+            self.last_error = None
+            return None
+
+        self.last_error = error * self._beat_ns / 1e9
+        self._bar0, self._beats0, self._ns0 = bar, error * (1.0 - self.gain), now
+        self.ratio = min(2.0, max(0.5, self.ratio * (1.0 - self.rate_gain * error / self.numerator)))
+        self._beat_ns = 60e9 / self.bpm
+        return self.last_error
+
+    def _reanchor(self, now=None):
+        if now is None:
+            now = self.clock()
+        bars, in_bar = divmod(self.beats(now), self.numerator)
+        self._bar0 += int(bars)
+        self._beats0 = in_bar
+        self._ns0 = now
@@ -0,0 +1,94 @@
+import argparse
+import asyncio
+import os
+import signal
+
+from .beatclock import GRID_UNITS
+from .core import DEFAULT_MIDI_PORTS, Engine
+from .logsetup import setup_logging
+from .ports import load_port_table
+
+
+def midi_port_arg(value):
+    """'loopMIDI Port 7401 4=7401' -> (port name, label)."""
+    name, sep, label = value.rpartition("=")
+    if not sep or not name or not label:
+        raise argparse.ArgumentTypeError(f"expected NAME=LABEL, got {value!r}")
+    return name, label
+
+
+def build_parser():
+    env = os.environ.get
+    parser = argparse.ArgumentParser(description="Run the live engine.")
+    parser.add_argument("--ws-url", default=env("ENGINE_WS_URL", "ws://localhost:8080"),
+                        help="frontend WebSocket server (default %(default)s)")
+    parser.add_argument("--udp-host", default="127.0.0.1")
+    parser.add_argument("--udp-port", type=int, default=9401, help="UDP ingest port (default %(default)s)")
+    parser.add_argument("--osc-host", default="127.0.0.1")
+    parser.add_argument("--osc-port", type=int, default=11000, help="LiveOSC port (default %(default)s)")
+    parser.add_argument("--osc-window", type=float, default=0.025,
+                        help="seconds over which updateBpm tempo sends are merged (default %(default)s)")
+    parser.add_argument("--tempo", type=float, default=78, help="initial tempo in BPM (default %(default)s)")
+    parser.add_argument("--midi-port", dest="midi_ports", action="append", type=midi_port_arg,
+                        metavar="NAME=LABEL",
+                        help="MIDI input to open and its label (repeatable; default: "
+                             + ", ".join(f"'{n}={l}'" for n, l in DEFAULT_MIDI_PORTS.items()) + ")")
+    parser.add_argument("--midi-port-table", default=env("ENGINE_MIDI_PORTS"), metavar="FILE",
+                        help='JSON port table {"port name": "label", ...}, one entry per performer; '
+                             "--midi-port entries are added to it")
+    parser.add_argument("--no-midi", action="store_true", help="do not open any MIDI input")
+    parser.add_argument("--eeg-rate", type=float, default=float(env("ENGINE_EEG_RATE", "250")),
+                        help="eeg_sample rate in Hz for band powers, 0 = ignore EEG (default %(default)s)")
+    parser.add_argument("--grid", choices=GRID_UNITS, default=env("ENGINE_GRID", "beat"),
+                        help="snap sensory-memory expiry to the beat grid's beats or bars, "
+                             "or leave it on wall time (default %(default)s)")
+    parser.add_argument("--state-rate", type=float, default=60, help="max state frames per second")
+    parser.add_argument("--metrics-port", type=int, default=int(env("ENGINE_METRICS_PORT", "9464")),
+                        help="Prometheus endpoint port, 0 disables (default %(default)s)")
+    parser.add_argument("--telemetry-interval", type=float,
+                        default=float(env("ENGINE_TELEMETRY_INTERVAL", "0")),
+                        help="seconds between telemetry WS messages, 0 = off")
+    parser.add_argument("--record", default=env("ENGINE_RECORD"), metavar="FILE",
+                        help="record every input to a session file (see engine.replay)")
+    parser.add_argument("--row-log", default=env("ENGINE_ROW_LOG"), metavar="FILE",
+                        help="record corpus rows to an append-only log (see engine.rowlog)")
+    parser.add_argument("--fsync-interval", type=float, default=float(env("ENGINE_FSYNC_INTERVAL", "1")),
+                        help="seconds between fsyncs of the row log, 0 = every write (default %(default)s)")
+    parser.add_argument("--row-division", type=int, default=4,
+                        help="rows recorded per beat (default %(default)s: sixteenths)")
+    parser.add_argument("--log-level", default=env("LOG_LEVEL", "INFO"))
+    parser.add_argument("--log-sample-every", type=int, default=int(env("LOG_SAMPLE_EVERY", "0") or 0),
+                        metavar="N", help="enable DEBUG but keep every Nth hot-path record")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    listener = setup_logging(args.log_level, args.log_sample_every)
+    if args.no_midi:
+        midi_ports = {}
+    elif args.midi_ports or args.midi_port_table:
+        midi_ports = load_port_table(args.midi_port_table) if args.midi_port_table else {}
+        midi_ports.update(args.midi_ports or ())
+    else:
+        midi_ports = None
+    engine = Engine(ws_url=args.ws_url, udp_host=args.udp_host, udp_port=args.udp_port,
+                    osc_host=args.osc_host, osc_port=args.osc_port, osc_window=args.osc_window,
+                    tempo=args.tempo,
+                    midi_ports=midi_ports, state_rate=args.state_rate,
+                    metrics_port=args.metrics_port, telemetry_interval=args.telemetry_interval,
+                    record_path=args.record, eeg_rate=args.eeg_rate, grid=args.grid,
+                    row_log=args.row_log, fsync_interval=args.fsync_interval,
+                    row_division=args.row_division)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        stop = asyncio.Event()
+        # Signal handling (signal.signal works on Windows too, unlike loop.add_signal_handler)
+        signal.signal(signal.SIGINT, lambda sig, frame: loop.call_soon_threadsafe(stop.set))
+        await engine.run(stop)
+
+    try:
+        asyncio.run(run())
+    finally:
+        listener.stop()
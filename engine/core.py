@@ -0,0 +1,994 @@
+import asyncio
+import functools
+import json
+import logging
+import time
+
+from .beatclock import GRID_UNITS, BeatClock
+from .expiry import ExpiryScheduler
+from .metrics import Metrics, MetricsServer, StageTimer, counter_collector
+from .osc_out import OscOutput
+from .pitchclass import NOTE_NAMES, PitchClassState, chord_code, chord_name, pitch_class_mask
+from .ports import PortTable
+from .rowlog import RowRecorder
+from .snapshot import StateSnapshot
+from .udp_ingest import UdpIngest
+from .ws_dispatch import MessageDispatcher
+from .ws_sender import WebSocketSender
+
+# Per-subsystem loggers; handlers are installed by the CLI (logsetup.setup_logging).
+# LOG_LEVEL=DEBUG shows per-note traffic, LOG_SAMPLE_EVERY=N shows every Nth of it.
+log = logging.getLogger("engine")
+log_midi = logging.getLogger("engine.midi")
+log_udp = logging.getLogger("engine.udp")
+log_ws = logging.getLogger("engine.ws")
+log_osc = logging.getLogger("engine.osc")
+log_state = logging.getLogger("engine.state")
+log_eeg = logging.getLogger("engine.eeg")
+
+DEFAULT_MIDI_PORTS = {
+    "loopMIDI Port 7401 4": "7401",
+    "loopMIDI Port 9401 3": "9401",
+}
+SCALE_PORT = "9401"  # label whose notes also build scale9401
+
+UDP_REPORT_INTERVAL = 10.0  # seconds between packets-per-second reports
+
+# Control messages worth a timestamped marker, to line latency spikes up with them.
+SESSION_EVENTS = ("updateTempo", "tapTempo", "startPlaying", "stopPlaying", "setSchedule",
+                  "updateNumerator", "updateDenominator", "clearRequest", "updateMemorySpan",
+                  "barReset", "keyIndUpdate", "stateProtocol", "stateResync")
+
+
+# Function to convert MIDI note number to note name and octave
+def midi_note_to_name(midi_note):
+    note_name = NOTE_NAMES[midi_note % 12]
+    octave = (midi_note // 12) - 1  # MIDI note 60 is C4
+    return f"{note_name}{octave}"
+
+
+def detect_chord(mod12Bass, sMCapacity_sorted):
+    """Names the chord formed by the given pitch classes via the 4096-entry lookup table."""
+    chord = chord_name(pitch_class_mask(sMCapacity_sorted))
+    if chord != "Unknown":
+        log_state.debug("Detected chord: %s", chord)
+    else:
+        log_state.debug("No recognized chord detected.")
+    return chord
+
+
+# --- Meter-aware sensory memory calculator (fixed signature) ---
+def compute_sensory_memory(tempo_val, memory_span_val, numerator_val, divider_val):
+    """
+    sensoryMemory'yi saniye cinsinden döndürür.
+    - 8  (OneBeat)   -> 1 beat
+    - 16 (TwoBeats)  -> 2 beat
+    - 32 (OneBar)    -> numerator kadar beat
+    - 64 (TwoBars)   -> 2 * numerator kadar beat
+    - Diğerleri      -> legacy: ((60/tempo)/divider) * memory_span
+    """
+    try:
+        t = float(tempo_val)
+        if t <= 0:
+            return 0.0
+        if memory_span_val == 32:
+            beats = max(1, int(numerator_val))
+            return (60.0 / t) * beats
+        elif memory_span_val == 64:
+            beats = max(1, 2 * int(numerator_val))
+            return (60.0 / t) * beats
+        elif memory_span_val == 8:
+            return (60.0 / t) * 1
+        elif memory_span_val == 16:
+            return (60.0 / t) * 2
+        else:
+            return ((60.0 / t) / float(divider_val)) * float(memory_span_val)
+    except Exception:
+        return 0.0
+
+
+class Engine:
+    """
+    The live engine: MIDI / UDP 9401 / WebSocket control in, state frames to
+    the browser and LiveOSC commands to Ableton out.
+
+    Constructing an Engine has no side effects; it owns its state, sockets
+    and tasks, and `start()` / `stop()` bring them up and down on the
+    running event loop.  Tüm state event-loop thread'inde değişir; kilit yok.
+    After each event the state is frozen into a StateSnapshot and swapped in
+    as `self.snapshot`; frames, metrics and row capture read only that.
+
+    mido, python-osc and websockets are imported lazily (MIDI ports are
+    enumerated and opened on a worker thread), so `start()` returns as soon
+    as the UDP socket is bound.
+    """
+
+    def __init__(self, ws_url="ws://localhost:8080", udp_host="127.0.0.1", udp_port=9401,
+                 osc_host="127.0.0.1", osc_port=11000, tempo=78, midi_ports=None,
+                 state_rate=60, metrics_port=9464, telemetry_interval=0.0, record_path=None,
+                 osc_window=0.025, eeg_rate=250.0, grid="beat", row_log=None, fsync_interval=1.0,
+                 row_division=4):
+        self.ws_url = ws_url
+        self.udp_host = udp_host
+        self.udp_port = udp_port
+        self.osc_host = osc_host
+        self.osc_port = osc_port
+        self.midi_ports = dict(DEFAULT_MIDI_PORTS if midi_ports is None else midi_ports)
+        self.metrics_port = metrics_port  # 0 disables the Prometheus endpoint
+        self.telemetry_interval = telemetry_interval  # seconds between `telemetry` messages; 0 = off
+        self.record_path = record_path
+        self.eeg_rate = eeg_rate  # eeg_sample rate in Hz; 0 keeps dropping the frames
+        if grid not in GRID_UNITS:
+            raise ValueError(f"grid must be one of {', '.join(GRID_UNITS)}")
+        self.grid = grid  # what sensory-memory expiry snaps to: "beat", "bar" or "off"
+        # Corpus rows recorded here instead of in the browser: one per 1/row_division beat.
+        self.row_division = row_division
+        self.rows = RowRecorder(row_log, fsync_interval, row_division) if row_log else None
+        self._row_cells = {}  # latest rowCells from the frontend (replaced, never mutated)
+
+        # --- musical state ---
+        self.tempo = tempo
+        self.memorySpan = 0  # default value (OneBar)
+        self.sensoryMemoryDivider = 8
+        self.sensoryMemory = ((60 / tempo) / self.sensoryMemoryDivider) * self.memorySpan
+        self.numerator = 4
+        self.denominator = 4
+        # Pitch classes from UDP bar numbers; MIDI pitch classes live in the port shards.
+        self.sMCapacity = PitchClassState()
+        self.scale9401 = PitchClassState()
+        self.firstNotescale = None
+        # One state shard per MIDI port (sounding notes, pitch classes, countNotes);
+        # the ensemble view over all of them is merged on demand (see ports.py).
+        self.ports = PortTable(self.midi_ports)
+        self.clickTaken = 0
+        self.clearArrayNumber = 1  # tracks array clearing status
+        self.number = None  # last signed-int bar from UDP
+        self.bar = None  # last bar from UDP, text or int
+        self.note_timestamps = {}
+        self.takenJSTon = 0  # For tracking JS Tonal key
+        self.incomingBpm = None
+        self.last_bar_reset_time = 0  # Tracks when last barReset occurred
+        self._pending_reset = None  # barReset waiting for its bar line
+        # Beat grid phase-locked to the UDP bar messages (beatclock.py).
+        self.beat_clock = BeatClock(tempo, self.numerator)
+        self.eeg = None  # eeg.EegPipeline once numpy is loaded
+        self.eeg_features = None  # latest eeg.EegFeatures (band powers, row cells)
+        self._eeg_bar = None
+        self._eeg_computed = 0.0
+        self._seq = 0
+        self.snapshot = None
+        self.publish()
+
+        # --- plumbing ---
+        # Counters / latency histograms (metrics.py); served by MetricsServer.
+        self.metrics = Metrics()
+        self.stage_timer = StageTimer(self.metrics)
+        # Sensory-memory expiry: each pitch class / note / scale9401 degree is
+        # evicted `sensoryMemory` seconds after its last hit, on the next grid
+        # beat (or bar) once the beat clock is locked (see expiry.py).
+        align = None if grid == "off" else functools.partial(self.beat_clock.align, unit=grid)
+        self.expiry = ExpiryScheduler(self.sensoryMemory, self.expire_sensory_memory, align=align)
+        self.sender = WebSocketSender(ws_url, on_message=self.handle_websocket_message,
+                                      state_rate=state_rate, timer=self.stage_timer)
+        self.udp_ingest = UdpIngest(udp_host, udp_port, self.on_udp_note_on, self.on_udp_text_bar,
+                                    self.on_udp_int_bar, on_batch=self.on_udp_batch)
+        # Inbound control frames: type -> handler table (ws_dispatch.py).
+        self.dispatcher = MessageDispatcher(self.metrics)
+        self._register_ws_handlers()
+        self.recorder = None
+        # LiveOSC out: coalesces (and dedupes) updateBpm, bundles setSchedule.
+        self.osc = OscOutput(osc_host, osc_port, window=osc_window)
+        self._loop = None
+        self._tasks = []
+        self._midi_inputs = []
+        self._midi_task = None
+        self._metrics_server = None
+
+        self.metrics.add_collector(counter_collector("engine_ws_total", self.sender.stats))
+        self.metrics.add_collector(counter_collector("engine_udp_total", self.udp_ingest.stats))
+        self.metrics.add_collector(counter_collector("engine_osc_total", self.osc.stats))
+        self.metrics.add_collector(self.collect_gauges)
+        self.metrics.add_collector(self.collect_ports)
+        self.metrics.add_collector(self.collect_beat)
+        if self.rows is not None:
+            self.metrics.add_collector(counter_collector("engine_rowlog_total", self.rows.stats))
+            self.metrics.describe("engine_rowlog_total",
+                                  "Row log writer counters (records, batches, bytes, fsyncs, photos).")
+        self.metrics.describe("engine_ws_total",
+                              "WebSocket sender counters (connects, reconnects, events_dropped_*, ...).")
+        self.metrics.describe("engine_udp_total", "UDP 9401 ingest counters (packets, drops, ...).")
+        self.metrics.describe("engine_osc_total",
+                              "LiveOSC output counters (datagrams, messages, bundles, deduped, coalesced).")
+        self.metrics.describe("engine_expiry_runs_total",
+                              "Sensory-memory expiry timer runs that cleared keys.")
+        self.metrics.describe("engine_expired_keys_total",
+                              "Sensory-memory keys (pc / note / scale) expired.")
+        self.metrics.describe("engine_midi_note_ons_total", "MIDI note-ons per port label.")
+        self.metrics.describe("engine_port_sounding_notes", "Notes in sensory memory per port label.")
+        self.metrics.describe("engine_beat_grid_error_seconds",
+                              "Distance between the local beat grid and each UDP bar message (jitter).")
+        self.metrics.describe("engine_beat_locked", "1 once the beat grid follows the bar messages.")
+        self.metrics.describe("engine_beat_bpm", "Tempo the beat grid runs at (set tempo, corrected).")
+        self.metrics.describe("engine_beat_resyncs_total",
+                              "Times the beat grid snapped to a bar message (seek, loop, large error).")
+        self.metrics.describe("engine_state_seq", "Sequence number of the published state snapshot.")
+        self.metrics.describe("engine_eeg_samples_total", "EEG samples written to the ring buffer.")
+        self.metrics.describe("engine_eeg_features_seconds",
+                              "Time to compute one set of EEG band powers (all channels).")
+
+    # --- lifecycle --------------------------------------------------------
+
+    async def start(self):
+        started = time.perf_counter()
+        loop = self._loop = asyncio.get_running_loop()
+        if self.record_path:
+            from .replay import SessionRecorder
+            self.recorder = SessionRecorder(self.record_path).start()
+            self.udp_ingest.on_packet = self.recorder.udp
+            self.sender.on_message = self.recorder.tap_ws(self.handle_websocket_message)
+
+        if self.rows is not None:
+            self.rows.start()
+        self.expiry.attach(loop)
+        self.osc.attach(loop)
+        self.sender.start()
+        await self.udp_ingest.start(loop)
+        log_udp.info("UDP Server listening on %s:%s", self.udp_host, self.udp_port)
+
+        if self.metrics_port:
+            self._metrics_server = MetricsServer(self.metrics, port=self.metrics_port)
+            try:
+                await self._metrics_server.start()
+            except OSError as e:
+                log.warning("⚠️ Metrics endpoint disabled: %s", e)
+                self._metrics_server = None
+        self._tasks = [
+            asyncio.create_task(self.report_udp_ingest()),
+            asyncio.create_task(self.report_telemetry()),
+            # python-osc is only needed for the first control message; load it off-loop.
+            asyncio.create_task(asyncio.to_thread(self.osc.connect)),
+        ]
+        if self.eeg_rate > 0:
+            self._tasks.append(asyncio.create_task(self.run_eeg_features()))
+        if self.rows is not None:
+            self._tasks.append(asyncio.create_task(self.run_row_capture()))
+        if self.midi_ports:
+            self._midi_task = asyncio.create_task(asyncio.to_thread(self.open_midi_inputs, loop))
+        log.info("Program started in %.1f ms.", (time.perf_counter() - started) * 1000)
+
+    async def stop(self):
+        log.info("Exiting program...")
+        if self._midi_task is not None:
+            await asyncio.gather(self._midi_task, return_exceptions=True)
+            self._midi_task = None
+        for port in self._midi_inputs:
+            port.close()
+        self._midi_inputs = []
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._metrics_server is not None:
+            await self._metrics_server.stop()
+            self._metrics_server = None
+        self.udp_ingest.stop()
+        if self._pending_reset is not None:
+            self._pending_reset.cancel()
+            self._pending_reset = None
+        self.expiry.detach()
+        self.osc.detach()
+        await self.sender.stop()
+        if self.rows is not None:
+            self.rows.stop()  # drains the queue and fsyncs
+        if self.recorder is not None:
+            self.udp_ingest.on_packet = None
+            self.sender.on_message = self.handle_websocket_message
+            self.recorder.stop()
+            self.recorder = None
+        self._loop = None
+
+    async def run(self, stop):
+        """start(), wait for the `stop` event, stop()."""
+        await self.start()
+        try:
+            await stop.wait()
+        finally:
+            await self.stop()
+
+    # --- MIDI -------------------------------------------------------------
+
+    @property
+    def midi_notes(self):
+        """Sounding notes of the whole ensemble (merged from the port shards, read-only)."""
+        return self.ports.ensemble().notes
+
+    @property
+    def countNotes(self):
+        """Key-relative pitch-class counts summed over the ports (read-only)."""
+        return self.ports.ensemble().counts
+
+    def open_midi_inputs(self, loop):
+        """
+        Open every configured MIDI port with a callback (worker thread).  mido
+        invokes the callback on its own backend thread; we only hop the
+        message onto the event loop.
+        """
+        import mido
+
+        available_ports = mido.get_input_names()
+        log_midi.info("Available MIDI input ports: %s", available_ports)
+
+        for port_name, label in self.midi_ports.items():
+            if port_name in available_ports:
+                def on_message(msg, label=label):
+                    received = time.perf_counter()
+                    if self.recorder is not None:
+                        self.recorder.midi(label, msg.bytes())
+                    loop.call_soon_threadsafe(self.handle_midi_message, msg, label, received)
+                self._midi_inputs.append(mido.open_input(port_name, callback=on_message))
+                log_midi.info("✅ Listening to %s", port_name)
+            else:
+                log_midi.warning("❌ Port '%s' not found.", port_name)
+
+    def handle_midi_message(self, msg, port_label=None, received=None):
+        """
+        Apply one MIDI message from `port_label` to the state (loop thread only).
+        `received` is the perf_counter() stamp taken in the MIDI callback.
+        """
+        if msg.type == 'note_on' and msg.velocity > 0:
+            dispatched = time.perf_counter()
+            log_midi.debug("🎹 [%s] Received MIDI: %s", port_label, msg)
+
+            note_mod = msg.note % 12
+            expiry = self.expiry
+            now = expiry.now()
+            expiry.touch(("port_pc", (port_label, note_mod)), now)
+            expiry.touch(("port_note", (port_label, msg.note)), now)
+
+            # 🔐 Conditional countNotes increment logic
+            mapped_index = None
+            if self.takenJSTon in [str(i) for i in range(12)]:
+                shift = int(self.takenJSTon)
+                mapped_index = (note_mod - shift) % 12
+                log_midi.debug("✅ takenJSTon is %s — Mapped pitch class %s to %s",
+                               self.takenJSTon, note_mod, mapped_index)
+
+            # Only this port's shard changes; the ensemble is merged below, once.
+            self.ports.note_on(port_label, msg.note, mapped_index)
+
+            # ✅ ADDITIONAL LOGIC FOR scale9401
+            if port_label == SCALE_PORT:
+                try:
+                    if self.takenJSTon is not None and str(self.takenJSTon).isdigit():
+                        shifted_note = (msg.note % 12 - int(self.takenJSTon)) % 12
+                        prev_empty = not self.scale9401
+                        self.scale9401.add(shifted_note)
+                        expiry.touch(("scale", shifted_note))
+                        if prev_empty and self.scale9401:
+                            self.firstNotescale = shifted_note
+                            log_midi.debug("🎯 First note in scale9401: %s", self.firstNotescale)
+                    else:
+                        log_midi.debug("⚠️ takenJSTon is not valid.")
+                except Exception as e:
+                    log_midi.warning("⚠️ Error processing scale9401: %s", e)
+
+            self.send_midi_note_to_websocket(msg.note)
+
+            # Every mutation of this note is in; publish once and build the frame from that.
+            snap = self.publish()
+            sorted_notes = snap.notes
+
+            if sorted_notes:
+                bass_note_name = midi_note_to_name(snap.bass)
+                sop_note_name = midi_note_to_name(snap.soprano)
+                mod12Bass = snap.bass % 12
+                mod12Sop = snap.soprano % 12
+            else:
+                bass_note_name, sop_note_name = "None", "None"
+                mod12Bass, mod12Sop = "None", "None"
+
+            # ✅ If scale9401 was cleared externally and is now empty, notify JS with empty state
+            if port_label == SCALE_PORT and not snap.scale_mask and snap.first_note_scale is None:
+                empty_state = {
+                    "type": "updateState",
+                    "scale9401": [],
+                    "firstNotescale": None
+                }
+                try:
+                    if self.send_state_update(empty_state):
+                        log_ws.debug("📤 Sent empty scale9401 state to WebSocket.")
+                except Exception as e:
+                    log_ws.warning("❌ Failed to send empty scale9401 state: %s", e)
+
+            # ✅ MERGED STATE
+            state = {
+                "tempo": snap.tempo,
+                "sensoryMemory Duration": snap.sensory_memory,
+                "sMCapacity": list(snap.pcs),
+                "bassNote": bass_note_name,
+                "sopNote": sop_note_name,
+                "mod12Bass": mod12Bass,
+                "mod12Sop": mod12Sop,
+                "Actual MIDI notes": list(sorted_notes),
+                "Actual MIDI note names": [midi_note_to_name(n) for n in sorted_notes],
+                "ChordCode": snap.chord_code,
+                "Total Count": list(snap.counts),
+                "scale9401": snap.scale(),
+                "firstNotescale": snap.first_note_scale
+            }
+            self.stage_timer.handled(received, dispatched, time.perf_counter())
+
+            try:
+                if self.send_state_update(state, received):
+                    self.pretty_print_state(state)
+                else:
+                    log_ws.debug("WebSocket is not connected; waiting for reconnect...")
+            except Exception as e:
+                log_ws.warning("Error sending state: %s", e)
+
+    def expire_sensory_memory(self, keys):
+        self.metrics.inc("engine_expiry_runs_total")
+        self.metrics.inc("engine_expired_keys_total", len(keys))
+        for kind, value in keys:
+            if kind == "port_pc":
+                self.ports.expire_pc(*value)
+            elif kind == "port_note":
+                self.ports.expire_note(*value)
+            elif kind == "pc":
+                self.sMCapacity.discard(value)
+            elif kind == "scale":
+                self.scale9401.discard(value)
+        self.publish()
+
+    # --- UDP decoders (called by udp_ingest.UdpIngest, one per packet class) ---
+
+    def on_udp_note_on(self, note, velocity, channel):
+        log_udp.debug("🎹 MIDI from UDP: note_on channel=%s note=%s velocity=%s", channel, note, velocity)
+        self.note_timestamps[note] = time.time()
+        self.send_midi_note_to_websocket(note)
+
+    def on_udp_text_bar(self, bar_val, raw):
+        # "/bar 12" ya da ilk görülen sayı ("1. 1. 1" -> 1)
+        self.send_bar_to_websocket(bar_val)
+        self.on_bar(bar_val)
+        if log_udp.isEnabledFor(logging.DEBUG):
+            # `raw` is a view into the reused receive buffer; copy only when logged.
+            log_udp.debug("🧾 Parsed BAR (text): %s → %s",
+                          bytes(raw).decode('utf-8', errors='ignore').strip(), bar_val)
+
+    def on_udp_int_bar(self, value):
+        # Son 4 bayt, big-endian signed int
+        self.number = value
+        if value != -999:
+            self.send_bar_to_websocket(value)
+            self.on_bar(value)
+            log_udp.debug("Received signed integer (bar): %s", value)
+        else:
+            log_udp.debug("Ignored -999 value")
+
+    def on_udp_batch(self):
+        # --- Mevcut genel state gönderimi: her paket yerine her batch'te bir kez ---
+        try:
+            self.send_state_to_websocket(self.udp_ingest.batch_received)
+        except Exception as e:
+            log_ws.exception("⚠️ send_state_to_websocket error: %s", e)
+
+    def on_bar(self, bar):
+        self.bar = bar  # published with the batch's state frame
+        error = self.beat_clock.on_bar(bar)
+        if error is not None:
+            self.metrics.observe("engine_beat_grid_error_seconds", abs(error))
+        # EEG band powers are computed on every new bar, over the sensory-memory window.
+        if bar != self._eeg_bar:
+            self._eeg_bar = bar
+            if self.eeg is not None:
+                self.publish_eeg_features()
+
+    # --- WebSocket control in ---------------------------------------------
+
+    def handle_websocket_message(self, message):
+        """Apply one inbound WebSocket frame to the engine state (see ws_dispatch.py)."""
+        self.dispatcher.dispatch(message)
+
+    def _register_ws_handlers(self):
+        d = self.dispatcher
+        # JS'ten gelebilen ve backend'in işlemeyeceği mesaj tipleri: parse etmeden yut.
+        # Örn. {"type":"midi_note","note_number":60,"note_name":"C4"}
+        # eeg_sample: {"type":"eeg_sample","eeg":[...8 ch...],"accel":[x,y,z]}, device rate;
+        # dropped here until run_eeg_features() has loaded the pipeline.
+        d.drop("midi_note", "eeg_sample")
+        if self.rows is not None:
+            d.register("rowCells", self.on_row_cells)
+        else:
+            d.drop("rowCells")
+        for msg_type, handler in (
+            ("updateTempo", self.on_update_tempo),
+            ("tapTempo", self.on_tap_tempo),
+            ("startPlaying", self.on_start_playing),
+            ("stopPlaying", self.on_stop_playing),
+            ("setSchedule", self.handle_set_schedule),
+            ("updateNumerator", self.on_update_numerator),
+            ("updateDenominator", self.on_update_denominator),
+            ("updateBpm", self.on_update_bpm),
+            ("clickState", self.on_click_state),
+            ("clearRequest", self.reset_clear_array),
+            ("keyIndUpdate", self.on_key_ind_update),
+            ("updateMemorySpan", self.on_update_memory_span),
+            ("stateProtocol", self.on_state_protocol),
+            ("stateResync", self.on_state_resync),
+            ("telemetry", self.on_telemetry),
+            ("barReset", self.bar_reset),
+        ):
+            d.register(msg_type, handler, mark=msg_type in SESSION_EVENTS)
+
+    def on_update_tempo(self, data):
+        self.tempo = float(data.get('value', 60))
+        self.beat_clock.set_tempo(self.tempo)
+        # Ableton'a doğrudan tempo gönder
+        self.osc.set("/live/song/set/tempo", self.tempo)
+        # sensoryMemory'yi güncelle
+        self.update_sensory_memory()
+        log_osc.info("✅ Updated tempo: %s, Updated sensoryMemory: %.3f s",
+                     self.tempo, self.sensoryMemory)
+
+    def on_tap_tempo(self, data):
+        # A) LiveOSC kullanıyorsan (11000): doğrudan tap komutu
+        self.osc.command("/live/song/tap_tempo")
+        # Ableton picks the tempo now; don't dedupe the next explicit tempo against ours.
+        self.osc.invalidate("/live/song/set/tempo")
+        log_osc.info("🖱️ Tap tempo sent to Ableton.")
+
+    def on_start_playing(self, data):
+        self.osc.command("/live/song/start_playing")
+        log_osc.info("🎵 Ableton playback started!")
+
+    def on_stop_playing(self, data):
+        self.osc.command("/live/song/stop_playing")
+        log_osc.info("🛑 Ableton playback stopped!")
+
+    def on_update_numerator(self, data):
+        self.numerator = int(data.get('value', 4))
+        self.beat_clock.set_numerator(self.numerator)
+        # LiveOSC /live/song/set/signature_numerator liste bekler
+        self.osc.set("/live/song/set/signature_numerator", [self.numerator])
+        # Meter bar uzunluğunu değiştirdiği için sensoryMemory yeniden hesaplanır
+        self.update_sensory_memory()
+        log_osc.info("🎼 Ableton numerator set to %s; sensoryMemory recalculated: %.3f s",
+                     self.numerator, self.sensoryMemory)
+
+    def on_update_denominator(self, data):
+        value = int(data.get('value', 4))
+        self.denominator = value
+        # LiveOSC /live/song/set/signature_denominator liste bekler
+        self.osc.set("/live/song/set/signature_denominator", [value])
+        log_osc.info("🎼 Ableton denominator set to %s", value)
+        self.publish()
+
+    def on_update_bpm(self, data):
+        self.incomingBpm = round(float(data.get('value', 0)), 3)
+        self.tempo = self.incomingBpm
+        self.beat_clock.set_tempo(self.tempo)
+        # LiveOSC tempo set genelde sayı (float) alır; liste sarmaya gerek yok.
+        # The slider streams values: only the latest per window goes out, and
+        # only if it differs from what Ableton already has.
+        self.osc.set_coalesced("/live/song/set/tempo", self.tempo)
+        # tempo değişti, sensoryMemory’yi tekrar hesapla
+        self.update_sensory_memory()
+        log_osc.debug("🎼 Ableton tempo updated to: %s", self.tempo)
+
+    def on_click_state(self, data):
+        self.clickTaken = int(data.get('value', 0))
+        log_ws.info("✅ Updated clickTaken state: %s", self.clickTaken)
+        self.handle_metronome_state()
+
+    def on_key_ind_update(self, data):
+        self.takenJSTon = data.get('value')
+        log_ws.info("🎹 Updated takenJSTon: %s", self.takenJSTon)
+
+    def on_update_memory_span(self, data):
+        try:
+            self.memorySpan = int(data.get('value', 32))
+            self.update_sensory_memory()
+            log_ws.info("🧠 memorySpan=%s; sensoryMemory recalculated: %.3f s",
+                        self.memorySpan, self.sensoryMemory)
+        except Exception as e:
+            log_ws.warning("❌ Error setting memorySpan: %s", e)
+
+    def on_state_protocol(self, data):
+        # {"type":"stateProtocol","mode":"delta","encoding":"json"|"msgpack"}
+        try:
+            self.sender.set_state_protocol(data.get('mode', 'delta'), data.get('encoding', 'json'))
+            log_ws.info("📡 State protocol: %s/%s", self.sender.channel.mode,
+                        self.sender.channel.encoding)
+        except ValueError as e:
+            log_ws.warning("❌ Invalid stateProtocol request: %s", e)
+
+    def on_state_resync(self, data):
+        self.sender.request_snapshot()
+
+    def on_telemetry(self, data):
+        # {"type":"telemetry","interval":2}  (0 turns the periodic message off)
+        try:
+            self.telemetry_interval = max(0.0, float(data.get('interval', 2.0)))
+            log_ws.info("📈 Telemetry interval: %s s", self.telemetry_interval)
+        except (TypeError, ValueError) as e:
+            log_ws.warning("❌ Invalid telemetry request: %s", e)
+
+    def on_eeg_sample(self, data):
+        try:
+            written = self.eeg.push(data.get('eeg'), data.get('accel'))
+        except (TypeError, ValueError) as e:
+            log_eeg.debug("❌ Invalid eeg_sample: %s", e)
+            self.metrics.inc("engine_ws_dropped_total", type="eeg_invalid")
+            return
+        self.metrics.inc("engine_eeg_samples_total", written)
+
+    def on_row_cells(self, data):
+        # {"type":"rowCells","cells":{"FER":"[50]","Photo":"data:image/jpeg;base64,..."}}
+        cells = data.get('cells')
+        if not isinstance(cells, dict):
+            log_ws.debug("❌ Invalid rowCells: %s", type(cells).__name__)
+            return
+        # A new dict each time: rows already queued keep the cells they were captured with.
+        self._row_cells = {**self._row_cells,
+                           **{str(k): v if isinstance(v, str) else json.dumps(v) for k, v in cells.items()}}
+
+    def handle_set_schedule(self, data):
+        # 1) Bar/Beat'i al
+        try:
+            setBar = int(data.get("bar", 1))
+            setBeat = int(data.get("beat", 1))
+        except Exception:
+            log_ws.warning("❌ Invalid bar/beat in setSchedule")
+            return
+
+        # 2) Track/clip: gelmezse 2. track'in 1. slotunu hedefle (0-based: 1,0)
+        def safe_int(v, default):
+            try:
+                return int(v)
+            except Exception:
+                return default
+        track_i = safe_int(data.get("track"), 1)  # ← default = 1 (2. track)
+        clip_i = safe_int(data.get("clip"), 0)    # ← default = 0 (ilk clip slot)
+
+        # 3) Sınırlar
+        setBar = max(1, setBar)
+        setBeat = max(1, setBeat)
+
+        # 4) 1 bar kaç beat? (numerator güncel tutuluyor)
+        try:
+            bpb = max(1, int(self.numerator))
+        except Exception:
+            bpb = 4
+
+        # 5) Bar/Beat → mutlak beat (quarter-note) konumu
+        start_beats = float((setBar - 1) * bpb + (setBeat - 1))
+
+        log_osc.info("🟡 Received Schedule: bar=%s, beat=%s, track=%s, clip=%s",
+                     setBar, setBeat, track_i, clip_i)
+
+        try:
+            # One bundle, so both land together, timetagged for the next grid line:
+            # Clip View'deki Start alanını değiştir
+            # /live/clip/set/start_marker <track_index> <clip_index> <start_in_beats>
+            # Transport'u aynı konuma taşı (Play oradan başlasın)
+            # /live/song/set/current_song_time <beats>
+            self.osc.bundle([
+                ("/live/clip/set/start_marker", [track_i, clip_i, start_beats]),
+                ("/live/song/set/current_song_time", start_beats),
+            ], delay=self.grid_delay())
+
+            log_osc.info("🎯 Clip Start → %s.%s.1 (=%s beats), transport moved.",
+                         setBar, setBeat, start_beats)
+        except Exception as e:
+            log_osc.error("❌ OSC setSchedule failed: %s", e)
+
+    def reset_clear_array(self, data=None):
+        self.clearArrayNumber = 0  # Set the variable to 0
+        self.ports.clear_counts()  # Reset countNotes to all zeros, on every port
+        snap = self.publish()
+        log_state.info("🔥 clearRequest: clearArrayNumber=%s, countNotes=%s",
+                       self.clearArrayNumber, list(snap.counts))
+
+    def bar_reset(self, data=None):
+        """
+        barReset: clear on the nearest bar line of the beat grid (now, if
+        that has just passed), or at once while the grid is not locked.
+        """
+        if self._pending_reset is not None:
+            self._pending_reset.cancel()
+            self._pending_reset = None
+        if self.grid != "off" and self.beat_clock.locked and self._loop is not None:
+            now = time.monotonic_ns()
+            at = self.beat_clock.boundary(now, "bar", rounding=round)
+            if at > now:
+                # loop.time() is time.monotonic(), the clock's time base.
+                self._pending_reset = self._loop.call_at(at / 1e9, self.clear_bar_state)
+                return
+        self.clear_bar_state()
+
+    def clear_bar_state(self):
+        self._pending_reset = None
+        self.sMCapacity.clear()
+        self.scale9401.clear()
+        self.ports.clear()
+        self.firstNotescale = None
+        self.expiry.clear()
+        self._eeg_bar = None
+        self.last_bar_reset_time = time.time()
+        self.publish()
+        log_state.info("🧹 barReset: Tüm MIDI ve sMCapacity yapıları temizlendi.")
+
+    def update_sensory_memory(self):
+        """Recompute sensoryMemory from the current settings and re-time pending expiries."""
+        self.sensoryMemory = compute_sensory_memory(self.tempo, self.memorySpan, self.numerator,
+                                                    self.sensoryMemoryDivider)
+        self.expiry.retime(self.sensoryMemory)
+        self.publish()
+        return self.sensoryMemory
+
+    # OSC communication for metronome state
+    def handle_metronome_state(self):
+        """Update metronome state based on clickTaken."""
+        if self.clickTaken == 1:
+            self.osc.set("/live/song/set/metronome", 1)
+            log_osc.info("Metronome turned ON in Ableton.")
+        elif self.clickTaken == 0:
+            self.osc.set("/live/song/set/metronome", 0)
+            log_osc.info("Metronome turned OFF in Ableton.")
+
+    # --- snapshots --------------------------------------------------------
+
+    def publish(self):
+        """
+        Freeze the current state into a new StateSnapshot and swap it in.
+        Writers call this once per event, after all of that event's
+        mutations; the swap is a single reference store, so a reader sees
+        the previous event's snapshot or this one, never a mix.
+        """
+        ensemble = self.ports.ensemble()
+        notes = ensemble.notes
+        ascending = notes.ascending()
+        chord = chord_code(notes.pc_mask, ascending[0] % 12, ascending[-1] % 12) if ascending else ""
+        self._seq += 1
+        snap = StateSnapshot(
+            self._seq, self.tempo, self.sensoryMemory, self.numerator, self.denominator, self.bar,
+            tuple(ascending), tuple(notes.pitch_classes_bass_up()), chord,
+            ensemble.pcs.mask, self.sMCapacity.mask, tuple(ensemble.counts.counts),
+            self.scale9401.mask, self.firstNotescale,
+            self.ports.views(), self.eeg_features)
+        self.snapshot = snap
+        return snap
+
+    # --- WebSocket out ----------------------------------------------------
+
+    def send_to_websocket(self, message):
+        """Queue a discrete frame (midi_note, ablBar, ...); False while disconnected."""
+        return self.sender.send_event(message)
+
+    def send_state_update(self, state, received=None):
+        """Hand a state frame to the sender, which coalesces it to `state_rate`."""
+        return self.sender.send_state(state, received)
+
+    def push_tempo_to_websocket(self, new_tempo: float):
+        try:
+            self.send_state_update({"type": "updateState", "tempo": float(new_tempo)})
+        except Exception as e:
+            log_ws.warning("send tempo to ws failed: %s", e)
+
+    def send_bar_to_websocket(self, bar_value: int):
+        try:
+            self.send_to_websocket({"type": "ablBar", "value": int(bar_value)})
+        except Exception as e:
+            log_ws.warning("❌ Failed to send bar: %s", e)
+
+    def send_midi_note_to_websocket(self, note):
+        """Send a single MIDI note number via WebSocket."""
+        message = {
+            "type": "midi_note",
+            "note_number": note,
+            "note_name": midi_note_to_name(note)
+        }
+        try:
+            if self.send_to_websocket(message):
+                log_ws.debug("Sent MIDI note: %s", message)
+            else:
+                log_ws.debug("WebSocket is not connected; waiting for reconnect...")
+        except Exception as e:
+            log_ws.warning("Error sending MIDI note: %s", e)
+
+    def send_state_to_websocket(self, received=None):
+        dispatched = time.perf_counter()
+        current_time = time.time()
+
+        number = self.number
+        if number is not None and number != -999:
+            mod_number = number % 12
+            last_received_time = self.note_timestamps.get(mod_number, None)
+            if last_received_time is None or (current_time - last_received_time) >= self.sensoryMemory:
+                self.sMCapacity.add(mod_number)
+                self.note_timestamps[mod_number] = current_time
+                self.expiry.touch(("pc", mod_number))
+
+        # Ensemble = every port's shard merged, plus the UDP pitch classes
+        snap = self.publish()
+
+        # Compose complete state
+        state = {
+            "type": "updateState",
+            "tempo": snap.tempo,
+            "sensoryMemory Duration": snap.sensory_memory,
+            "sMCapacity": snap.sm_capacity(),
+            "midi_notes": [midi_note_to_name(note) for note in snap.notes]
+        }
+        for port in snap.ports:
+            state[f"sMCapacity_{port.label}"] = port.pcs()
+        self.stage_timer.handled(received, dispatched, time.perf_counter())
+
+        try:
+            if self.send_state_update(state, received):
+                log_ws.debug("Sent: %s", state)
+            else:
+                log_ws.debug("WebSocket is not connected; waiting for reconnect...")
+        except Exception as e:
+            log_ws.warning("Error sending state: %s", e)
+
+    def eeg_window(self):
+        """EEG analysis window: the sensory memory, or one bar while that is unset."""
+        if self.sensoryMemory > 0:
+            return self.sensoryMemory
+        return compute_sensory_memory(self.tempo, 32, self.numerator, self.sensoryMemoryDivider)
+
+    def publish_eeg_features(self):
+        started = time.perf_counter()
+        features = self.eeg.features(self.eeg_window())
+        self._eeg_computed = time.monotonic()
+        if features is None:
+            return None
+        self.metrics.observe("engine_eeg_features_seconds", time.perf_counter() - started)
+        self.eeg_features = features
+        snap = self.publish()
+        try:
+            # eegRow carries ready-made acc1..3 / elec1..8 / N.b band cells for row capture.
+            self.send_state_update({"type": "updateState", "eeg": snap.eeg.to_state(),
+                                    "eegRow": snap.eeg.row_fields()})
+        except Exception as e:
+            log_ws.warning("Error sending EEG state: %s", e)
+        return features
+
+    def pretty_print_state(self, state_dict):
+        # Per-note: costs one isEnabledFor() check unless DEBUG is on.
+        if not log_state.isEnabledFor(logging.DEBUG):
+            return
+        log_state.debug(
+            "📊 [Güncel Sistem Durumu]\n"
+            "  🎼 Tempo: %s BPM\n"
+            "  🕒 Sensory Memory: %.3f s\n"
+            "  🎵 sMCapacity (mod 12): %s\n"
+            "  🎸 Bass Note: %s (mod12: %s)\n"
+            "  🎻 Soprano Note: %s (mod12: %s)\n"
+            "  🎹 Actual MIDI Notes: %s\n"
+            "  🎶 Note Names: %s\n"
+            "  📊 Total Count: %s\n"
+            "  🔁 scale9401: %s\n"
+            "  🎯 First Note in Scale: %s",
+            state_dict['tempo'], state_dict['sensoryMemory Duration'], state_dict['sMCapacity'],
+            state_dict['bassNote'], state_dict['mod12Bass'], state_dict['sopNote'], state_dict['mod12Sop'],
+            state_dict['Actual MIDI notes'], state_dict['Actual MIDI note names'],
+            state_dict['Total Count'], state_dict['scale9401'], state_dict['firstNotescale'])
+
+    # --- reporting --------------------------------------------------------
+
+    def collect_gauges(self):
+        snap = self.snapshot
+        return [
+            ("engine_ws_connected", {}, int(self.sender.connected)),
+            ("engine_tempo_bpm", {}, snap.tempo),
+            ("engine_sensory_memory_seconds", {}, snap.sensory_memory),
+            ("engine_expiry_keys", {}, len(self.expiry)),
+            ("engine_sounding_notes", {}, len(snap.notes)),
+            ("engine_state_seq", {}, snap.seq),
+            ("engine_eeg_buffered_samples", {}, len(self.eeg) if self.eeg is not None else 0),
+            ("engine_uptime_seconds", {}, time.time() - self.metrics.started),
+        ]
+
+    def collect_ports(self):
+        series = []
+        for port in self.snapshot.ports:
+            series.append(("engine_midi_note_ons_total", {"port": port.label}, port.note_ons))
+            series.append(("engine_port_sounding_notes", {"port": port.label}, port.sounding))
+        return series
+
+    def grid_delay(self):
+        """Seconds to the next `grid` line of the beat clock; None while it is unlocked or off."""
+        if self.grid == "off" or not self.beat_clock.locked:
+            return None
+        now = time.monotonic_ns()
+        return (self.beat_clock.boundary(now, self.grid) - now) / 1e9
+
+    def grid_state(self):
+        clock = self.beat_clock
+        bar, beat, fraction = clock.position()
+        error = clock.last_error
+        return {"locked": clock.locked, "bar": bar, "beat": beat, "fraction": round(fraction, 3),
+                "bpm": round(clock.bpm, 3), "errorMs": None if error is None else round(error * 1000, 2)}
+
+    def collect_beat(self):
+        clock = self.beat_clock
+        return [
+            ("engine_beat_locked", {}, int(clock.locked)),
+            ("engine_beat_bpm", {}, clock.bpm),
+            ("engine_beat_resyncs_total", {}, clock.resyncs),
+        ]
+
+    async def report_udp_ingest(self):
+        """Periodically log UDP throughput and drop counters while traffic flows."""
+        udp_ingest = self.udp_ingest
+        while True:
+            await asyncio.sleep(UDP_REPORT_INTERVAL)
+            pps, bps = udp_ingest.rates()
+            if pps:
+                log_udp.info("📶 UDP ingest: %.1f pkt/s, %.1f KiB/s, dropped=%s, stats=%s",
+                             pps, bps / 1024, udp_ingest.drop_count(), dict(udp_ingest.stats))
+
+    async def run_eeg_features(self):
+        """
+        Load the EEG pipeline (numpy) off-loop, then keep band powers flowing
+        while no bars arrive: once per analysis window unless on_bar() already
+        computed them.
+        """
+        try:
+            from .eeg import EegPipeline
+            self.eeg = await asyncio.to_thread(EegPipeline, self.eeg_rate)
+        except ImportError as e:
+            log_eeg.warning("⚠️ EEG features disabled (%s); eeg_sample frames are dropped.", e)
+            return
+        self.dispatcher.register("eeg_sample", self.on_eeg_sample)
+        log_eeg.info("🧠 EEG pipeline ready: %s Hz, %s-sample ring.", self.eeg_rate, self.eeg.capacity)
+        while True:
+            window = max(self.eeg_window(), 0.25)
+            await asyncio.sleep(window)
+            if time.monotonic() - self._eeg_computed >= window:
+                self.publish_eeg_features()
+
+    async def run_row_capture(self):
+        """
+        Capture one corpus row per 1/row_division beat of the grid from the
+        published snapshot; the row is formatted and written by the
+        RowRecorder's thread.
+        """
+        clock, rows = self.beat_clock, self.rows
+        step = 1.0 / self.row_division
+        started = time.monotonic_ns()
+        while True:
+            now = time.monotonic_ns()
+            at = clock.boundary(now + 1_000_000, step)  # at least 1 ms ahead: never the tick just taken
+            await asyncio.sleep((at - now) / 1e9)
+            bar, beat, fraction = clock.position(at + 1000)
+            if not clock.locked:
+                bar = self.snapshot.bar  # free-running grid: Ableton's bar number, if any
+            if not rows.capture(self.snapshot, (bar, beat, fraction), (at - started) / 1e9, self._row_cells):
+                return  # the row log failed (logged by its writer)
+
+    async def report_telemetry(self):
+        """Send a `telemetry` event every telemetry_interval seconds (0 = idle)."""
+        stage_timer, metrics = self.stage_timer, self.metrics
+        since = stage_timer.snapshot()
+        last = time.perf_counter()
+        while True:
+            await asyncio.sleep(self.telemetry_interval if self.telemetry_interval > 0 else 1.0)
+            now = time.perf_counter()
+            if self.telemetry_interval > 0:
+                self.send_to_websocket({
+                    "type": "telemetry",
+                    "interval": now - last,
+                    "stages": stage_timer.summary(since),
+                    "ws": dict(self.sender.stats),
+                    "udpDropped": self.udp_ingest.drop_count(),
+                    "expiredKeys": metrics.counters[("engine_expired_keys_total", ())],
+                    "grid": self.grid_state(),
+                    "events": [{"time": wall, "event": name}
+                               for wall, stamp, name in metrics.events if stamp >= last],
+                })
+            since = stage_timer.snapshot()
+            last = now
@@ -0,0 +1,179 @@
+EEG_CHANNELS = 8
+ACC_AXES = 3
+
+# Canonical EEG bands (Hz, [low, high)); gamma is capped below mains hum.
+BANDS = (
+    ("delta", 1.0, 4.0),
+    ("theta", 4.0, 8.0),
+    ("alpha", 8.0, 13.0),
+    ("beta", 13.0, 30.0),
+    ("gamma", 30.0, 45.0),
+)
+
+MIN_WINDOW_SECONDS = 0.5  # below this the delta band has no bins
+
+# The corpus rows' per-channel sub-band columns: "N.b" is band b (BANDS
+# order) of channel N, highest b first as in the schema.  Channels have
+# four to six of them; columns past the last band stay unset.
+BAND_COLUMNS = tuple(tuple(f"{channel}.{b}" for b in range(top, -1, -1))
+                     for channel, top in enumerate((3, 3, 4, 5, 3, 4, 4, 4), 1))
+
+
+class EegPipeline:
+    """
+    Backend EEG ingestion for `eeg_sample` frames.
+
+        {"type": "eeg_sample", "eeg": [c1..c8], "accel": [x, y, z]}
+        {"type": "eeg_sample", "eeg": [[c1..c8], ...], "accel": [[x, y, z], ...]}
+
+    Samples go into one preallocated (8 + 3) x capacity float32 ring; a
+    frame is written with a single assignment (a slice unless it wraps)
+    whether it carries one sample or a block.  `features(seconds)` takes
+    the last `seconds` of signal and computes all channels at once: Hann window,
+    rfft along the time axis, and a bins x bands matrix product for the
+    band powers.  Windows and band matrices are cached per length.
+
+    numpy is imported here; the engine only builds a pipeline when it is
+    installed.
+    """
+
+    def __init__(self, rate=250.0, capacity_seconds=16.0):
+        import numpy as np
+
+        self._np = np
+        self.rate = float(rate)
+        self.capacity = max(1, int(self.rate * capacity_seconds))
+        self._ring = np.full((EEG_CHANNELS + ACC_AXES, self.capacity), np.nan, dtype=np.float32)
+        self.written = 0  # samples since start (ring position = written % capacity)
+        self._plans = {}  # window length -> (taper, band matrix)
+
+    def __len__(self):
+        return min(self.written, self.capacity)
+
+    def push(self, eeg, accel=None):
+        """Append one sample or a block of samples; returns how many were written."""
+        np = self._np
+        block = np.asarray(eeg, dtype=np.float32)
+        if block.ndim == 1:
+            block = block[None, :]
+        if block.ndim != 2 or block.shape[1] != EEG_CHANNELS:
+            raise ValueError(f"eeg must carry {EEG_CHANNELS} channels, got shape {block.shape}")
+        n = block.shape[0]
+        if n == 0:
+            return 0
+        if n > self.capacity:
+            block = block[-self.capacity:]
+            if accel is not None:
+                accel = np.asarray(accel, dtype=np.float32).reshape(-1, ACC_AXES)[-self.capacity:]
+            self.written += n - self.capacity
+            n = self.capacity
+
+        start = self.written % self.capacity
+        if start + n <= self.capacity:
+            cols = slice(start, start + n)
+        else:
+            cols = (start + np.arange(n)) % self.capacity
+        ring = self._ring
+        ring[:EEG_CHANNELS, cols] = block.T
+        if accel is None:
+            ring[EEG_CHANNELS:, cols] = np.nan
+        else:
+            acc = np.asarray(accel, dtype=np.float32).reshape(-1, ACC_AXES)
+            # One accelerometer reading for a block applies to all of it.
+            ring[EEG_CHANNELS:, cols] = acc.T if acc.shape[0] == n else acc[-1][:, None]
+        self.written += n
+        return n
+
+    def window(self, n):
+        """The last `n` samples as a contiguous (11, n) array (oldest first)."""
+        n = min(n, len(self))
+        end = self.written % self.capacity
+        start = end - n
+        if start >= 0:
+            return self._ring[:, start:end]
+        return self._np.concatenate((self._ring[:, start:], self._ring[:, :end]), axis=1)
+
+    def features(self, seconds):
+        """
+        Band powers over the last `seconds` (clamped to what is buffered), or
+        None when there is not enough signal yet.
+        """
+        np = self._np
+        n = min(int(round(seconds * self.rate)), len(self))
+        if n < MIN_WINDOW_SECONDS * self.rate:
+            return None
+        x = self.window(n)
+        taper, bands = self._plan(n)
+
+        eeg = x[:EEG_CHANNELS].astype(np.float64)
+        eeg -= eeg.mean(axis=1, keepdims=True)
+        spectrum = np.fft.rfft(eeg * taper, axis=1)
+        psd = spectrum.real ** 2 + spectrum.imag ** 2
+        power = psd @ bands  # (channels, bands)
+
+        acc = x[EEG_CHANNELS:]
+        have_acc = ~np.isnan(acc).all(axis=1)
+        accel = np.full(ACC_AXES, np.nan)
+        if have_acc.any():
+            accel[have_acc] = np.nanmean(acc[have_acc], axis=1)
+        return EegFeatures(n / self.rate, n, power, accel, x[:, -1].astype(np.float64))
+
+    def _plan(self, n):
+        plan = self._plans.get(n)
+        if plan is None:
+            np = self._np
+            if len(self._plans) >= 16:  # tempo changes move the window; keep the cache small
+                self._plans.clear()
+            taper = np.hanning(n)
+            freqs = np.fft.rfftfreq(n, 1.0 / self.rate)
+            # One-sided PSD scaling folded into the band matrix, so
+            # power = |X|^2 @ bands is band power in signal units^2.
+            scale = 2.0 / (self.rate * float(taper @ taper)) * (self.rate / n)
+            bands = np.zeros((freqs.size, len(BANDS)))
+            for j, (_, low, high) in enumerate(BANDS):
+                bands[(freqs >= low) & (freqs < high), j] = scale
+            plan = self._plans[n] = (taper, bands)
+        return plan
+
+
+class EegFeatures:
+    """
+    One band-power computation: `power` is channels x bands, `accel` the
+    mean x/y/z, `latest` the newest sample (8 channels then x/y/z).
+    """
+
+    __slots__ = ("seconds", "samples", "power", "accel", "latest")
+
+    def __init__(self, seconds, samples, power, accel, latest):
+        self.seconds = seconds
+        self.samples = samples
+        self.power = power
+        self.accel = accel
+        self.latest = latest
+
+    def to_state(self):
+        return {
+            "window": round(self.seconds, 4),
+            "samples": self.samples,
+            "bands": [name for name, _, _ in BANDS],
+            "power": [[float(f"{v:.4g}") for v in row] for row in self.power.tolist()],
+            "accel": [None if v != v else round(v, 4) for v in self.accel.tolist()],
+        }
+
+    def row_fields(self):
+        """
+        Corpus row cells: elec1..elec8 and acc1..acc3 hold the newest raw
+        sample ("-472922.00"), the N.b columns the band powers.
+        """
+        row = {}
+        latest = self.latest.tolist()
+        for i, v in enumerate(latest[:EEG_CHANNELS]):
+            row[f"elec{i + 1}"] = "-" if v != v else f"{v:.2f}"
+        for i, v in enumerate(latest[EEG_CHANNELS:]):
+            row[f"acc{i + 1}"] = "-" if v != v else f"{v:.2f}"
+        for columns, powers in zip(BAND_COLUMNS, self.power.tolist()):
+            for name in columns:
+                b = int(name.split(".")[1])
+                if b < len(powers):
+                    row[name] = f"{powers[b]:.4g}"
+        return row
@@ -0,0 +1,149 @@
+import heapq
+import logging
+import time
+
+log = logging.getLogger("engine.expiry")
+
+
+class ExpiryScheduler:
+    """
+    Per-key sensory-memory expiry on the monotonic clock.
+
+    Her anahtar (pitch class, MIDI nota, scale9401 derecesi) son vuruşundan
+    tam `window` saniye sonra düşer. Deadlines live in a heap with lazy
+    invalidation: re-hitting a key pushes a new entry and the stale one is
+    skipped when it surfaces.
+
+    The scheduler is driven by a single `loop.call_at` timer armed for the
+    earliest deadline, so it must only be touched from the event-loop thread.
+    With `align` (seconds -> seconds, e.g. BeatClock.align) every deadline
+    is moved onto the beat grid, so keys drop on a beat or bar boundary.
+    """
+
+    def __init__(self, window, on_expire, align=None):
+        self.window = max(0.0, float(window))
+        self.on_expire = on_expire  # on_expire(keys)
+        self.align = align
+        self._last_hit = {}
+        self._deadline = {}
+        self._heap = []
+        self._seq = 0
+        self._loop = None
+        self._timer = None
+
+    def attach(self, loop):
+        """Start driving expiry from `loop`; its clock becomes the time base."""
+        self._loop = loop
+        self._arm()
+
+    def detach(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._loop = None
+
+    def now(self):
+        return self._loop.time() if self._loop is not None else time.monotonic()
+
+    # --- mutation ---------------------------------------------------------
+
+    def touch(self, key, now=None):
+        """Arm (or re-arm) `key` to expire one window after `now`."""
+        if now is None:
+            now = self.now()
+        self._last_hit[key] = now
+        deadline = now + self.window
+        if self.align is not None:
+            deadline = self.align(deadline)
+        self._deadline[key] = deadline
+        self._push(deadline, key)
+        self._arm()
+
+    def discard(self, key):
+        self._last_hit.pop(key, None)
+        self._deadline.pop(key, None)
+
+    def clear(self):
+        self._last_hit.clear()
+        self._deadline.clear()
+        self._heap.clear()
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def retime(self, window):
+        """Switch to a new window; every live key is re-timed from its last hit."""
+        self.window = max(0.0, float(window))
+        self._heap = []
+        align = self.align
+        for key, hit in self._last_hit.items():
+            deadline = hit + self.window
+            if align is not None:
+                deadline = align(deadline)
+            self._deadline[key] = deadline
+            self._push(deadline, key)
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._arm()
+
+    # --- queries ----------------------------------------------------------
+
+    def next_deadline(self):
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_expired(self, now=None):
+        """Remove and return every key whose deadline is <= now."""
+        if now is None:
+            now = self.now()
+        expired = []
+        while self._heap and self._heap[0][0] <= now:
+            deadline, _, key = heapq.heappop(self._heap)
+            if self._deadline.get(key) == deadline:
+                del self._deadline[key]
+                del self._last_hit[key]
+                expired.append(key)
+        return expired
+
+    def __contains__(self, key):
+        return key in self._deadline
+
+    def __len__(self):
+        return len(self._deadline)
+
+    # --- loop driver ------------------------------------------------------
+
+    def _arm(self):
+        if self._loop is None:
+            return
+        deadline = self.next_deadline()
+        if deadline is None:
+            # Hiç anahtar yok: timer kurma, bir touch() gelene kadar boşta kal.
+            return
+        if self._timer is not None:
+            if self._timer.when() <= deadline:
+                return
+            self._timer.cancel()
+        self._timer = self._loop.call_at(deadline, self._fire)
+
+    def _fire(self):
+        self._timer = None
+        expired = self.pop_expired()
+        if expired:
+            try:
+                self.on_expire(expired)
+            except Exception as e:
+                log.warning("⚠️ expiry callback failed: %s", e)
+        self._arm()
+
+    # --- internals --------------------------------------------------------
+
+    def _push(self, deadline, key):
+        self._seq += 1
+        heapq.heappush(self._heap, (deadline, self._seq, key))
+
+    def _drop_stale(self):
+        heap = self._heap
+        while heap and self._deadline.get(heap[0][2]) != heap[0][0]:
+            heapq.heappop(heap)
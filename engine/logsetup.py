@@ -0,0 +1,61 @@
+import logging
+import logging.handlers
+import queue
+import sys
+
+LOG_FORMAT = "%(asctime)s [%(levelname)s] %(name)s: %(message)s"
+
+
+class EveryNth(logging.Filter):
+    """
+    Sampling filter for live diagnostics: lets through every Nth DEBUG record
+    per call site (logger + message template).  INFO and above always pass.
+    Dropped records are never formatted.
+    """
+
+    def __init__(self, n):
+        super().__init__()
+        self.n = max(1, int(n))
+        self._seen = {}
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG or self.n == 1:
+            return True
+        key = (record.name, record.msg)
+        count = self._seen.get(key, 0) + 1
+        self._seen[key] = count
+        return count % self.n == 1
+
+
+def setup_logging(level="INFO", sample_every=0, stream=None):
+    """
+    Route every record through a QueueHandler: the caller only interpolates
+    enabled records and enqueues them, a QueueListener thread applies the
+    formatter and does the actual (possibly slow) write.  `sample_every=N`
+    (> 1) enables DEBUG output but keeps only every Nth hot-path record.
+    Returns the listener; call .stop() on shutdown to flush it.
+    """
+    if isinstance(level, str):
+        level = logging.getLevelName(level.upper())
+    if sample_every and int(sample_every) > 1:
+        level = logging.DEBUG
+
+    records = queue.SimpleQueue()
+    writer = logging.StreamHandler(stream or sys.stdout)
+    writer.setFormatter(logging.Formatter(LOG_FORMAT))
+    listener = logging.handlers.QueueListener(records, writer, respect_handler_level=True)
+
+    enqueue = logging.handlers.QueueHandler(records)
+    if sample_every and int(sample_every) > 1:
+        enqueue.addFilter(EveryNth(sample_every))
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(enqueue)
+    root.setLevel(level)
+    # websockets logs every frame at DEBUG; keep it at INFO unless asked for explicitly.
+    logging.getLogger("websockets").setLevel(max(level, logging.INFO))
+
+    listener.start()
+    return listener
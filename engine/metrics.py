@@ -0,0 +1,257 @@
+import asyncio
+import bisect
+import collections
+import logging
+import time
+
+log = logging.getLogger("engine.metrics")
+
+# Seconds; fine below 10 ms where the 60 Hz state tick lives.
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.0075, 0.01,
+                   0.0175, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+# Note path, in order.  Each stage is the time since the previous one.
+STAGES = ("dispatch", "build", "queue", "serialise", "send", "total")
+STAGE_HELP = {
+    "dispatch": "input received (MIDI callback / UDP drain) -> handler running on the loop",
+    "build": "handler running -> state dict built and handed to the sender",
+    "queue": "handed to the sender -> flushed (coalescing / rate-limit wait)",
+    "serialise": "state frame encoding",
+    "send": "ws.send of the encoded frame(s)",
+    "total": "input received -> frame sent",
+}
+
+
+class Histogram:
+    """Fixed-bucket histogram; observe() is one bisect and two adds."""
+
+    __slots__ = ("bounds", "counts", "count", "sum", "max")
+
+    def __init__(self, bounds=DEFAULT_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def snapshot(self):
+        return tuple(self.counts)
+
+    def quantile(self, q, since=None):
+        """
+        Upper bucket bound below which a `q` share of observations fall,
+        optionally only counting observations made after snapshot `since`.
+        """
+        counts = self.counts
+        if since is not None:
+            counts = [a - b for a, b in zip(counts, since)]
+        total = sum(counts)
+        if not total:
+            return None
+        rank = q * total
+        seen = 0
+        for bound, n in zip(self.bounds, counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class Metrics:
+    """
+    In-process metrics registry: counters, histograms and collectors.
+
+    Everything is touched from the event-loop thread only, so there is no
+    locking.  `render()` produces Prometheus text exposition format;
+    collectors are callables returning (name, labels, value) tuples and are
+    how existing stats Counters (sender, UDP ingest) are exposed without
+    copying them on every increment.
+    """
+
+    def __init__(self):
+        self.counters = collections.Counter()
+        self.histograms = {}
+        self.help = {}
+        self.collectors = []
+        self.events = collections.deque(maxlen=256)  # (wall time, monotonic, name)
+        self.started = time.time()
+
+    # --- recording --------------------------------------------------------
+
+    def inc(self, name, value=1, **labels):
+        self.counters[(name, _labelkey(labels))] += value
+
+    def histogram(self, name, **labels):
+        key = (name, _labelkey(labels))
+        hist = self.histograms.get(key)
+        if hist is None:
+            hist = self.histograms[key] = Histogram()
+        return hist
+
+    def observe(self, name, value, **labels):
+        self.histogram(name, **labels).observe(value)
+
+    def mark(self, event):
+        """Note a session event (barReset, tempo change, ...) for correlation."""
+        self.events.append((time.time(), time.perf_counter(), event))
+        self.inc("engine_session_events_total", event=event)
+
+    def describe(self, name, text):
+        self.help[name] = text
+
+    def add_collector(self, collector):
+        self.collectors.append(collector)
+
+    # --- exposition -------------------------------------------------------
+
+    def render(self):
+        series = collections.defaultdict(list)
+        for (name, labels), value in self.counters.items():
+            series[name].append((labels, value))
+        for collector in self.collectors:
+            for name, labels, value in collector():
+                series[name].append((_labelkey(labels), value))
+
+        lines = []
+        for name in sorted(series):
+            if name in self.help:
+                lines.append(f"# HELP {name} {self.help[name]}")
+            lines.append(f"# TYPE {name} {'counter' if name.endswith('_total') else 'gauge'}")
+            for labels, value in series[name]:
+                lines.append(f"{name}{_fmt_labels(labels)} {value}")
+
+        by_name = collections.defaultdict(list)
+        for (name, labels), hist in self.histograms.items():
+            by_name[name].append((labels, hist))
+        for name in sorted(by_name):
+            if name in self.help:
+                lines.append(f"# HELP {name} {self.help[name]}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, hist in by_name[name]:
+                cumulative = 0
+                for bound, n in zip(hist.bounds + (float("inf"),), hist.counts):
+                    cumulative += n
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{name}_bucket{_fmt_labels(labels + (('le', le),))} {cumulative}")
+                lines.append(f"{name}_sum{_fmt_labels(labels)} {hist.sum}")
+                lines.append(f"{name}_count{_fmt_labels(labels)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _labelkey(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _fmt_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def counter_collector(name, stats, label="event"):
+    """Expose a collections.Counter as `name{label=key}` series."""
+    def collect():
+        return [(name, {label: key}, value) for key, value in stats.items()]
+    return collect
+
+
+class StageTimer:
+    """
+    Per-stage latency of the note path, fed with perf_counter() stamps.
+
+    The engine stamps receive / dispatch / built; the WebSocket sender
+    reports flush / encoded / sent for each state frame together with the
+    oldest receive and built stamp of the inputs it carries.
+    """
+
+    NAME = "engine_note_stage_seconds"
+
+    def __init__(self, metrics):
+        self.metrics = metrics
+        metrics.describe(self.NAME, "Note path latency per stage, seconds. "
+                         + "; ".join(f"{s}: {STAGE_HELP[s]}" for s in STAGES))
+        self.hist = {stage: metrics.histogram(self.NAME, stage=stage) for stage in STAGES}
+
+    def handled(self, received, dispatched, built):
+        if received is None:
+            return
+        self.hist["dispatch"].observe(dispatched - received)
+        self.hist["build"].observe(built - dispatched)
+
+    def flushed(self, received, built, flushed, encoded, sent):
+        self.hist["queue"].observe(flushed - built)
+        self.hist["serialise"].observe(encoded - flushed)
+        self.hist["send"].observe(sent - encoded)
+        self.hist["total"].observe(sent - received)
+
+    def summary(self, since=None):
+        """
+        {stage: {"n", "p50_ms", "p99_ms", "max_ms"}}.  With `since` (a
+        snapshot()) n and the percentiles cover only later observations;
+        max_ms is always since start.
+        """
+        out = {}
+        for stage, hist in self.hist.items():
+            base = since.get(stage) if since else None
+            n = hist.count - (sum(base) if base else 0)
+            p50 = hist.quantile(0.5, base)
+            p99 = hist.quantile(0.99, base)
+            out[stage] = {"n": n,
+                          "p50_ms": None if p50 is None else p50 * 1000,
+                          "p99_ms": None if p99 is None else p99 * 1000,
+                          "max_ms": hist.max * 1000}
+        return out
+
+    def snapshot(self):
+        return {stage: hist.snapshot() for stage, hist in self.hist.items()}
+
+
+class MetricsServer:
+    """Minimal HTTP server on the event loop: GET /metrics in Prometheus text format."""
+
+    def __init__(self, metrics, host="127.0.0.1", port=9464):
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        log.info("📈 Metrics on http://%s:%s/metrics", self.host, self.port)
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader, writer):
+        try:
+            request = await asyncio.wait_for(reader.readline(), 5)
+            while (await asyncio.wait_for(reader.readline(), 5)) not in (b"\r\n", b"\n", b""):
+                pass
+            parts = request.split()
+            if len(parts) >= 2 and parts[0] == b"GET" and parts[1].split(b"?")[0] in (b"/", b"/metrics"):
+                body = self.metrics.render().encode()
+                head = (b"HTTP/1.1 200 OK\r\n"
+                        b"Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n")
+            else:
+                body = b"not found\n"
+                head = b"HTTP/1.1 404 Not Found\r\nContent-Type: text/plain\r\n"
+            writer.write(head + b"Content-Length: %d\r\nConnection: close\r\n\r\n" % len(body) + body)
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
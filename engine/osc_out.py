@@ -0,0 +1,143 @@
+import collections
+import logging
+import time
+
+log = logging.getLogger("engine.osc")
+
+
+class OscOutput:
+    """
+    The engine's only path to LiveOSC.
+
+    - `command(address, *args)` always goes out (start/stop, tap tempo).
+    - `set(address, value)` always sends a parameter (tempo, signature,
+      metronome): Ableton may have changed it on its own since our last
+      send, and the engine does not hear back, so an explicit request is
+      never dropped as a repeat.  It supersedes a pending slider value.
+    - `set_coalesced(address, value)` keeps just the latest value of a
+      fast-moving parameter (updateBpm from the tempo slider) and sends it
+      once per `window` seconds, skipped when it repeats what went to that
+      address within the last `dedupe_window` seconds.
+    - `bundle([(address, value), ...], delay)` packs related commands into
+      one OSC bundle, so Ableton applies them from a single datagram; with
+      `delay` its timetag asks for them that many seconds from now (the
+      engine passes the time to the next beat-grid line).  Bundled
+      commands are never deduplicated (song time moves on its own).
+
+    python-osc is imported on first use (`connect()` may be called from a
+    worker thread to do it ahead of time).  Coalescing needs the event loop:
+    until `attach(loop)` every send is immediate.
+    """
+
+    def __init__(self, host="127.0.0.1", port=11000, window=0.025, dedupe_window=1.0):
+        self.host = host
+        self.port = port
+        self.window = window
+        self.dedupe_window = dedupe_window
+        self.stats = collections.Counter()
+        self._client = None
+        self._last = {}       # address -> (args, monotonic time) last sent
+        self._pending = {}    # address -> args waiting for the coalescing flush
+        self._loop = None
+        self._timer = None
+
+    # --- lifecycle --------------------------------------------------------
+
+    def connect(self):
+        if self._client is None:
+            from pythonosc import udp_client
+            self._client = udp_client.UDPClient(self.host, self.port)
+        return self._client
+
+    def attach(self, loop):
+        self._loop = loop
+
+    def detach(self):
+        """Send whatever is still pending and fall back to immediate sends."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self.flush()
+        self._loop = None
+
+    # --- sends ------------------------------------------------------------
+
+    def command(self, address, *args):
+        self._send(self._message(address, args))
+
+    def set(self, address, value):
+        args = _args(value)
+        self._pending.pop(address, None)  # an explicit set supersedes a pending slider value
+        self._last[address] = (args, time.monotonic())
+        self._send(self._message(address, args))
+        return True
+
+    def set_coalesced(self, address, value):
+        if self._loop is None:
+            return self.set(address, value)
+        if address in self._pending:
+            self.stats["coalesced"] += 1
+        self._pending[address] = _args(value)
+        if self._timer is None:
+            self._timer = self._loop.call_later(self.window, self._flush_timer)
+        return True
+
+    def bundle(self, messages, delay=None):
+        """
+        Send [(address, value), ...] as one bundle.  The timetag is
+        "immediately" unless `delay` (seconds from now) is given.
+        """
+        from pythonosc import osc_bundle_builder
+
+        timetag = (osc_bundle_builder.IMMEDIATELY if delay is None
+                   else time.time() + delay)
+        builder = osc_bundle_builder.OscBundleBuilder(timetag)
+        for address, value in messages:
+            builder.add_content(self._message(address, _args(value)))
+        self.stats["bundles"] += 1
+        self._send(builder.build(), len(messages))
+
+    def invalidate(self, address):
+        """Forget the last value sent (Ableton changed it on its own, e.g. tap tempo)."""
+        self._last.pop(address, None)
+
+    def flush(self):
+        pending, self._pending = self._pending, {}
+        now = time.monotonic()
+        for address, args in pending.items():
+            last = self._last.get(address)
+            if last is not None and last[0] == args and now - last[1] < self.dedupe_window:
+                self.stats["deduped"] += 1
+                continue
+            self._last[address] = (args, now)
+            self._send(self._message(address, args))
+
+    # --- internals --------------------------------------------------------
+
+    def _flush_timer(self):
+        self._timer = None
+        self.flush()
+
+    def _message(self, address, args):
+        from pythonosc.osc_message_builder import OscMessageBuilder
+
+        builder = OscMessageBuilder(address=address)
+        for arg in args:
+            builder.add_arg(arg)
+        return builder.build()
+
+    def _send(self, content, messages=1):
+        try:
+            self.connect().send(content)
+        except OSError as e:
+            self.stats["send_errors"] += 1
+            log.warning("❌ OSC send failed: %s", e)
+            return
+        self.stats["datagrams"] += 1
+        self.stats["messages"] += messages
+
+
+def _args(value):
+    # Same convention as SimpleUDPClient.send_message: a list is the argument
+    # list, anything else is a single argument.
+    return tuple(value) if isinstance(value, (list, tuple)) else (value,)
@@ -0,0 +1,147 @@
+from array import array
+
+NOTE_NAMES = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
+FULL_MASK = 0xFFF
+
+# Chord templates as intervals above the root.  Order matters: for symmetric
+# sets (augmented, diminished 7th) the first matching root wins.
+CHORD_TEMPLATES = [
+    ("M",    (0, 4, 7)),
+    ("m",    (0, 3, 7)),
+    ("d",    (0, 3, 6)),
+    ("A",    (0, 4, 8)),
+    ("sus4", (0, 5, 7)),
+    ("7",    (0, 4, 7, 10)),
+    ("M7",   (0, 4, 7, 11)),
+    ("m7",   (0, 3, 7, 10)),
+    ("ø7",   (0, 3, 6, 10)),
+    ("d7",   (0, 3, 6, 9)),
+    ("mM7",  (0, 3, 7, 11)),
+]
+
+QUALITY_NAMES = {
+    "M": "Major", "m": "Minor", "d": "Diminished", "A": "Augmented",
+    "sus4": "Suspended 4th", "7": "Dominant 7th", "M7": "Major 7th",
+    "m7": "Minor 7th", "ø7": "Half-diminished 7th", "d7": "Diminished 7th",
+    "mM7": "Minor-major 7th",
+}
+
+
+def rotate(mask, shift):
+    """Transpose a pitch-class mask down by `shift` semitones (pc -> (pc - shift) % 12)."""
+    shift %= 12
+    return ((mask >> shift) | (mask << (12 - shift))) & FULL_MASK
+
+
+def pitch_class_mask(notes):
+    mask = 0
+    for n in notes:
+        mask |= 1 << (n % 12)
+    return mask
+
+
+def _build_tables():
+    # Each set is its lowest pitch class plus an already-built smaller set.
+    members = [()] * 4096
+    for mask in range(1, 4096):
+        low = mask & -mask
+        members[mask] = (low.bit_length() - 1,) + members[mask ^ low]
+
+    # "a - b - c" intervals above pc 0, i.e. above the bass once the set has
+    # been rotated so the bass sits on 0 (ChordCode's [Code...] part).
+    names = [str(pc) for pc in range(12)]
+    interval_code = [" - ".join([names[pc] for pc in (pcs[1:] if mask & 1 else pcs)])
+                     for mask, pcs in enumerate(members)]
+
+    chords = [None] * 4096
+    for quality, intervals in CHORD_TEMPLATES:
+        template = pitch_class_mask(intervals)
+        for root in range(12):
+            mask = rotate(template, -root)
+            if chords[mask] is None:
+                chords[mask] = (root, quality)
+    return members, interval_code, chords
+
+
+# Precomputed once at import: every lookup below is a single list index.
+MEMBERS, INTERVAL_CODE, CHORDS = _build_tables()
+
+
+def chord_of(mask):
+    """(root, quality) for a pitch-class mask, or None when it is not a known chord."""
+    return CHORDS[mask & FULL_MASK]
+
+
+def chord_code(mask, bass, sop):
+    """Corpus ChordCode label, e.g. "[R7][B11][Code3 - 8][s2]"; "" for unknown sets."""
+    chord = CHORDS[mask & FULL_MASK]
+    if chord is None or bass is None:
+        return ""
+    return f"[R{chord[0]}][B{bass}][Code{INTERVAL_CODE[rotate(mask, bass)]}][s{sop}]"
+
+
+def chord_name(mask):
+    chord = CHORDS[mask & FULL_MASK]
+    if chord is None:
+        return "Unknown"
+    return f"{NOTE_NAMES[chord[0]]} {QUALITY_NAMES[chord[1]]}"
+
+
+class PitchClassState:
+    """
+    A pitch-class set as a 12-bit mask plus one hit counter per pitch class.
+
+    Membership, add, discard and transpose are O(1); `to_list()` reads the
+    precomputed member tuple for the mask instead of sorting.
+    """
+
+    __slots__ = ("mask", "counts")
+
+    def __init__(self, mask=0):
+        self.mask = mask & FULL_MASK
+        self.counts = array('I', bytes(4 * 12))
+
+    def add(self, pc):
+        pc %= 12
+        self.mask |= 1 << pc
+        self.counts[pc] += 1
+
+    def discard(self, pc):
+        pc %= 12
+        self.mask &= ~(1 << pc)
+        self.counts[pc] = 0
+
+    def clear(self):
+        self.mask = 0
+        self.counts = array('I', bytes(4 * 12))
+
+    def transposed(self, shift):
+        """New state with every pitch class moved down by `shift` (takenJSTon)."""
+        out = PitchClassState(rotate(self.mask, shift))
+        shift %= 12
+        out.counts = self.counts[shift:] + self.counts[:shift]
+        return out
+
+    def __contains__(self, pc):
+        return bool(self.mask >> (pc % 12) & 1)
+
+    def __len__(self):
+        return len(MEMBERS[self.mask])
+
+    def __bool__(self):
+        return self.mask != 0
+
+    def __iter__(self):
+        return iter(MEMBERS[self.mask])
+
+    def to_list(self):
+        return list(MEMBERS[self.mask])
+
+    def count_list(self):
+        return self.counts.tolist()
+
+    def chord(self):
+        return CHORDS[self.mask]
+
+    def __repr__(self):
+        return f"PitchClassState({self.to_list()}, counts={self.count_list()})"
@@ -0,0 +1,159 @@
+import json
+
+from .pitchclass import PitchClassState
+from .snapshot import PortView
+from .voicing import VoicingTracker
+
+
+class PortShard:
+    """
+    The state of one MIDI input (one performer): sounding notes, the
+    sensory-memory pitch classes and the key-relative hit counts.  Only the
+    PortTable mutates it, on the event-loop thread.
+    """
+
+    __slots__ = ("label", "notes", "pcs", "counts", "note_ons")
+
+    def __init__(self, label):
+        self.label = label
+        self.notes = VoicingTracker()
+        self.pcs = PitchClassState()
+        self.counts = PitchClassState()  # countNotes: pitch classes relative to takenJSTon
+        self.note_ons = 0
+
+    def clear(self):
+        self.notes.clear()
+        self.pcs.clear()
+        self.counts.clear()
+
+
+class Ensemble:
+    """
+    Merged view of every shard: sounding notes and pitch classes as unions
+    (one OR per shard); `counts` is the table's running total.
+    """
+
+    __slots__ = ("notes", "pcs", "counts")
+
+    def __init__(self, shards, counts):
+        note_mask = pc_mask = 0
+        for shard in shards:
+            note_mask |= shard.notes.mask
+            pc_mask |= shard.pcs.mask
+        self.notes = VoicingTracker.from_mask(note_mask)
+        self.pcs = PitchClassState(pc_mask)
+        self.counts = counts
+
+
+class PortTable:
+    """
+    MIDI port name -> label table, with one PortShard per label.
+
+    Every port writes only its own shard, so the per-note work does not
+    grow with the number of performers.  The ensemble view (what the state
+    frame shows: union of sounding notes, chord, count total) is merged
+    only when ensemble() is called, and cached until a shard changes.
+    The table's `counts` (countNotes, "Total Count") is a running total of
+    every key-relative hit: clear() (barReset) clears the shards' counts
+    but not the total, which only clear_counts() (clearRequest) zeroes, so
+    after a barReset the total is no longer the sum of the shards.
+    Labels that are not in the table (replayed sessions, tests) get a shard
+    on first use.  views() gives the frozen per-port view for a state
+    snapshot, rebuilding only the shards touched since the last call.
+    """
+
+    def __init__(self, ports):
+        self.ports = dict(ports)
+        self.shards = {}
+        self.counts = PitchClassState()  # running total since the last clear_counts()
+        self._ensemble = None
+        self._views = {}
+        self._dirty = set()
+        self._view_tuple = ()  # empty table (no MIDI ports): no views
+        for label in self.ports.values():
+            self.shard(label)
+
+    def __len__(self):
+        return len(self.shards)
+
+    def __iter__(self):
+        return iter(self.shards.values())
+
+    def shard(self, label):
+        shard = self.shards.get(label)
+        if shard is None:
+            shard = self.shards[label] = PortShard(label)
+            self._dirty.add(label)
+        return shard
+
+    # --- mutation (event-loop thread) -------------------------------------
+
+    def note_on(self, label, note, mapped=None):
+        """`note` sounds on `label`; `mapped` is its key-relative pitch class, if a key is set."""
+        shard = self.shard(label)
+        shard.notes.add(note)
+        shard.pcs.add(note % 12)
+        if mapped is not None:
+            shard.counts.add(mapped)
+            self.counts.add(mapped)
+        shard.note_ons += 1
+        self._dirty.add(label)
+        ensemble = self._ensemble
+        # Adding only sets bits: a note already in the union leaves the ensemble as it is.
+        if ensemble is not None and not (ensemble.notes.mask >> note & 1
+                                         and ensemble.pcs.mask >> (note % 12) & 1):
+            self._ensemble = None
+        return shard
+
+    def expire_note(self, label, note):
+        shard = self.shards.get(label)
+        if shard is not None and note in shard.notes:
+            shard.notes.discard(note)
+            self._ensemble = None
+            self._dirty.add(label)
+
+    def expire_pc(self, label, pc):
+        shard = self.shards.get(label)
+        if shard is not None and pc in shard.pcs:
+            shard.pcs.discard(pc)
+            self._ensemble = None
+            self._dirty.add(label)
+
+    def clear_counts(self):
+        for shard in self.shards.values():
+            shard.counts.clear()
+        self.counts.clear()
+
+    def clear(self):
+        """barReset: every shard's notes, pitch classes and counts; the total stays."""
+        for shard in self.shards.values():
+            shard.clear()
+        self._ensemble = None
+        self._dirty.update(self.shards)
+
+    # --- views ------------------------------------------------------------
+
+    def ensemble(self):
+        if self._ensemble is None:
+            self._ensemble = Ensemble(self.shards.values(), self.counts)
+        return self._ensemble
+
+    def views(self):
+        """PortView of every shard, in table order."""
+        if self._dirty:
+            for label in self._dirty:
+                shard = self.shards[label]
+                self._views[label] = PortView(label, shard.pcs.mask, len(shard.notes), shard.note_ons)
+            self._dirty.clear()
+            self._view_tuple = tuple(self._views[label] for label in self.shards)
+        return self._view_tuple
+
+
+def load_port_table(path):
+    """A JSON port table file: {"loopMIDI Port 7401 4": "7401", ...}."""
+    with open(path, encoding="utf-8") as f:
+        table = json.load(f)
+    if not isinstance(table, dict) or not all(isinstance(k, str) and isinstance(v, str)
+                                              for k, v in table.items()):
+        raise ValueError(f"{path}: expected a JSON object of port name -> label")
+    return table
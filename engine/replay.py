@@ -0,0 +1,742 @@
+"""
+Record / replay harness for the engine, with local stand-ins for Ableton
+(LiveOSC on UDP 11000) and the browser (ws://localhost:8080).
+
+    python base.py --record session.jsonl            # record a live session
+    python -m engine.replay synth session.jsonl --notes 5000 --rate 400
+    python -m engine.replay bench session.jsonl --speed 4
+    python -m engine.replay standins --out capture.jsonl   # just the stand-ins
+    python -m engine.replay contention --mode lock      # state readers vs ingestion
+
+A session file is JSON lines: a header, then one input per line with `t`
+in seconds from the start of the recording:
+
+    {"format": "engine-session", "version": 1, "started": "..."}
+    {"t": 0.0123, "src": "midi", "port": "7401", "data": [144, 60, 100]}
+    {"t": 0.0200, "src": "udp", "data": "9040..."}            (hex)
+    {"t": 0.5000, "src": "ws", "msg": "{\"type\": \"updateTempo\", ...}"}
+
+`bench` runs the engine in-process against the stand-ins and replays the
+session through the engine's real inputs: UDP datagrams go to the ingest
+socket, control messages come from the stand-in WebSocket server, MIDI is
+handed to `handle_midi_message` exactly as the mido callback would.
+
+`contention` measures what state readers cost the ingestion path: a writer
+applies note-ons to an Engine at a fixed rate while reader threads build and
+serialise the state frame.  `--mode lock` reproduces the old locked globals
+(writer and readers share one lock, readers serialise the live structures
+while holding it); `--mode snapshot` has readers serialise `engine.snapshot`
+with no lock.  It reports the writer's per-event time and start jitter and
+the readers' lock-hold time.
+"""
+import argparse
+import asyncio
+import bisect
+import collections
+import datetime
+import json
+import logging
+import queue
+import random
+import socket
+import threading
+import time
+
+from .logsetup import setup_logging
+
+log = logging.getLogger("engine.replay")
+
+FORMAT = "engine-session"
+VERSION = 1
+
+# Frames the engine sends on the event lane; everything else is state.
+EVENT_TYPES = ("midi_note", "ablBar")
+
+
+# --- recording ------------------------------------------------------------
+
+class SessionRecorder:
+    """
+    Appends timestamped engine inputs to a session file.
+
+    The `midi`, `udp` and `ws` taps may be called from any thread (the MIDI
+    one runs on the mido backend thread); they only enqueue, a writer thread
+    serialises and writes.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._t0 = None
+
+    def start(self):
+        self._t0 = time.perf_counter()
+        self._thread = threading.Thread(target=self._write_loop, name="session-recorder",
+                                        daemon=True)
+        self._thread.start()
+        log.info("⏺️ Recording session to %s", self.path)
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+            log.info("⏹️ Recorded %s inputs to %s", self.count, self.path)
+
+    # --- taps -------------------------------------------------------------
+
+    def midi(self, port, data):
+        self._queue.put((time.perf_counter(), "midi", port, list(data)))
+
+    def udp(self, data):
+        self._queue.put((time.perf_counter(), "udp", None, bytes(data)))
+
+    def ws(self, message):
+        self._queue.put((time.perf_counter(), "ws", None, message))
+
+    def tap_ws(self, handler):
+        """Wrap a WebSocket message handler so every inbound message is recorded first."""
+        def recorded(message):
+            self.ws(message)
+            return handler(message)
+        return recorded
+
+    # --- writer -----------------------------------------------------------
+
+    def _write_loop(self):
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"format": FORMAT, "version": VERSION,
+                                "started": datetime.datetime.now().isoformat()}) + "\n")
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+                stamp, src, port, data = item
+                entry = {"t": round(stamp - self._t0, 6), "src": src}
+                if src == "midi":
+                    entry["port"] = port
+                    entry["data"] = data
+                elif src == "udp":
+                    entry["data"] = data.hex()
+                else:
+                    if isinstance(data, (bytes, bytearray)):
+                        data = data.decode("utf-8", errors="replace")
+                    entry["msg"] = data
+                f.write(json.dumps(entry) + "\n")
+                self.count += 1
+
+
+def load_session(path):
+    """Read a session file; returns its entries sorted by `t` (header dropped)."""
+    entries = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            if "format" in entry:
+                if entry["format"] != FORMAT or entry.get("version", 0) > VERSION:
+                    raise ValueError(f"{path}: not a version {VERSION} {FORMAT} file")
+                continue
+            if entry["src"] == "udp":
+                entry["data"] = bytes.fromhex(entry["data"])
+            entries.append(entry)
+    entries.sort(key=lambda e: e["t"])
+    return entries
+
+
+def synth_session(path, notes=2000, rate=200.0, chord_size=3, seed=1, ports=2):
+    """
+    Write a synthetic session: `notes` note-ons at `rate` per second, played
+    as `chord_size`-note chords rotating over `ports` MIDI ports ("7401",
+    "9401", then "p3", "p4", ...) and UDP, with a bar message every 4 beats
+    and a tempo change half way.
+    It opens with the control messages the frontend sends on load (tempo,
+    key, memory span), otherwise sensory memory would be zero-length.
+    """
+    rng = random.Random(seed)
+    labels = ["7401", "9401", *(f"p{k}" for k in range(3, ports + 1))][:ports]
+    step = 1.0 / rate
+    t = 0.0
+    bar = 1
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"format": FORMAT, "version": VERSION,
+                            "started": datetime.datetime.now().isoformat(),
+                            "synthetic": True}) + "\n")
+
+        def emit(entry):
+            f.write(json.dumps(entry) + "\n")
+
+        for control in ({"type": "updateTempo", "value": 96},
+                        {"type": "keyIndUpdate", "value": "0"},
+                        {"type": "updateMemorySpan", "value": 32}):
+            emit({"t": 0.0, "src": "ws", "msg": json.dumps(control)})
+        for i in range(notes):
+            if i % chord_size == 0:
+                root = rng.randrange(36, 72)
+            note = root + (0, 4, 7, 10, 14)[i % chord_size]
+            velocity = rng.randrange(40, 120)
+            kind = i // chord_size % (len(labels) + 1)
+            if kind == len(labels):
+                emit({"t": round(t, 6), "src": "udp", "data": bytes([0x90, note, velocity]).hex()})
+            else:
+                emit({"t": round(t, 6), "src": "midi", "port": labels[kind],
+                      "data": [0x90, note, velocity]})
+            if i % (chord_size * 4) == chord_size * 4 - 1:
+                bar += 1
+                emit({"t": round(t, 6), "src": "udp", "data": f"/bar {bar}".encode().hex()})
+            if i == notes // 2:
+                emit({"t": round(t, 6), "src": "ws",
+                      "msg": json.dumps({"type": "updateTempo", "value": 120})})
+            t += step
+
+
+# --- stand-ins ------------------------------------------------------------
+
+class StandInWebSocket:
+    """
+    Plays the browser: accepts the engine's connection on `port`, timestamps
+    every frame it receives, and can push control messages back.
+    """
+
+    def __init__(self, host="localhost", port=8080):
+        self.host = host
+        self.port = port
+        self.received = []  # (perf_counter, decoded frame or None, raw size)
+        self.connected = asyncio.Event()
+        self._clients = set()
+        self._server = None
+
+    async def start(self):
+        import websockets
+        self._server = await websockets.serve(self._handler, self.host, self.port)
+        log.info("🧪 Stand-in WebSocket server on ws://%s:%s", self.host, self.port)
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def send(self, message):
+        for conn in list(self._clients):
+            await conn.send(message)
+
+    async def _handler(self, conn):
+        self._clients.add(conn)
+        self.connected.set()
+        try:
+            async for message in conn:
+                self.received.append((time.perf_counter(), _decode_frame(message), len(message)))
+        except Exception:
+            pass
+        finally:
+            self._clients.discard(conn)
+            if not self._clients:
+                self.connected.clear()
+
+
+class StandInOsc(asyncio.DatagramProtocol):
+    """Plays Ableton LiveOSC: records every OSC message the engine sends to `port`."""
+
+    def __init__(self, host="127.0.0.1", port=11000):
+        self.host = host
+        self.port = port
+        self.received = []  # (perf_counter, address, params)
+        self._transport = None
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        self._transport, _ = await loop.create_datagram_endpoint(
+            lambda: self, local_addr=(self.host, self.port))
+        log.info("🧪 Stand-in OSC server on %s:%s", self.host, self.port)
+
+    def stop(self):
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+
+    def datagram_received(self, data, addr):
+        from pythonosc.osc_packet import OscPacket, ParseError
+        stamp = time.perf_counter()
+        try:
+            for timed in OscPacket(data).messages:
+                self.received.append((stamp, timed.message.address, list(timed.message.params)))
+        except ParseError:
+            self.received.append((stamp, None, [data.hex()]))
+
+
+def _decode_frame(message):
+    if isinstance(message, (bytes, bytearray)):
+        try:
+            import msgpack
+        except ImportError:
+            return None
+        return msgpack.unpackb(message)
+    try:
+        return json.loads(message)
+    except ValueError:
+        return None
+
+
+def dump_capture(path, ws, osc):
+    """Write what the stand-ins received as JSON lines (`src` ws_out / osc_out)."""
+    t0 = min([r[0] for r in ws.received[:1]] + [r[0] for r in osc.received[:1]], default=0.0)
+    with open(path, "w", encoding="utf-8") as f:
+        rows = [(stamp, {"src": "ws_out", "frame": frame, "size": size})
+                for stamp, frame, size in ws.received]
+        rows += [(stamp, {"src": "osc_out", "address": address, "params": params})
+                 for stamp, address, params in osc.received]
+        rows.sort(key=lambda r: r[0])
+        for stamp, entry in rows:
+            entry["t"] = round(stamp - t0, 6)
+            f.write(json.dumps(entry, default=repr) + "\n")
+
+
+# --- replay ---------------------------------------------------------------
+
+class Replayer:
+    """
+    Feeds session entries into a running engine at `speed` x real time
+    (`speed=0`: as fast as possible, yielding to the loop every `burst`).
+
+    `inject` maps a source ("midi", "udp", "ws") to a plain callable taking
+    the entry; every injected note-on is stamped into `notes_in` as (perf_counter,
+    source, note) for latency matching.
+    """
+
+    def __init__(self, entries, inject, speed=1.0, burst=64):
+        self.entries = entries
+        self.inject = inject
+        self.speed = speed
+        self.burst = burst
+        self.notes_in = []
+        self.stats = collections.Counter()
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        since_yield = 0
+        for entry in self.entries:
+            if self.speed > 0:
+                due = start + entry["t"] / self.speed
+                if due > loop.time():
+                    await asyncio.sleep(due - loop.time())
+            elif since_yield >= self.burst:
+                since_yield = 0
+                await asyncio.sleep(0)
+            since_yield += 1
+            src = entry["src"]
+            handler = self.inject.get(src)
+            if handler is None:
+                self.stats["skipped"] += 1
+                continue
+            stamp = time.perf_counter()
+            for note in _note_ons(entry):
+                self.notes_in.append((stamp, src, note))
+            handler(entry)
+            self.stats[src] += 1
+        return loop.time() - start
+
+
+def _note_ons(entry):
+    src = entry["src"]
+    if src == "midi":
+        data = entry["data"]
+        if len(data) == 3 and data[0] & 0xF0 == 0x90 and data[2] > 0:
+            return (data[1],)
+    elif src == "udp":
+        data = entry["data"]
+        if data and 0x80 <= data[0] <= 0xEF:
+            return tuple(data[i + 1] for i in range(0, len(data) - 2, 3)
+                         if data[i] & 0xF0 == 0x90 and data[i + 2] > 0)
+    return ()
+
+
+# --- latency --------------------------------------------------------------
+
+def match_latencies(notes_in, received):
+    """
+    Pair every injected note-on with the first output that reflects it.
+
+    MIDI notes resolve on the first state frame (full, snapshot or delta,
+    folded in arrival order) whose "Actual MIDI notes" contains the note;
+    UDP notes only ever surface as a midi_note event, so they resolve on
+    that.  Returns {source: [latency seconds, ...]} and the number of
+    unmatched notes.
+    """
+    pending = {"midi": collections.defaultdict(collections.deque),
+               "udp": collections.defaultdict(collections.deque)}
+    latencies = {"midi": [], "udp": []}
+
+    inputs = sorted(notes_in)
+    stamps = [n[0] for n in inputs]
+    fed = 0
+    for stamp, frame, _ in received:
+        upto = bisect.bisect_right(stamps, stamp)
+        for t_in, src, note in inputs[fed:upto]:
+            pending[src][note].append(t_in)
+        fed = max(fed, upto)
+        if not isinstance(frame, dict):
+            continue
+        kind = frame.get("type")
+        if kind == "midi_note":
+            waiting = pending["udp"].get(frame.get("note_number"))
+            if waiting:
+                latencies["udp"].append(stamp - waiting.popleft())
+            continue
+        if kind in EVENT_TYPES:
+            continue
+        if kind == "stateSnapshot":
+            fields = frame.get("state", {})
+        elif kind == "stateDelta":
+            fields = frame.get("set", {})
+        else:
+            fields = frame
+        if "Actual MIDI notes" not in fields:
+            continue
+        for note in set(fields["Actual MIDI notes"]):
+            waiting = pending["midi"].get(note)
+            while waiting:
+                latencies["midi"].append(stamp - waiting.popleft())
+
+    unmatched = sum(len(q) for per in pending.values() for q in per.values())
+    unmatched += len(inputs) - fed
+    return latencies, unmatched
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return float("nan")
+    return sorted_values[min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))]
+
+
+def summarize(latencies):
+    summary = {}
+    for src, values in latencies.items():
+        values = sorted(values)
+        summary[src] = {
+            "n": len(values),
+            "p50_ms": percentile(values, 0.50) * 1000,
+            "p99_ms": percentile(values, 0.99) * 1000,
+            "max_ms": values[-1] * 1000 if values else float("nan"),
+        }
+    return summary
+
+
+# --- benchmark ------------------------------------------------------------
+
+async def benchmark(path, speed=1.0, settle=1.0, capture=None, ws_port=8080, osc_port=11000,
+                    **engine_options):
+    """
+    Replay `path` into an in-process Engine wired to the stand-ins and
+    return a summary dict (latency percentiles per input, notes/s).
+    `engine_options` go to Engine (udp_port, metrics_port, ...).
+    """
+    import mido
+    from .core import Engine
+
+    entries = load_session(path)
+    ws = StandInWebSocket(port=ws_port)
+    osc = StandInOsc(port=osc_port)
+    await ws.start()
+    await osc.start()
+
+    engine = Engine(ws_url=f"ws://localhost:{ws_port}", osc_port=osc_port, midi_ports={},
+                    **engine_options)
+    await engine.start()
+    udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    udp.setblocking(False)
+    udp_target = (engine.udp_host, engine.udp_port)
+    outbound = []
+
+    def inject_midi(entry):
+        engine.handle_midi_message(mido.Message.from_bytes(entry["data"]), entry.get("port"),
+                                 time.perf_counter())
+
+    def inject_udp(entry):
+        try:
+            udp.sendto(entry["data"], udp_target)
+        except BlockingIOError:
+            pass
+
+    def inject_ws(entry):
+        outbound.append(asyncio.ensure_future(ws.send(entry["msg"])))
+
+    try:
+        await asyncio.wait_for(ws.connected.wait(), timeout=10)
+        replayer = Replayer(entries, {"midi": inject_midi, "udp": inject_udp, "ws": inject_ws},
+                            speed=speed)
+        elapsed = await replayer.run()
+        await asyncio.gather(*outbound, return_exceptions=True)
+        await asyncio.sleep(settle)
+    finally:
+        await engine.stop()
+        udp.close()
+        await ws.stop()
+        osc.stop()
+
+    latencies, unmatched = match_latencies(replayer.notes_in, ws.received)
+    matched = sum(len(v) for v in latencies.values())
+    out_span = ws.received[-1][0] - replayer.notes_in[0][0] if ws.received and replayer.notes_in else 0
+    summary = {
+        "session": path,
+        "speed": speed,
+        "inputs": dict(replayer.stats),
+        "notes_in": len(replayer.notes_in),
+        "notes_matched": matched,
+        "notes_unmatched": unmatched,
+        "replay_s": elapsed,
+        "notes_per_s_in": len(replayer.notes_in) / elapsed if elapsed else float("nan"),
+        "notes_per_s_out": matched / out_span if out_span else float("nan"),
+        "ws_frames": len(ws.received),
+        "ws_bytes": sum(r[2] for r in ws.received),
+        "osc_messages": len(osc.received),
+        "latency": summarize(latencies),
+    }
+    if capture:
+        dump_capture(capture, ws, osc)
+    return summary
+
+
+def print_summary(summary):
+    speed = f"{summary['speed']}x" if summary['speed'] else "max speed"
+    print(f"session {summary['session']} at {speed}: "
+          f"{summary['notes_in']} notes in {summary['replay_s']:.2f} s "
+          f"({summary['notes_per_s_in']:.0f} in/s, {summary['notes_per_s_out']:.0f} out/s), "
+          f"{summary['notes_unmatched']} unmatched")
+    print(f"  ws frames {summary['ws_frames']} ({summary['ws_bytes'] / 1024:.1f} KiB), "
+          f"osc messages {summary['osc_messages']}")
+    for src, row in summary["latency"].items():
+        label = "MIDI → state" if src == "midi" else "UDP → midi_note"
+        print(f"  {label:16s} n={row['n']:6d}  p50={row['p50_ms']:7.2f} ms  "
+              f"p99={row['p99_ms']:7.2f} ms  max={row['max_ms']:7.2f} ms")
+
+
+# --- reader contention ----------------------------------------------------
+
+def _live_frame(engine):
+    """The state frame read straight off the working structures (the locked design)."""
+    from .core import midi_note_to_name
+
+    ensemble = engine.ports.ensemble()
+    notes = ensemble.notes.ascending()
+    state = {
+        "type": "updateState",
+        "tempo": engine.tempo,
+        "sensoryMemory Duration": engine.sensoryMemory,
+        "sMCapacity": ensemble.notes.pitch_classes_bass_up(),
+        "Actual MIDI notes": notes,
+        "Actual MIDI note names": [midi_note_to_name(n) for n in notes],
+        "Total Count": ensemble.counts.count_list(),
+        "scale9401": engine.scale9401.to_list(),
+        "firstNotescale": engine.firstNotescale,
+    }
+    for shard in engine.ports:
+        state[f"sMCapacity_{shard.label}"] = shard.pcs.to_list()
+    return state
+
+
+def _snapshot_frame(snap):
+    from .core import midi_note_to_name
+
+    state = {
+        "type": "updateState",
+        "tempo": snap.tempo,
+        "sensoryMemory Duration": snap.sensory_memory,
+        "sMCapacity": list(snap.pcs),
+        "Actual MIDI notes": list(snap.notes),
+        "Actual MIDI note names": [midi_note_to_name(n) for n in snap.notes],
+        "Total Count": list(snap.counts),
+        "scale9401": snap.scale(),
+        "firstNotescale": snap.first_note_scale,
+    }
+    for port in snap.ports:
+        state[f"sMCapacity_{port.label}"] = port.pcs()
+    return state
+
+
+def contention(mode="snapshot", seconds=5.0, rate=2000.0, readers=4, read_rate=500.0, ports=8):
+    """
+    Drive an unstarted Engine with note-ons at `rate` per second for `seconds`
+    while `readers` threads each serialise the state `read_rate` times a
+    second; returns per-event writer times (lock wait included), start
+    jitter, lock wait and reader lock-hold times (all in microseconds).
+    """
+    import mido
+    from .core import Engine
+
+    if mode not in ("lock", "snapshot"):
+        raise ValueError("mode must be 'lock' or 'snapshot'")
+    labels = [f"p{k}" for k in range(ports)]
+    engine = Engine(midi_ports={f"port {label}": label for label in labels}, metrics_port=0)
+    engine.on_key_ind_update({"value": "0"})
+    engine.on_update_memory_span({"value": 32})
+    rng = random.Random(1)
+    messages = [mido.Message("note_on", note=rng.randrange(36, 96), velocity=90)
+                for _ in range(int(seconds * rate))]
+    lock = threading.Lock()
+    done = threading.Event()
+    holds = [[] for _ in range(readers)]
+    frames = [0] * readers
+
+    def reader(k):
+        period = 1.0 / read_rate
+        due = time.perf_counter()
+        while not done.is_set():
+            if mode == "lock":
+                started = time.perf_counter_ns()
+                with lock:
+                    acquired = time.perf_counter_ns()
+                    json.dumps(_live_frame(engine))
+                holds[k].append((time.perf_counter_ns() - acquired) / 1000)
+            else:
+                started = time.perf_counter_ns()
+                json.dumps(_snapshot_frame(engine.snapshot))
+                holds[k].append((time.perf_counter_ns() - started) / 1000)
+            frames[k] += 1
+            due += period
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+    threads = [threading.Thread(target=reader, args=(k,), daemon=True) for k in range(readers)]
+    for thread in threads:
+        thread.start()
+    event_us, late_us, wait_us = [], [], []
+    period_ns = int(1e9 / rate)
+    t0 = time.perf_counter_ns()
+    for i, msg in enumerate(messages):
+        due = t0 + i * period_ns
+        delay = due - time.perf_counter_ns()
+        if delay > 0:
+            time.sleep(delay / 1e9)  # sleeping, not spinning, leaves the GIL to the readers
+        started = time.perf_counter_ns()
+        if mode == "lock":
+            with lock:
+                wait_us.append((time.perf_counter_ns() - started) / 1000)
+                engine.handle_midi_message(msg, labels[i % ports])
+        else:
+            engine.handle_midi_message(msg, labels[i % ports])
+        finished = time.perf_counter_ns()
+        event_us.append((finished - started) / 1000)
+        late_us.append((started - due) / 1000)
+    done.set()
+    for thread in threads:
+        thread.join()
+
+    def stats(values):
+        values = sorted(values)
+        return {"n": len(values), "p50": percentile(values, 0.50), "p99": percentile(values, 0.99),
+                "max": values[-1] if values else float("nan")}
+
+    return {"mode": mode, "rate": rate, "readers": readers, "read_rate": read_rate, "ports": ports,
+            "frames_read": sum(frames), "writer_event_us": stats(event_us),
+            "writer_jitter_us": stats(late_us), "writer_lock_wait_us": stats(wait_us or [0.0]),
+            "reader_hold_us": stats([h for k in holds for h in k])}
+
+
+def print_contention(summary):
+    print(f"{summary['mode']}: {summary['writer_event_us']['n']} note-ons at {summary['rate']:.0f}/s, "
+          f"{summary['readers']} readers x {summary['read_rate']:.0f}/s "
+          f"({summary['frames_read']} frames), {summary['ports']} ports")
+    for key, label in (("writer_event_us", "writer per event"), ("writer_jitter_us", "writer start jitter"),
+                       ("writer_lock_wait_us", "writer lock wait"),
+                       ("reader_hold_us", "reader lock hold" if summary["mode"] == "lock"
+                        else "reader serialise")):
+        row = summary[key]
+        print(f"  {label:20s} p50={row['p50']:8.1f} us  p99={row['p99']:8.1f} us  max={row['max']:8.1f} us")
+
+
+async def run_standins(capture, ws_port, osc_port):
+    ws = StandInWebSocket(port=ws_port)
+    osc = StandInOsc(port=osc_port)
+    await ws.start()
+    await osc.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await ws.stop()
+        osc.stop()
+        dump_capture(capture, ws, osc)
+        log.info("💾 Wrote %s ws frames and %s OSC messages to %s",
+                 len(ws.received), len(osc.received), capture)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("bench", help="replay a session into the engine and report latency")
+    p.add_argument("session")
+    p.add_argument("--speed", type=float, default=1.0, help="replay speed, 0 = as fast as possible")
+    p.add_argument("--settle", type=float, default=1.0, help="seconds to wait for trailing output")
+    p.add_argument("--capture", help="also write what the stand-ins received to this file")
+    p.add_argument("--json", action="store_true", help="print the summary as JSON")
+    p.add_argument("--ws-port", type=int, default=8080)
+    p.add_argument("--osc-port", type=int, default=11000)
+    p.add_argument("--udp-port", type=int, default=9401)
+    p.add_argument("--metrics-port", type=int, default=0, help="expose the engine's metrics")
+    p.add_argument("--telemetry-interval", type=float, default=0.0)
+    p.add_argument("--log-level", default="WARNING")
+
+    p = sub.add_parser("synth", help="write a synthetic session")
+    p.add_argument("session")
+    p.add_argument("--notes", type=int, default=2000)
+    p.add_argument("--rate", type=float, default=200.0, help="note-ons per second")
+    p.add_argument("--chord-size", type=int, default=3)
+    p.add_argument("--seed", type=int, default=1)
+    p.add_argument("--ports", type=int, default=2, help="MIDI ports (performers) to spread the notes over")
+
+    p = sub.add_parser("standins", help="run only the stand-in OSC and WebSocket servers")
+    p.add_argument("--out", default="capture.jsonl")
+    p.add_argument("--ws-port", type=int, default=8080)
+    p.add_argument("--osc-port", type=int, default=11000)
+
+    p = sub.add_parser("contention", help="measure state readers against the ingestion path")
+    p.add_argument("--mode", choices=("lock", "snapshot"), default="snapshot")
+    p.add_argument("--seconds", type=float, default=5.0)
+    p.add_argument("--rate", type=float, default=2000.0, help="note-ons per second")
+    p.add_argument("--readers", type=int, default=4, help="reader threads")
+    p.add_argument("--read-rate", type=float, default=500.0, help="frames per second per reader")
+    p.add_argument("--ports", type=int, default=8)
+    p.add_argument("--json", action="store_true", help="print the summary as JSON")
+
+    args = parser.parse_args(argv)
+    if args.command == "contention":
+        summary = contention(args.mode, args.seconds, args.rate, args.readers, args.read_rate, args.ports)
+        if args.json:
+            print(json.dumps(summary, indent=2))
+        else:
+            print_contention(summary)
+    elif args.command == "synth":
+        synth_session(args.session, args.notes, args.rate, args.chord_size, args.seed, args.ports)
+    elif args.command == "bench":
+        listener = setup_logging(args.log_level)
+        try:
+            summary = asyncio.run(benchmark(args.session, args.speed, args.settle, args.capture,
+                                            ws_port=args.ws_port, osc_port=args.osc_port,
+                                            udp_port=args.udp_port, metrics_port=args.metrics_port,
+                                            telemetry_interval=args.telemetry_interval))
+        finally:
+            listener.stop()
+        if args.json:
+            print(json.dumps(summary, indent=2))
+        else:
+            print_summary(summary)
+    else:
+        listener = setup_logging("INFO")
+        try:
+            asyncio.run(run_standins(args.out, args.ws_port, args.osc_port))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            listener.stop()
+
+
+if __name__ == "__main__":
+    main()
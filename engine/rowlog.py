@@ -0,0 +1,432 @@
+"""
+Append-only log of corpus rows, recorded by the engine itself.
+
+    python base.py --row-log sessions/2025-10-18.rowlog --fsync-interval 1
+    python -m engine.rowlog info sessions/2025-10-18.rowlog
+    python -m engine.rowlog compact sessions/2025-10-18.rowlog -o data/corpus_2025-10-18.json
+
+The engine captures one row per sixteenth of the beat grid from its
+published state (Tempo, TimeSig, Bar, Beat, Bass, SopPc, PitchClassSet,
+ChordCode, MidNum, ...) merged with the latest cells the frontend sent
+in `rowCells` messages (FER, Photo, session metadata):
+
+    {"type": "rowCells", "cells": {"FER": "[50]", "Photo": "data:image/jpeg;base64,..."}}
+
+Rows are not kept in memory: each is appended to the log as one record, so
+a crash loses at most what was not yet fsynced.  The file is the magic
+b"ROWLOG1\\n" followed by records
+
+    u32 big-endian payload length | u32 CRC-32 of the payload | payload (UTF-8 JSON)
+
+where a payload is {"k": "meta", ...} (recording started), {"k": "photo",
+"sha256": hex, "mime": "image/jpeg"} (first use of a photo) or {"k": "row",
+"cells": {...}}.  A Photo cell is logged as "sha256:<hex>"; the bytes are
+stored once in a corpusdb BlobStore at <log>.photos/.  Reading stops at the first short or corrupt record, which is
+where a crash cut the log; recording into an existing log truncates that
+tail and carries on numbering.
+
+`compact` writes the session in the frontend's corpus JSON schema
+({"rows": [...], "meta": null}, 2-space indent, photos inlined as data
+URLs), one row at a time.  Rows hold the schema's columns only: the
+named ones below (the EEG band columns included), then whatever the
+frontend sent (spectrum bins, ...).
+
+If a write or fsync fails (disk full, removed drive) the writer logs it
+and stops; the recorder is then `failed` and refuses further rows
+instead of queueing what it can no longer persist.
+"""
+import argparse
+import base64
+import binascii
+import collections
+import datetime
+import hashlib
+import json
+import logging
+import os
+import queue
+import re
+import struct
+import sys
+import threading
+import time
+import zlib
+
+from corpusdb.blobs import BlobStore
+
+from .eeg import BAND_COLUMNS
+
+log = logging.getLogger("engine.rowlog")
+
+MAGIC = b"ROWLOG1\n"
+_HEADER = struct.Struct(">II")
+_DATA_URL = re.compile(r"data:([\w/+.-]+);base64,")
+
+# The corpus schema's columns, in order, with the cell the frontend writes
+# when it has no value; the spectrum columns follow as sent.
+CORPUS_COLUMNS = (
+    "#", "FER", "Photo", "Performance Date", "Unique Id", "Project", "DataStatus", "Artist", "Title",
+    "PerfPractice", "Period", "Style", "Genre", "Subject", "Gender", "Education", "Country",
+    "Ethnicity", "Proficiency", "Tempo", "TimeSig", "ms", "Qua", "Beat", "Bar", "jsSenMem", "Key",
+    "KeyQ", "RomNumB", "RomNum", "Bass", "SopPc", "PitchClassSet", "ChordCode", "UpdatedMod",
+    "MidNum", "GoNoGoPar", "ExtVal", "IntVal", "EmoExtPar", "EmoExtVal", "EmoExtAve", "EmoIntPar",
+    "EmoIntVal", "EmoIntAve", "acc1", "acc2", "acc3",
+    "elec1", "elec2", "elec3", "elec4", "elec5", "elec6", "elec7", "elec8",
+) + tuple(name for columns in BAND_COLUMNS for name in columns)
+PLACEHOLDERS = {
+    **dict.fromkeys(("Subject", "Gender", "Education", "Country", "Ethnicity", "Proficiency",
+                     "Key", "KeyQ", "PitchClassSet", "MidNum"), "[-]"),
+    **dict.fromkeys(("Photo", "RomNumB", "RomNum", "ChordCode", "GoNoGoPar", "ExtVal", "IntVal"), ""),
+    **dict.fromkeys((name for columns in BAND_COLUMNS for name in columns), ""),
+    **dict.fromkeys(("Bass", "SopPc"), "---"),
+}
+
+
+def photo_dir(path):
+    return path + ".photos"
+
+
+def js_number(value):
+    """A number spelled the way JavaScript's String() does: 78, 78.5, 3.076923076923077."""
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def js_date(dt):
+    """toLocaleString("en-US"): "9/27/2025, 1:44:58 AM"."""
+    return (f"{dt.month}/{dt.day}/{dt.year}, {dt.hour % 12 or 12}:{dt.minute:02d}:{dt.second:02d} "
+            f"{'AM' if dt.hour < 12 else 'PM'}")
+
+
+def row_cells(n, started, elapsed, snap, position, division, frontend):
+    """
+    Corpus row `n` from a StateSnapshot: `position` is (bar, beat, fraction)
+    on the beat grid (bar None when unknown), `elapsed` seconds since the
+    recording started, `frontend` the latest rowCells cells.
+    """
+    bar, beat, fraction = position
+    notes = snap.notes
+    cells = {
+        "#": str(n),
+        "Performance Date": js_date(started),
+        "Tempo": js_number(snap.tempo),
+        "TimeSig": f"{snap.numerator}/{snap.denominator}",
+        "ms": f"{elapsed:.2f}",
+        "Qua": str(int(fraction * division + 1e-6) + 1),
+        "Beat": str(beat),
+        "Bar": "-" if bar is None else str(bar),
+        "jsSenMem": js_number(snap.sensory_memory),
+    }
+    if notes:
+        cells["Bass"] = str(notes[0] % 12)
+        cells["SopPc"] = str(notes[-1] % 12)
+        cells["PitchClassSet"] = "[" + " - ".join(map(str, sorted(snap.pcs))) + "]"
+        cells["ChordCode"] = snap.chord_code
+        cells["MidNum"] = "[" + ", ".join(map(str, notes)) + "]"
+    if snap.eeg is not None:
+        cells.update(snap.eeg.row_fields())
+    row = {}
+    for name in CORPUS_COLUMNS:
+        value = cells.get(name)
+        row[name] = value if value is not None else frontend.get(name, PLACEHOLDERS.get(name, "-"))
+    for name, value in frontend.items():
+        if name not in row:
+            row[name] = value
+    return row
+
+
+# --- reading ----------------------------------------------------------------
+
+def _scan(f):
+    """(end offset, record) for every intact record of an open log."""
+    if f.read(len(MAGIC)) != MAGIC:
+        raise ValueError("not a row log")
+    offset = len(MAGIC)
+    while True:
+        header = f.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            return
+        size, crc = _HEADER.unpack(header)
+        payload = f.read(size)
+        if len(payload) < size or zlib.crc32(payload) != crc:
+            return
+        offset += _HEADER.size + size
+        yield offset, json.loads(payload)
+
+
+def read_log(path):
+    """Yield the records of a row log, up to a torn or corrupt tail."""
+    with open(path, "rb") as f:
+        for _, record in _scan(f):
+            yield record
+
+
+def _encode(record):
+    payload = json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return _HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def _fsync_path(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+# --- writing ----------------------------------------------------------------
+
+class RowRecorder:
+    """
+    Background writer of one row log.
+
+    capture() and append() may be called from any thread and only enqueue;
+    a snapshot is immutable, so the row itself is formatted on the writer
+    thread.  The writer takes everything that queued up since its last
+    pass and writes it with a single write() (group commit), then fsyncs
+    log and new photo files once `fsync_interval` seconds have passed since
+    the last fsync (0: after every pass).  stop() drains, fsyncs and closes.
+    capture() and append() return False once the writer has failed.
+    """
+
+    def __init__(self, path, fsync_interval=1.0, division=4):
+        self.path = path
+        self.photos = BlobStore(photo_dir(path))
+        self.fsync_interval = max(0.0, float(fsync_interval))
+        self.division = division
+        self.rows = 0
+        self.started = None
+        self.failed = None  # the OSError that stopped the writer
+        self.stats = collections.Counter()
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._file = None
+        self._known = set()      # photo digests with a photo record in the log
+        self._last_photo = None  # (data URL, "sha256:<hex>") of the previous row
+
+    def start(self):
+        valid_end = len(MAGIC)
+        if os.path.exists(self.path) and os.path.getsize(self.path):
+            with open(self.path, "rb") as f:
+                try:
+                    for valid_end, record in _scan(f):
+                        if record["k"] == "row":
+                            self.rows += 1
+                        elif record["k"] == "photo":
+                            self._known.add(record["sha256"])
+                except ValueError as e:
+                    raise ValueError(f"{self.path}: {e}") from None
+            torn = os.path.getsize(self.path) - valid_end
+            if torn:
+                log.warning("⚠️ %s: dropping a torn tail of %s bytes", self.path, torn)
+        self._file = open(self.path, "r+b" if os.path.exists(self.path) else "w+b")
+        self._file.truncate(valid_end)
+        self._file.seek(0)
+        self._file.write(MAGIC)
+        self._file.seek(valid_end)
+        self.started = datetime.datetime.now()
+        self.failed = None
+        self._queue.put(("meta", {"k": "meta", "started": self.started.isoformat(),
+                                  "resumed": self.rows > 0}))
+        self._thread = threading.Thread(target=self._write_loop, name="row-log", daemon=True)
+        self._thread.start()
+        log.info("⏺️ Recording corpus rows to %s (fsync every %s s)", self.path, self.fsync_interval)
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+            self._file.close()
+            log.info("⏹️ %s rows in %s", self.rows, self.path)
+
+    # --- producers (any thread) -----------------------------------------------
+
+    def capture(self, snap, position, elapsed, frontend):
+        """Queue a row built from StateSnapshot `snap` (see row_cells); False if the log failed."""
+        return self._put(("capture", (snap, position, elapsed, frontend)))
+
+    def append(self, cells):
+        """Queue a ready row (cell dict); a data-URL Photo is stored by hash like a captured one."""
+        return self._put(("row", cells))
+
+    def _put(self, item):
+        if self.failed is not None:
+            self.stats["dropped"] += 1
+            return False
+        self._queue.put(item)
+        return True
+
+    # --- writer thread ----------------------------------------------------------
+
+    def _write_loop(self):
+        f = self._file
+        new_photos = []
+        unsynced = False
+        last_sync = time.monotonic()
+        running = True
+        while running:
+            timeout = None
+            if unsynced:
+                timeout = max(0.0, last_sync + self.fsync_interval - time.monotonic())
+            try:
+                items = [self._queue.get(timeout=timeout)]
+            except queue.Empty:
+                items = []
+            while True:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            out = []
+            for item in items:
+                if item is None:
+                    running = False
+                    continue
+                try:
+                    out.extend(self._records(*item, new_photos))
+                except Exception as e:  # one bad row must not stop the recording
+                    self.stats["errors"] += 1
+                    log.warning("⚠️ row log: %s", e)
+            try:
+                if out:
+                    data = b"".join(out)
+                    f.write(data)
+                    f.flush()
+                    unsynced = True
+                    self.stats["batches"] += 1
+                    self.stats["records"] += len(out)
+                    self.stats["bytes"] += len(data)
+                if unsynced and (not running or time.monotonic() - last_sync >= self.fsync_interval):
+                    for path in new_photos:
+                        _fsync_path(path)
+                    new_photos.clear()
+                    os.fsync(f.fileno())
+                    self.stats["fsyncs"] += 1
+                    last_sync = time.monotonic()
+                    unsynced = False
+            except OSError as e:
+                self.failed = e
+                self.stats["write_errors"] += 1
+                log.error("❌ Row log %s: %s; recording stopped, further rows are dropped", self.path, e)
+                return
+
+    def _records(self, kind, item, new_photos):
+        if kind == "meta":
+            return [_encode(item)]
+        if kind == "capture":
+            snap, position, elapsed, frontend = item
+            cells = row_cells(self.rows + 1, self.started, elapsed, snap, position, self.division,
+                              frontend)
+        else:
+            cells = dict(item)
+        records = []
+        photo = cells.get("Photo")
+        if isinstance(photo, str) and photo.startswith("data:"):
+            cells["Photo"] = self._photo_ref(photo, records, new_photos)
+        self.rows += 1
+        records.append(_encode({"k": "row", "cells": cells}))
+        return records
+
+    def _photo_ref(self, url, records, new_photos):
+        last = self._last_photo
+        if last is not None and (url is last[0] or url == last[0]):
+            return last[1]
+        m = _DATA_URL.match(url)
+        try:
+            data = base64.b64decode(url[m.end():], validate=True) if m else None
+        except (binascii.Error, ValueError):
+            data = None
+        if data is None:
+            self.stats["bad_photos"] += 1
+            return url
+        hexdigest = hashlib.sha256(data).hexdigest()
+        if hexdigest not in self._known:
+            if hexdigest not in self.photos:
+                self.photos.put(data)
+                new_photos.append(self.photos.path(hexdigest))
+                self.stats["photos"] += 1
+            self._known.add(hexdigest)
+            records.append(_encode({"k": "photo", "sha256": hexdigest, "mime": m.group(1)}))
+        ref = "sha256:" + hexdigest
+        self._last_photo = (url, ref)
+        return ref
+
+
+# --- compaction -----------------------------------------------------------------
+
+def compact(path, output, photos="inline"):
+    """
+    Write the rows of log `path` as a corpus JSON file ({"rows": [...],
+    "meta": null}); `photos="ref"` keeps the "sha256:<hex>" cells instead of
+    inlining data URLs.  Returns the number of rows.
+    """
+    mimes = {}
+    blobs = BlobStore(photo_dir(path))
+    rows = 0
+    tmp = f"{output}.tmp-{os.getpid()}"
+    try:
+        with open(tmp, "w", encoding="utf-8") as out:
+            out.write('{\n  "rows": [')
+            for record in read_log(path):
+                if record["k"] == "photo":
+                    mimes[record["sha256"]] = record["mime"]
+                    continue
+                if record["k"] != "row":
+                    continue
+                cells = record["cells"]
+                photo = cells.get("Photo")
+                if photos == "inline" and isinstance(photo, str) and photo.startswith("sha256:"):
+                    hexdigest = photo[len("sha256:"):]
+                    encoded = base64.b64encode(blobs.get(hexdigest)).decode("ascii")
+                    cells["Photo"] = f"data:{mimes.get(hexdigest, 'image/jpeg')};base64,{encoded}"
+                # JSON.stringify(document, null, 2), one row at a time
+                text = json.dumps(cells, indent=2, ensure_ascii=False).replace("\n", "\n    ")
+                out.write(("\n    " if not rows else ",\n    ") + text)
+                rows += 1
+            out.write("\n  ],\n" if rows else "],\n")
+            out.write('  "meta": null\n}')
+        os.replace(tmp, output)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return rows
+
+
+def info(path):
+    counts = collections.Counter()
+    with open(path, "rb") as f:
+        valid_end = len(MAGIC)
+        for valid_end, record in _scan(f):
+            counts[record["k"]] += 1
+    return {"rows": counts["row"], "photos": counts["photo"], "recordings": counts["meta"],
+            "bytes": valid_end, "torn_bytes": os.path.getsize(path) - valid_end}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect or compact an engine row log.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("info", help="count the records of a log")
+    p.add_argument("log")
+    p = sub.add_parser("compact", help="write the log as a corpus JSON session")
+    p.add_argument("log")
+    p.add_argument("-o", "--output", help="output file (default: the log name with .json)")
+    p.add_argument("--photos", choices=("inline", "ref"), default="inline",
+                   help="inline photos as data URLs (the frontend's schema) or keep sha256 references")
+    args = parser.parse_args(argv)
+    try:
+        if args.command == "info":
+            print(json.dumps(info(args.log)))
+        else:
+            output = args.output or os.path.splitext(args.log)[0] + ".json"
+            started = time.perf_counter()
+            rows = compact(args.log, output, args.photos)
+            print(f"compact {args.log} -> {output}: {rows} rows, "
+                  f"{os.path.getsize(output) / 1024:.0f} KiB in {time.perf_counter() - started:.2f} s")
+    except (ValueError, OSError) as e:
+        sys.exit(f"{args.log}: {e}")
+
+
+if __name__ == "__main__":
+    main()
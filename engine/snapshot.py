@@ -0,0 +1,75 @@
+from .pitchclass import MEMBERS
+
+
+class PortView:
+    """One port shard as of a snapshot: label, pitch-class mask, sounding notes, note-ons."""
+
+    __slots__ = ("label", "pc_mask", "sounding", "note_ons")
+
+    def __init__(self, label, pc_mask, sounding, note_ons):
+        self.label = label
+        self.pc_mask = pc_mask
+        self.sounding = sounding
+        self.note_ons = note_ons
+
+    def pcs(self):
+        return list(MEMBERS[self.pc_mask])
+
+
+class StateSnapshot:
+    """
+    The musical state after one event, frozen.
+
+    The engine mutates its working state (port shards, UDP pitch classes,
+    scale9401, tempo) on the loop thread and, once the event is applied,
+    publishes a new snapshot by rebinding `Engine.snapshot`.  A reader holds
+    on to whichever snapshot it picked up: every field belongs to the same
+    event, nothing in it changes afterwards, and reading it takes no lock,
+    from the loop or from any other thread.  Fields are ints, floats, strings
+    and tuples; pitch-class sets are 12-bit masks.
+    """
+
+    __slots__ = ("seq", "tempo", "sensory_memory", "numerator", "denominator", "bar", "notes", "pcs",
+                 "chord_code", "pc_mask", "udp_mask", "counts", "scale_mask", "first_note_scale",
+                 "ports", "eeg")
+
+    def __init__(self, seq, tempo, sensory_memory, numerator, denominator, bar, notes, pcs, chord_code,
+                 pc_mask, udp_mask, counts, scale_mask, first_note_scale, ports, eeg):
+        setter = object.__setattr__
+        setter(self, "seq", seq)
+        setter(self, "tempo", tempo)
+        setter(self, "sensory_memory", sensory_memory)
+        setter(self, "numerator", numerator)
+        setter(self, "denominator", denominator)
+        setter(self, "bar", bar)
+        setter(self, "notes", notes)                # sounding MIDI notes, ascending
+        setter(self, "pcs", pcs)                    # their pitch classes, bass up
+        setter(self, "chord_code", chord_code)
+        setter(self, "pc_mask", pc_mask)            # MIDI pitch classes in sensory memory
+        setter(self, "udp_mask", udp_mask)          # pitch classes from UDP bar numbers
+        setter(self, "counts", counts)              # countNotes, the ports' running total
+        setter(self, "scale_mask", scale_mask)
+        setter(self, "first_note_scale", first_note_scale)
+        setter(self, "ports", ports)                # PortView per shard
+        setter(self, "eeg", eeg)                    # latest eeg.EegFeatures, or None
+
+    def __setattr__(self, name, value):
+        raise AttributeError("StateSnapshot is immutable; the engine publishes a new one")
+
+    def __delattr__(self, name):
+        raise AttributeError("StateSnapshot is immutable; the engine publishes a new one")
+
+    @property
+    def bass(self):
+        return self.notes[0] if self.notes else None
+
+    @property
+    def soprano(self):
+        return self.notes[-1] if self.notes else None
+
+    def sm_capacity(self):
+        """sMCapacity of the state frame: MIDI and UDP pitch classes together."""
+        return list(MEMBERS[self.pc_mask | self.udp_mask])
+
+    def scale(self):
+        return list(MEMBERS[self.scale_mask])
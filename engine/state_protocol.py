@@ -0,0 +1,109 @@
+import json
+import logging
+
+log = logging.getLogger("engine.state")
+
+
+class StateChannel:
+    """
+    Versioned state stream towards the frontend.
+
+    In the default "full" mode every coalesced state frame is sent as-is
+    (legacy updateState JSON).  A frontend can opt into "delta" mode with
+
+        {"type": "stateProtocol", "mode": "delta", "encoding": "json" | "msgpack"}
+
+    after which it receives one stateSnapshot carrying every known field,
+    then stateDelta frames with a running `seq` and only the fields whose
+    value changed.  A gap in `seq` means a lost frame: the frontend sends
+    {"type": "stateResync"} and gets a fresh snapshot.
+
+    The choice lasts one connection: reset() (on every connect) goes back
+    to full JSON, and the first flush then carries every known field in
+    one updateState frame, so a reloaded page that has not asked for
+    deltas yet still gets state it can read.
+    """
+
+    VERSION = 1
+    MODES = ("full", "delta")
+    ENCODINGS = ("json", "msgpack")
+
+    def __init__(self):
+        self.mode = "full"
+        self.encoding = "json"
+        self.seq = 0
+        self.current = {}  # latest value of every state field ever published
+        self._sent = {}    # what the frontend holds (delta mode only)
+        self.snapshot_due = False
+
+    def configure(self, mode="delta", encoding="json"):
+        if mode not in self.MODES:
+            raise ValueError(f"unknown state mode: {mode!r}")
+        if encoding not in self.ENCODINGS:
+            raise ValueError(f"unknown state encoding: {encoding!r}")
+        if encoding == "msgpack":
+            try:
+                import msgpack  # noqa: F401  (optional dependency)
+            except ImportError:
+                log.warning("⚠️ msgpack is not installed; falling back to JSON state frames.")
+                encoding = "json"
+        self.mode = mode
+        self.encoding = encoding
+        self.request_snapshot()
+
+    def reset(self):
+        """New connection: full JSON frames, starting with every known field."""
+        self.mode = "full"
+        self.encoding = "json"
+        self._sent = {}
+        self.request_snapshot()
+
+    def request_snapshot(self):
+        """Send every known field with the next flush (on connect / resync)."""
+        self.snapshot_due = True
+
+    def encode(self, frames):
+        """Fold pending state frames into the channel and return the payloads to send."""
+        for frame in frames:
+            for key, value in frame.items():
+                if key != "type":
+                    self.current[key] = value
+
+        if self.mode == "full":
+            if self.snapshot_due:
+                self.snapshot_due = False
+                if self.current:
+                    return [json.dumps({"type": "updateState", **self.current})]
+            return [json.dumps(frame) for frame in frames]
+
+        if self.snapshot_due:
+            self.snapshot_due = False
+            self._sent = {k: _copy(v) for k, v in self.current.items()}
+            return [self._pack({"type": "stateSnapshot", "v": self.VERSION,
+                                "seq": self._next_seq(), "state": self.current})]
+
+        changed = {}
+        for key, value in self.current.items():
+            if key not in self._sent or self._sent[key] != value:
+                changed[key] = value
+                self._sent[key] = _copy(value)
+        if not changed:
+            return []
+        return [self._pack({"type": "stateDelta", "v": self.VERSION,
+                            "seq": self._next_seq(), "set": changed})]
+
+    def _next_seq(self):
+        self.seq += 1
+        return self.seq
+
+    def _pack(self, message):
+        if self.encoding == "msgpack":
+            import msgpack
+            return msgpack.packb(message)
+        return json.dumps(message, separators=(",", ":"))
+
+
+def _copy(value):
+    # State values are scalars or flat lists; lists such as countNotes are
+    # mutated in place, so keep our own copy to diff against.
+    return list(value) if isinstance(value, list) else value
@@ -0,0 +1,253 @@
+import asyncio
+import collections
+import logging
+import re
+import socket
+import time
+
+log = logging.getLogger("engine.udp")
+
+# Packet classes, decided by the first byte only.
+MIDI, TEXT_BAR, INT_BAR, UNKNOWN = range(4)
+KIND_NAMES = ("midi", "text_bar", "int_bar", "unknown")
+
+
+def _build_classifier():
+    table = [INT_BAR] * 256          # 0x00-0x1F, 0x7F, 0xF0-0xFF: raw signed int
+    for b in range(0x80, 0xF0):
+        table[b] = MIDI              # channel-voice status byte
+    for b in range(0x20, 0x7F):
+        table[b] = TEXT_BAR          # printable ASCII: "/bar 12", "1. 1. 1", ...
+    for b in (0x09, 0x0A, 0x0D):
+        table[b] = TEXT_BAR
+    return bytes(table)
+
+
+CLASSIFIER = _build_classifier()
+
+_BAR_CMD = re.compile(rb'/bar\s+(\d+)')
+_FIRST_NUMBER = re.compile(rb'(\d+)')
+_NUL = re.compile(rb'\x00')
+
+
+def osc_int_argument(data):
+    """
+    First argument of an OSC message whose type tag starts with ",i"
+    ("/bar\0\0\0\0,i\0\0" + big-endian int32), or None.  The address and
+    the type tag are NUL-terminated and padded to a multiple of 4 bytes.
+    """
+    data = bytes(data)
+    if not data.startswith(b"/"):
+        return None
+    tag = (data.find(b"\x00") + 4) & ~3
+    end = data.find(b"\x00", tag)
+    if tag == 0 or end < 0 or data[tag:tag + 2] != b",i":
+        return None
+    arg = (end + 4) & ~3
+    if len(data) < arg + 4:
+        return None
+    return int.from_bytes(data[arg:arg + 4], byteorder='big', signed=True)
+
+
+class UdpIngest:
+    """
+    Port 9401 ingest: drains the socket in batches and routes every datagram
+    to exactly one decoder.
+
+    - MIDI packets are walked as 3-byte windows over a memoryview; note-ons
+      reach `on_note_on(note, velocity, channel)` without building a mido
+      Message per event.
+    - Text packets go through precompiled byte regexes (no UTF-8 decode).
+      An OSC message ("/bar" ",i" int32) starts printable too; its int
+      argument is decoded as an int bar.  Text without any number falls
+      back to the int reading below, as the old listener did.
+    - Anything else is read as a big-endian signed int from its last 4 bytes.
+
+    `on_batch()` runs once after each drained batch, so per-packet follow-up
+    work (the legacy state push) is paid once per burst instead of per packet.
+    `on_packet(data)`, if set, sees every raw datagram before decoding (the
+    session recorder uses it); `data` may be a view into the reused buffer.
+
+    On selector loops the socket is drained with `add_reader` + recvfrom_into
+    into one preallocated buffer.  The Windows proactor loop has no
+    `add_reader`; there we fall back to a DatagramProtocol and coalesce
+    `on_batch` with call_soon.
+    """
+
+    def __init__(self, host, port, on_note_on, on_text_bar, on_int_bar, on_batch=None,
+                 rcvbuf=1 << 20, batch_max=256, bufsize=65536, on_packet=None):
+        self.address = (host, port)
+        self.on_note_on = on_note_on
+        self.on_text_bar = on_text_bar
+        self.on_int_bar = on_int_bar
+        self.on_batch = on_batch
+        self.on_packet = on_packet
+        self.rcvbuf = rcvbuf
+        self.batch_max = batch_max
+        self.stats = collections.Counter()
+
+        self._buf = bytearray(bufsize)
+        self._view = memoryview(self._buf)
+        self._sock = None
+        self._loop = None
+        self._transport = None
+        self._batch_pending = False
+        self.batch_received = None  # perf_counter() when the current batch started
+        self._rate_mark = (time.monotonic(), 0, 0)
+
+    # --- lifecycle --------------------------------------------------------
+
+    async def start(self, loop):
+        self._loop = loop
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.rcvbuf)
+        except OSError as e:
+            log.warning("⚠️ Could not enlarge UDP receive buffer: %s", e)
+        sock.bind(self.address)
+        sock.setblocking(False)
+        try:
+            loop.add_reader(sock.fileno(), self._drain)
+            self._sock = sock
+        except NotImplementedError:
+            self._transport, _ = await loop.create_datagram_endpoint(
+                lambda: _DatagramFallback(self), sock=sock)
+
+    def stop(self):
+        if self._sock is not None:
+            self._loop.remove_reader(self._sock.fileno())
+            self._sock.close()
+            self._sock = None
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+
+    # --- ingest -----------------------------------------------------------
+
+    def _drain(self):
+        sock, view = self._sock, self._view
+        self.batch_received = time.perf_counter()
+        handled = 0
+        while handled < self.batch_max:
+            try:
+                n, _ = sock.recvfrom_into(self._buf)
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError as e:
+                # e.g. Windows WSAECONNRESET after an ICMP port-unreachable
+                self.stats["recv_errors"] += 1
+                log.warning("UDP listener error: %s", e)
+                break
+            handled += 1
+            if n == len(self._buf):
+                self.stats["truncated"] += 1
+            self.handle_packet(view[:n])
+        if handled:
+            self.stats["batches"] += 1
+            if handled == self.batch_max:
+                self.stats["full_batches"] += 1  # more may be waiting; next wakeup continues
+            self._end_batch()
+
+    def handle_packet(self, data):
+        """Decode one datagram (bytes or memoryview); returns its packet class."""
+        self.stats["packets"] += 1
+        self.stats["bytes"] += len(data)
+        if self.on_packet is not None:
+            self.on_packet(data)
+        if not data:
+            self.stats["empty"] += 1
+            return UNKNOWN
+        kind = CLASSIFIER[data[0]]
+        try:
+            if kind == MIDI:
+                self._decode_midi(data)
+            elif kind == TEXT_BAR and self._decode_text(data):
+                pass
+            elif kind == TEXT_BAR and (value := osc_int_argument(data)) is not None:
+                kind = INT_BAR
+                self.stats["osc_bar"] += 1
+                self.on_int_bar(value)
+            elif len(data) >= 4:
+                kind = INT_BAR
+                self.stats["int_bar"] += 1
+                self.on_int_bar(int.from_bytes(data[-4:], byteorder='big', signed=True))
+            else:
+                self.stats["dropped_short"] += 1
+                kind = UNKNOWN
+        except Exception as e:
+            self.stats["handler_errors"] += 1
+            log.exception("UDP listener error: %s", e)
+        return kind
+
+    def _decode_midi(self, data):
+        self.stats["midi"] += 1
+        n = len(data) - len(data) % 3
+        if n != len(data):
+            self.stats["midi_trailing_bytes"] += 1
+        for i in range(0, n, 3):
+            status = data[i]
+            note = data[i + 1]
+            velocity = data[i + 2]
+            if not 0x80 <= status <= 0xEF or (note | velocity) & 0x80:
+                self.stats["midi_invalid"] += 1
+                continue
+            self.stats["midi_events"] += 1
+            if status & 0xF0 == 0x90 and velocity > 0:
+                self.on_note_on(note, velocity, status & 0x0F)
+
+    def _decode_text(self, data):
+        """Bar from a text packet; False when it is not one (OSC, or no number in it)."""
+        if _NUL.search(data):
+            return False  # OSC padding; text bars never hold NUL
+        m = _BAR_CMD.search(data)
+        if m is None:
+            m = _FIRST_NUMBER.search(data)
+        if m is None:
+            return False
+        self.stats["text_bar"] += 1
+        self.on_text_bar(int(m.group(1)), data)
+        return True
+
+    def _end_batch(self):
+        self._batch_pending = False
+        if self.on_batch is not None:
+            try:
+                self.on_batch()
+            except Exception as e:
+                log.exception("⚠️ UDP batch handler error: %s", e)
+
+    def _schedule_batch_end(self):
+        if not self._batch_pending:
+            self._batch_pending = True
+            self._loop.call_soon(self._end_batch)
+
+    # --- reporting --------------------------------------------------------
+
+    def rates(self):
+        """Packets and bytes per second since the previous call."""
+        now = time.monotonic()
+        then, packets, nbytes = self._rate_mark
+        self._rate_mark = (now, self.stats["packets"], self.stats["bytes"])
+        elapsed = max(now - then, 1e-9)
+        return ((self.stats["packets"] - packets) / elapsed,
+                (self.stats["bytes"] - nbytes) / elapsed)
+
+    def drop_count(self):
+        s = self.stats
+        return (s["dropped_short"] + s["empty"] + s["truncated"]
+                + s["midi_invalid"] + s["handler_errors"])
+
+
+class _DatagramFallback(asyncio.DatagramProtocol):
+    def __init__(self, ingest):
+        self.ingest = ingest
+
+    def datagram_received(self, data, addr):
+        if not self.ingest._batch_pending:
+            self.ingest.batch_received = time.perf_counter()
+        self.ingest.handle_packet(data)
+        self.ingest._schedule_batch_end()
+
+    def error_received(self, exc):
+        self.ingest.stats["recv_errors"] += 1
+        log.warning("UDP listener error: %s", exc)
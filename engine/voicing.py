@@ -0,0 +1,114 @@
+class VoicingTracker:
+    """
+    Sounding MIDI notes, kept so that voicing queries never re-sort.
+
+    Notes live in two places: a dict (insertion order, O(1) add/discard,
+    which is what the legacy `midi_notes` list exposed) and a 128-bit integer
+    with one bit per MIDI note number.  Bass and soprano are the lowest and
+    highest set bits; ascending order and the bass-up pitch-class order are
+    a single walk over the set bits, cached until the next change.
+    """
+
+    __slots__ = ("_notes", "_mask", "_pc_mask", "_ascending", "_bass_up")
+
+    def __init__(self):
+        self._notes = {}
+        self._mask = 0
+        self._pc_mask = 0
+        self._ascending = None
+        self._bass_up = None
+
+    @classmethod
+    def from_mask(cls, mask):
+        """Tracker holding the notes of a 128-bit mask (ascending insertion order)."""
+        tracker = cls()
+        tracker._mask = mask
+        tracker._invalidate()
+        tracker._notes = dict.fromkeys(tracker.ascending())
+        return tracker
+
+    # --- mutation ---------------------------------------------------------
+
+    def add(self, note):
+        if note in self._notes:
+            return
+        self._notes[note] = None
+        self._mask |= 1 << note
+        self._invalidate()
+
+    def discard(self, note):
+        if note not in self._notes:
+            return
+        del self._notes[note]
+        self._mask &= ~(1 << note)
+        self._invalidate()
+
+    def clear(self):
+        self._notes.clear()
+        self._mask = 0
+        self._invalidate()
+
+    def _invalidate(self):
+        self._ascending = None
+        self._bass_up = None
+        self._pc_mask = None
+
+    # --- queries ----------------------------------------------------------
+
+    def __contains__(self, note):
+        return note in self._notes
+
+    def __len__(self):
+        return len(self._notes)
+
+    def __bool__(self):
+        return bool(self._notes)
+
+    def __iter__(self):
+        """Insertion order, like the old midi_notes list."""
+        return iter(self._notes)
+
+    @property
+    def mask(self):
+        """One bit per sounding MIDI note number."""
+        return self._mask
+
+    @property
+    def bass(self):
+        return (self._mask & -self._mask).bit_length() - 1 if self._mask else None
+
+    @property
+    def soprano(self):
+        return self._mask.bit_length() - 1 if self._mask else None
+
+    def ascending(self):
+        """Sounding notes, lowest first."""
+        if self._ascending is None:
+            out = []
+            m = self._mask
+            while m:
+                low = m & -m
+                out.append(low.bit_length() - 1)
+                m ^= low
+            self._ascending = out
+        return self._ascending
+
+    def pitch_classes_bass_up(self):
+        """Pitch classes ordered by the lowest sounding note of each class."""
+        if self._bass_up is None:
+            seen = 0
+            out = []
+            for note in self.ascending():
+                bit = 1 << (note % 12)
+                if not seen & bit:
+                    seen |= bit
+                    out.append(note % 12)
+            self._bass_up = out
+            self._pc_mask = seen
+        return self._bass_up
+
+    @property
+    def pc_mask(self):
+        if self._pc_mask is None:
+            self.pitch_classes_bass_up()
+        return self._pc_mask
@@ -0,0 +1,108 @@
+import json
+import logging
+import re
+import time
+
+log = logging.getLogger("engine.ws")
+
+# The frontend serialises {"type": ..., ...} with `type` first, so the type
+# can be read off the start of the frame without parsing the rest.
+_TYPE_PREFIX = re.compile(r'\s*\{\s*"type"\s*:\s*"([^"\\]{1,64})"')
+_TYPE_PREFIX_BYTES = re.compile(rb'\s*\{\s*"type"\s*:\s*"([^"\\]{1,64})"')
+
+
+def peek_type(message):
+    """Message type read from the frame prefix, or None if it is not there."""
+    if isinstance(message, str):
+        m = _TYPE_PREFIX.match(message)
+        return m.group(1) if m else None
+    m = _TYPE_PREFIX_BYTES.match(message)
+    return m.group(1).decode("ascii", errors="replace") if m else None
+
+
+class MessageDispatcher:
+    """
+    Table-driven handling of inbound WebSocket frames.
+
+    Each message type maps to one handler taking the parsed dict (or, with
+    `parse=False`, the raw frame).  Types registered with `drop()` are
+    discarded on the prefix check alone, before json.loads, which is what
+    keeps a high-rate stream such as eeg_sample off the control path.
+    Frames whose prefix cannot be read fall back to a full parse.
+
+    With `metrics`, every type gets a message counter and a handler-time
+    histogram (parse included); `mark=True` also records the message as a
+    session event.
+    """
+
+    def __init__(self, metrics=None):
+        self.metrics = metrics
+        self._routes = {}  # type -> (handler or None, parse, mark)
+        self._hist = {}
+        if metrics is not None:
+            metrics.describe("engine_ws_messages_total", "Inbound WebSocket messages handled, by type.")
+            metrics.describe("engine_ws_dropped_total",
+                             "Inbound WebSocket frames discarded (by prefix type, or 'invalid').")
+            metrics.describe("engine_ws_handler_seconds",
+                             "Inbound WebSocket handling time per type, JSON parse included.")
+
+    def register(self, msg_type, handler, parse=True, mark=False):
+        self._routes[msg_type] = (handler, parse, mark)
+
+    def drop(self, *msg_types):
+        for msg_type in msg_types:
+            self._routes[msg_type] = (None, False, False)
+
+    def dispatch(self, message):
+        msg_type = peek_type(message)
+        route = self._routes.get(msg_type) if msg_type is not None else None
+        if route is not None and route[0] is None:
+            self._count("engine_ws_dropped_total", msg_type)
+            return
+
+        started = time.perf_counter()
+        if route is None or route[1]:
+            # Güvenli JSON parse: JSON değilse sessizce geç
+            try:
+                data = json.loads(message)
+            except Exception:
+                self._count("engine_ws_dropped_total", "invalid")
+                return
+            # 'type' alanı yoksa sessizce geç
+            if not isinstance(data, dict) or not data.get('type'):
+                self._count("engine_ws_dropped_total", "invalid")
+                return
+            if data['type'] != msg_type:
+                msg_type = data['type']
+                route = self._routes.get(msg_type)
+            payload = data
+        else:
+            payload = message
+
+        if route is None:
+            # Tanınmayan tipler için uyarı basmıyoruz; sessizce geç
+            log.debug("Unknown WebSocket message type: %s", msg_type)
+            self._count("engine_ws_messages_total", "unknown")
+            return
+        handler, _, mark = route
+        if handler is None:
+            self._count("engine_ws_dropped_total", msg_type)
+            return
+        try:
+            handler(payload)
+        except Exception as e:
+            log.exception("❌ WebSocket handler error (%s): %s", msg_type, e)
+        if self.metrics is not None:
+            self._count("engine_ws_messages_total", msg_type)
+            if mark:
+                self.metrics.mark(msg_type)
+            hist = self._hist.get(msg_type)
+            if hist is None:
+                hist = self._hist[msg_type] = self.metrics.histogram(
+                    "engine_ws_handler_seconds", type=msg_type)
+            hist.observe(time.perf_counter() - started)
+
+    def _count(self, name, msg_type):
+        if self.metrics is not None:
+            # Same series as metrics.inc(name, type=msg_type), minus the per-call label sort.
+            self.metrics.counters[(name, (("type", msg_type),))] += 1
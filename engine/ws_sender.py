@@ -0,0 +1,190 @@
+import asyncio
+import collections
+import importlib
+import json
+import logging
+import random
+import time
+
+from .state_protocol import StateChannel
+
+log = logging.getLogger("engine.ws")
+
+
+class WebSocketSender:
+    """
+    Owns the frontend WebSocket connection and everything written to it.
+
+    Two lanes feed the socket:
+    - events (midi_note, ablBar, ...) go out as soon as the writer is free; the
+      queue is bounded and the oldest event is dropped when the browser falls
+      behind;
+    - state frames are coalesced per `type` (latest field values win) and
+      flushed at most `state_rate` times per second through a StateChannel,
+      which sends them as-is or as snapshot + deltas (see state_protocol.py).
+
+    Reconnection runs in the background with exponential backoff, so callers
+    on the ingest path never block on the network.  Inbound frames are handed
+    to `on_message` on the event-loop thread.
+
+    If `timer` is given (a metrics.StageTimer), every state flush reports
+    its queue / serialise / send times against the oldest input it carries.
+    """
+
+    def __init__(self, url, on_message=None, state_rate=60.0, max_pending_events=256,
+                 retry_initial=0.5, retry_max=10.0, timer=None):
+        self.url = url
+        self.on_message = on_message
+        self.state_interval = 1.0 / state_rate if state_rate > 0 else 0.0
+        self.retry_initial = retry_initial
+        self.retry_max = retry_max
+        self.stats = collections.Counter()
+        self.timer = timer
+
+        self._events = collections.deque(maxlen=max_pending_events)
+        self._state = {}  # type -> merged state frame, in first-seen order
+        self._stamps = None  # (received, built) of the oldest input since the last flush
+        self._next_state_at = 0.0
+        self._conn = None
+        self.channel = StateChannel()
+        self._wakeup = asyncio.Event()
+        self._tasks = []
+
+    @property
+    def connected(self):
+        return self._conn is not None
+
+    # --- producer side (loop thread, never blocks) ------------------------
+
+    def send_event(self, message):
+        """Queue a discrete frame for low-latency delivery; False while disconnected."""
+        if self._conn is None:
+            self.stats["events_dropped_offline"] += 1
+            return False
+        if len(self._events) == self._events.maxlen:
+            self.stats["events_dropped_overflow"] += 1  # deque drops the oldest
+        self._events.append(message)
+        self._wakeup.set()
+        return True
+
+    def send_state(self, message, received=None):
+        """
+        Merge a state frame into the pending update for its type.
+        `received` is the perf_counter() stamp of the input behind it.
+        """
+        if received is not None and self._stamps is None:
+            self._stamps = (received, time.perf_counter())
+        slot = message.get("type")
+        pending = self._state.get(slot)
+        if pending is None:
+            self._state[slot] = dict(message)
+        else:
+            pending.update(message)
+            self.stats["states_merged"] += 1
+        self._wakeup.set()
+        return self._conn is not None
+
+    def set_state_protocol(self, mode="delta", encoding="json"):
+        """Switch the state lane's framing; the next flush carries a full snapshot."""
+        self.channel.configure(mode, encoding)
+        self._wakeup.set()
+
+    def request_snapshot(self):
+        self.channel.request_snapshot()
+        self._wakeup.set()
+
+    # --- lifecycle --------------------------------------------------------
+
+    def start(self):
+        self._tasks = [
+            asyncio.create_task(self._connection_loop()),
+            asyncio.create_task(self._write_loop()),
+        ]
+
+    async def stop(self):
+        if self._conn is not None:
+            await self._conn.close()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    # --- background tasks -------------------------------------------------
+
+    async def _connection_loop(self):
+        # Imported off-loop on first connect: keeps `import engine` cheap and
+        # lets UDP/MIDI flow while the ~50 ms import runs.
+        websockets = await asyncio.to_thread(importlib.import_module, "websockets")
+        delay = self.retry_initial
+        while True:
+            try:
+                async with websockets.connect(self.url) as conn:
+                    self._conn = conn
+                    self.stats["connects"] += 1
+                    delay = self.retry_initial
+                    log.info("WebSocket connected successfully (%s).", self.url)
+                    # A new page has not negotiated anything yet: full JSON, all fields first.
+                    self.channel.reset()
+                    # Inputs stamped while offline would charge the outage to the latency histogram.
+                    self._stamps = None
+                    self._wakeup.set()
+                    async for message in conn:
+                        if self.on_message is None:
+                            continue
+                        try:
+                            self.on_message(message)
+                        except Exception as e:
+                            log.exception("❌ WebSocket handler error: %s", e)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning("❌ WebSocket error: %s", e)
+            finally:
+                self._conn = None
+                if self._events:
+                    self.stats["events_dropped_offline"] += len(self._events)
+                    self._events.clear()
+            self.stats["reconnects"] += 1
+            # Jitter keeps several engines from reconnecting in lockstep.
+            await asyncio.sleep(delay * random.uniform(0.8, 1.2))
+            delay = min(delay * 2, self.retry_max)
+
+    async def _write_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self._wakeup.clear()
+            conn = self._conn
+            if conn is not None:
+                while self._events and self._conn is conn:
+                    await self._send(conn, json.dumps(self._events.popleft()), "events_sent")
+                if (self._state or self.channel.snapshot_due) and self._conn is conn:
+                    wait = self._next_state_at - loop.time()
+                    if wait <= 0:
+                        frames = list(self._state.values())
+                        self._state.clear()
+                        stamps, self._stamps = self._stamps, None
+                        self._next_state_at = loop.time() + self.state_interval
+                        flushed = time.perf_counter()
+                        payloads = self.channel.encode(frames)
+                        encoded = time.perf_counter()
+                        for payload in payloads:
+                            await self._send(conn, payload, "states_sent")
+                        if self.timer is not None and stamps is not None and payloads:
+                            self.timer.flushed(*stamps, flushed, encoded, time.perf_counter())
+                        continue
+                    # Rate limit: sleep until the next slot unless an event arrives first.
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), wait)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+            await self._wakeup.wait()
+
+    async def _send(self, conn, payload, counter):
+        try:
+            await conn.send(payload)
+            self.stats[counter] += 1
+            self.stats["bytes_sent"] += len(payload)
+        except Exception as e:
+            self.stats["send_errors"] += 1
+            log.warning("Error sending frame: %s", e)
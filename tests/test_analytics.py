@@ -0,0 +1,115 @@
+import json
+import os
+import shutil
+
+import numpy as np
+
+from corpusdb import analytics
+from corpusdb.analytics import AnalyticsCache, combine, corpus_report, drift, transition_matrix
+
+C = "[R0][B0][Code4 - 7][s4]"
+G = "[R7][B7][Code4 - 7][s2]"
+F = "[R5][B0][Code4 - 7][s9]"
+
+
+def _row(n, bar, tempo, sen_mem, pcs, notes, chord, fer):
+    return {"#": str(n), "FER": fer, "Bar": str(bar), "Tempo": str(tempo), "jsSenMem": str(sen_mem),
+            "PitchClassSet": "[" + " - ".join(map(str, pcs)) + "]" if pcs else "[-]",
+            "MidNum": str(list(notes)) if notes else "[-]", "ChordCode": chord}
+
+
+def _session(path, rows):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"rows": [_row(n, *cells) for n, cells in enumerate(rows, 1)], "meta": None}, f, indent=2)
+    return str(path)
+
+
+FIRST = [
+    (1, 120, 2.0, (0, 4, 7), (48, 64, 67), C, "[50]"),
+    (1, 122, 2.0, (0, 4, 7), (48, 64, 67), C, "[50]"),  # held: one transition
+    (2, 124, 1.0, (2, 7, 11), (43, 59, 62), G, "[-]"),
+    ("-", 130, "", (), (), "", "[3]"),
+    (3, 126, 1.0, (0, 4, 7), (48, 52, 55), C, "[50, 3]"),
+]
+SECOND = [
+    (5, 90, 3.0, (0, 5, 9), (41, 57, 60), F, "[1]"),
+    (6, 92, 3.0, (0, 4, 7), (48, 64, 67), C, "[1]"),
+]
+
+
+def test_session_aggregates(tmp_path):
+    stats = analytics.session_stats(analytics.session_arrays(_session(tmp_path / "a.json", FIRST)))
+    assert int(stats["rows"]) == 5
+    assert stats["pc_hist"].tolist() == [3, 0, 1, 0, 3, 0, 0, 4, 0, 0, 0, 1]
+    assert stats["note_hist"].tolist() == [3, 0, 1, 0, 3, 0, 0, 4, 0, 0, 0, 1]
+    assert stats["chords"].tolist() == [C, G]
+    assert stats["transitions"].tolist() == [[0, 1], [1, 0]]
+    assert stats["bars"].tolist() == [1, 2, 3]
+    assert stats["tempo"].tolist() == [121.0, 124.0, 126.0]
+    assert stats["fer"][3] == 2 and stats["fer"][50] == 3 and stats["fer"].sum() == 5
+
+
+def test_transitions_and_drift():
+    assert transition_matrix([0, 0, -1, 0, 1, 1, 2, 0], 3).tolist() == [[0, 1, 0], [0, 0, 1], [1, 0, 0]]
+    assert transition_matrix(np.zeros(0, dtype=np.int32), 2).tolist() == [[0, 0], [0, 0]]
+    assert drift([1, 2, 4], [10.0, np.nan, 16.0]).tolist() == [2.0]
+
+
+def test_combine_merges_the_chord_vocabularies(tmp_path):
+    a = analytics.session_stats(analytics.session_arrays(_session(tmp_path / "a.json", FIRST)))
+    b = analytics.session_stats(analytics.session_arrays(_session(tmp_path / "b.json", SECOND)))
+    total = combine([a, b])
+    assert total["rows"] == 7
+    assert total["chords"] == [C, G, F]
+    assert total["transitions"].tolist() == [[0, 1, 0], [1, 0, 0], [1, 0, 0]]
+    assert total["fer"][1] == 2 and total["fer"][50] == 3
+    assert (total["pc_hist"] == a["pc_hist"] + b["pc_hist"]).all()
+
+
+def test_cache_only_analyses_new_contents(tmp_path):
+    sessions = tmp_path / "sessions"
+    sessions.mkdir()
+    a = _session(sessions / "a.json", FIRST)
+    b = _session(sessions / "b.json", SECOND)
+    with open(sessions / "test_settings.json", "w") as f:
+        json.dump({"threshold": 3}, f)
+    paths = [a, b, str(sessions / "test_settings.json")]
+    log = []
+    cache = AnalyticsCache(str(tmp_path / "cache"))
+
+    first = cache.stats(paths, jobs=1, log=log.append)
+    assert [p for p, _, _ in first] == [a, b]  # the settings file is skipped
+    assert (cache.analysed, cache.cached) == (2, 0)
+    assert any(line.startswith("skip") for line in log)
+    report = corpus_report(first)
+
+    again = AnalyticsCache(str(tmp_path / "cache")).stats(paths, jobs=1)
+    assert corpus_report(again) == report
+
+    cache = AnalyticsCache(str(tmp_path / "cache"))
+    cache.stats(paths, jobs=1)
+    assert (cache.analysed, cache.cached) == (0, 2)
+
+    _session(b, SECOND[:1])  # edited
+    shutil.copy(a, sessions / "copy.json")  # same bytes as a.json
+    paths.append(str(sessions / "copy.json"))
+    sessions_now = cache.stats(paths, jobs=1)
+    assert (cache.analysed, cache.cached) == (1, 1)
+    assert sessions_now[0][1] == sessions_now[2][1]
+    assert int(sessions_now[1][2]["rows"]) == 1
+
+    removed = cache.prune({digest for _, digest, _ in sessions_now})
+    assert removed == 1
+    assert len([n for n in os.listdir(cache.root) if n.endswith(".npz")]) == 2
+
+
+def test_stale_version_is_redone(tmp_path, monkeypatch):
+    path = _session(tmp_path / "a.json", FIRST)
+    cache = AnalyticsCache(str(tmp_path / "cache"))
+    cache.stats([path], jobs=1)
+    monkeypatch.setattr(analytics, "VERSION", analytics.VERSION + 1)
+    cache = AnalyticsCache(str(tmp_path / "cache"))
+    assert cache.files == {}
+    sessions = cache.stats([path], jobs=1)
+    assert (cache.analysed, cache.cached) == (1, 0)
+    assert int(sessions[0][2]["rows"]) == 5
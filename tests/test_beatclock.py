@@ -0,0 +1,87 @@
+import math
+
+from engine.beatclock import BeatClock
+
+SECOND = 1_000_000_000
+
+
+def _clock(tempo=120.0, numerator=4, **kwargs):
+    return BeatClock(tempo, numerator, clock=lambda: 0, **kwargs)
+
+
+def _bar_ns(bpm, numerator=4):
+    return round(numerator * 60 / bpm * SECOND)
+
+
+def test_first_bar_locks_the_grid():
+    clock = _clock()
+    assert not clock.locked
+    assert clock.on_bar(5, now=10 * SECOND) is None
+    assert clock.locked and clock.resyncs == 0
+    assert clock.position(10 * SECOND) == (5, 1, 0.0)
+    assert clock.position(10 * SECOND + SECOND // 4) == (5, 1, 0.5)
+    assert clock.position(10 * SECOND + 3 * SECOND) == (6, 3, 0.0)
+
+
+def test_bars_on_tempo_have_no_error():
+    clock = _clock()
+    clock.on_bar(1, now=0)
+    for bar in range(2, 10):
+        assert abs(clock.on_bar(bar, now=(bar - 1) * _bar_ns(120))) < 1e-6
+    assert clock.resyncs == 0
+    assert math.isclose(clock.bpm, 120.0)
+
+
+def test_grid_locks_onto_a_faster_tempo():
+    clock = _clock(tempo=120.0)
+    clock.on_bar(1, now=0)
+    errors = []
+    for bar in range(2, 60):
+        errors.append(clock.on_bar(bar, now=(bar - 1) * _bar_ns(123)))
+    assert clock.resyncs == 0
+    assert errors[0] < 0  # the downbeat came early: the grid was behind
+    assert abs(errors[-1]) < abs(errors[0]) / 10
+    assert abs(clock.bpm - 123.0) < 0.5
+
+
+def test_jump_resyncs_and_measures_the_bar():
+    clock = _clock()
+    clock.on_bar(1, now=0)
+    assert clock.on_bar(2, now=_bar_ns(120)) is not None
+    assert clock.on_bar(9, now=2 * _bar_ns(120)) is None  # seek
+    assert clock.resyncs == 1 and clock.position(2 * _bar_ns(120))[:2] == (9, 1)
+    assert clock.on_bar(9, now=2 * _bar_ns(120) + 5) is None  # repeated bar
+    # A consecutive bar far off the grid snaps and takes the tempo from the bar length.
+    assert clock.on_bar(10, now=2 * _bar_ns(120) + _bar_ns(60)) is None
+    assert clock.resyncs == 2
+    assert abs(clock.bpm - 60.0) < 1e-6
+
+
+def test_boundary_and_align():
+    clock = _clock()
+    assert clock.align(1.3) == 1.3  # free-running: unchanged
+    clock.on_bar(1, now=0)
+    assert clock.boundary(SECOND // 10, "beat") == SECOND // 2
+    assert clock.boundary(SECOND // 2, "beat") == SECOND // 2
+    assert clock.boundary(SECOND // 10, "bar") == 2 * SECOND
+    assert clock.boundary(SECOND // 10, 0.25) == SECOND // 8
+    assert clock.boundary(SECOND // 5, "beat", rounding=round) == 0
+    assert math.isclose(clock.align(1.3), 1.5)
+    assert math.isclose(clock.align(1.3, "bar"), 2.0)
+    assert clock.align(1.3, "off") == 1.3
+
+
+def test_tempo_and_meter_changes_do_not_jump():
+    clock = _clock()
+    clock.on_bar(1, now=0)
+    now = 3 * SECOND  # bar 2, beat 3
+    before = clock.position(now)
+    clock.set_tempo(60.0, now=now)
+    assert clock.position(now) == before
+    assert clock.position(now + SECOND) == (2, 4, 0.0)
+    clock.set_numerator(3, now=now + SECOND)
+    assert clock.position(now + SECOND)[2] == 0.0
+    assert clock.position(now + 2 * SECOND)[2] == 0.0
+    assert clock.position(now + 4 * SECOND)[1] == clock.position(now + SECOND)[1]  # three beats a bar
+    clock.set_tempo(0, now=now)  # ignored
+    assert clock.tempo == 60.0
@@ -0,0 +1,94 @@
+import asyncio
+import logging
+import socket
+import time
+
+import mido
+from pythonosc.osc_bundle import OscBundle
+
+from engine.core import Engine
+
+
+def _free_udp_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_engine_without_midi_ports_handles_udp_bar(caplog):
+    port = _free_udp_port()
+
+    async def run():
+        engine = Engine(ws_url="ws://127.0.0.1:9", udp_port=port, midi_ports={}, metrics_port=0,
+                        eeg_rate=0)
+        await engine.start()
+        try:
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+                s.sendto(b"/bar 12", ("127.0.0.1", port))
+            for _ in range(100):
+                if engine.bar is not None:
+                    break
+                await asyncio.sleep(0.01)
+            await asyncio.sleep(0.01)  # let the batch's state push run
+            return engine
+        finally:
+            await engine.stop()
+
+    with caplog.at_level(logging.WARNING):
+        engine = asyncio.run(run())
+    assert engine.bar == 12
+    assert engine.snapshot.ports == ()
+    assert engine.udp_ingest.stats["handler_errors"] == 0
+    assert not [r for r in caplog.records if "send_state_to_websocket" in r.getMessage()]
+    engine.metrics.render()  # collect_ports walks snapshot.ports
+
+
+def test_bar_reset_keeps_the_count_total():
+    async def run():
+        engine = Engine(ws_url="ws://127.0.0.1:9", udp_port=_free_udp_port(), midi_ports={}, metrics_port=0,
+                        eeg_rate=0)
+        await engine.start()
+        try:
+            engine.handle_websocket_message('{"type": "keyIndUpdate", "value": "2"}')
+            for label, note in (("7401", 62), ("7401", 66), ("7402", 74)):
+                engine.handle_midi_message(mido.Message("note_on", note=note, velocity=90), label)
+            before = engine.snapshot
+            engine.handle_websocket_message('{"type": "barReset"}')
+            after_reset = engine.snapshot
+            engine.handle_websocket_message('{"type": "clearRequest"}')
+            return before, after_reset, engine.snapshot
+        finally:
+            await engine.stop()
+
+    before, after_reset, after_clear = asyncio.run(run())
+    assert before.notes == (62, 66, 74)
+    assert list(before.counts) == [2, 0, 0, 0, 1] + [0] * 7
+    assert after_reset.notes == () and after_reset.seq > before.seq
+    assert after_reset.counts == before.counts  # Total Count survives barReset
+    assert list(after_clear.counts) == [0] * 12
+
+
+class _Client:
+    def __init__(self):
+        self.dgrams = []
+
+    def send(self, content):
+        self.dgrams.append(content.dgram)
+
+
+def test_set_schedule_bundle_is_timed_to_the_grid():
+    engine = Engine(ws_url="ws://127.0.0.1:9", udp_port=_free_udp_port(), midi_ports={}, metrics_port=0,
+                    eeg_rate=0)
+    client = engine.osc._client = _Client()
+    engine.handle_set_schedule({"bar": 3, "beat": 1})  # grid not locked yet: immediately
+    engine.beat_clock.on_bar(1)
+    beat = 60.0 / engine.beat_clock.bpm
+    sent = time.time()
+    engine.handle_set_schedule({"bar": 3, "beat": 1})
+    engine.grid = "off"
+    engine.handle_set_schedule({"bar": 3, "beat": 1})
+
+    immediate, timed, off = [OscBundle(dgram) for dgram in client.dgrams]
+    assert immediate.timestamp == 0 and off.timestamp == 0
+    assert sent <= timed.timestamp <= sent + beat + 0.05
+    assert timed.num_contents == 2
@@ -0,0 +1,83 @@
+import asyncio
+import math
+
+from engine.expiry import ExpiryScheduler
+
+
+def _scheduler(window=1.0, align=None):
+    expired = []
+    return ExpiryScheduler(window, expired.extend, align=align), expired
+
+
+def test_keys_expire_one_window_after_their_last_hit():
+    s, _ = _scheduler()
+    s.touch("a", now=10.0)
+    s.touch("b", now=10.5)
+    assert s.next_deadline() == 11.0
+    assert s.pop_expired(now=10.99) == []
+    assert s.pop_expired(now=11.0) == ["a"]
+    assert "a" not in s and "b" in s
+    assert s.pop_expired(now=12.0) == ["b"]
+    assert len(s) == 0 and s.next_deadline() is None
+
+
+def test_retouch_moves_the_deadline():
+    s, _ = _scheduler()
+    s.touch("a", now=10.0)
+    s.touch("a", now=10.8)
+    assert s.pop_expired(now=11.0) == []  # the stale entry is skipped
+    assert s.next_deadline() == 11.8
+    assert s.pop_expired(now=11.8) == ["a"]
+
+
+def test_discard_and_clear():
+    s, _ = _scheduler()
+    s.touch("a", now=0.0)
+    s.touch("b", now=0.0)
+    s.discard("a")
+    assert s.pop_expired(now=5.0) == ["b"]
+    s.touch("c", now=0.0)
+    s.clear()
+    assert s.pop_expired(now=5.0) == [] and len(s) == 0
+
+
+def test_retime_from_last_hits():
+    s, _ = _scheduler(window=2.0)
+    s.touch("a", now=10.0)
+    s.touch("b", now=11.0)
+    s.retime(0.5)
+    assert s.next_deadline() == 10.5
+    assert s.pop_expired(now=11.0) == ["a"]
+    s.retime(3.0)
+    assert s.pop_expired(now=13.9) == []
+    assert s.pop_expired(now=14.0) == ["b"]
+
+
+def test_align_snaps_deadlines():
+    s, _ = _scheduler(window=0.3, align=lambda t: math.ceil(t / 0.5) * 0.5)
+    s.touch("a", now=10.1)
+    assert s.next_deadline() == 10.5
+    s.retime(0.4)
+    assert s.next_deadline() == 10.5
+    s.retime(0.5)
+    assert s.next_deadline() == 11.0
+
+
+def test_loop_timer_fires_the_callback():
+    s, expired = _scheduler(window=0.02)
+
+    async def run():
+        s.attach(asyncio.get_running_loop())
+        s.touch(("pc", 0))
+        s.touch(("note", 60))
+        await asyncio.sleep(0.01)
+        s.touch(("note", 60))  # re-hit: expires later than the pitch class
+        await asyncio.sleep(0.015)
+        first = list(expired)
+        await asyncio.sleep(0.03)
+        s.detach()
+        return first
+
+    first = asyncio.run(run())
+    assert first == [("pc", 0)]
+    assert expired == [("pc", 0), ("note", 60)]
@@ -0,0 +1,83 @@
+import json
+import os
+
+import numpy as np
+
+from corpusdb.index import HarmonicIndex, date_arg, session_files
+
+
+def _session(path, rows):
+    cells = [{"#": str(n), "PitchClassSet": pcs, "ChordCode": chord, "Bass": bass, "SopPc": sop,
+              "Key": "[-]", "Tempo": tempo, "Bar": bar, "Performance Date": "9/26/2025, 6:37:55 AM"}
+             for n, (pcs, chord, bass, sop, tempo, bar) in enumerate(rows, 1)]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"rows": cells, "meta": None}, f, indent=2)
+    return str(path)
+
+
+C_MAJOR = ("[0 - 4 - 7]", "[R0][B0][Code4 - 7][s4]", "0", "4", "78", "20")
+G_MAJOR = ("[2 - 7 - 11]", "[R7][B7][Code4 - 7][s2]", "7", "2", "90", "21")
+C_FIRST = ("[0 - 4 - 7]", "[R0][B4][Code3 - 8][s7]", "4", "7", "120", "22")
+SILENCE = ("[-]", "", "---", "---", "78", "-")
+
+
+def _hits(result):
+    return sorted((os.path.basename(source), row) for source, row in result)
+
+
+def test_queries(tmp_path):
+    a = _session(tmp_path / "corpus_a.json", [C_MAJOR, G_MAJOR, SILENCE])
+    b = _session(tmp_path / "table_b.json", [C_FIRST, C_MAJOR])
+    index = HarmonicIndex(str(tmp_path / "index"))
+    assert index.update(session_files([str(tmp_path)])) == (2, 0, 0)
+    assert len(index) == 5
+
+    assert _hits(index.query(contains={0, 4})) == [("corpus_a.json", 0), ("table_b.json", 0),
+                                                  ("table_b.json", 1)]
+    assert _hits(index.query(within={0, 2, 4, 7, 11})) == [("corpus_a.json", 0), ("corpus_a.json", 1),
+                                                           ("table_b.json", 0), ("table_b.json", 1)]
+    assert _hits(index.query(equals={2, 7, 11})) == [("corpus_a.json", 1)]
+    assert _hits(index.query(chord="[R0][B0][Code4 - 7][s4]")) == [("corpus_a.json", 0), ("table_b.json", 1)]
+    assert _hits(index.query(chord_root=0, bass=4)) == [("table_b.json", 0)]
+    assert _hits(index.query(tempo=(80, None))) == [("corpus_a.json", 1), ("table_b.json", 0)]
+    assert _hits(index.query(bar=(21, 22), sop=2)) == [("corpus_a.json", 1)]
+    assert len(index.query(date=(date_arg("2025-09-26"), date_arg("2025-09-27")))) == 5
+    assert index.query(contains={0}).sessions() == {a: 1, b: 2}
+    assert index.query(equals={2, 7, 11}).describe(0)["Bar"] == 21
+
+
+def test_update_reindexes_only_what_changed(tmp_path):
+    a = _session(tmp_path / "corpus_a.json", [C_MAJOR])
+    b = _session(tmp_path / "corpus_b.json", [G_MAJOR])
+    index = HarmonicIndex(str(tmp_path / "index"))
+    index.update([a, b])
+    merged = os.path.getmtime(os.path.join(index.root, "merged.npz"))
+    log = []
+    assert index.update([a, b], log=log.append) == (0, 0, 0) and log == []
+    assert os.path.getmtime(os.path.join(index.root, "merged.npz")) == merged
+
+    _session(b, [G_MAJOR, C_FIRST])
+    assert index.update([a, b], log=log.append) == (0, 1, 0)
+    assert [line.split(":")[0] for line in log] == ["index  " + b]
+    assert _hits(index.query(contains={0, 4, 7})) == [("corpus_a.json", 0), ("corpus_b.json", 1)]
+
+    reopened = HarmonicIndex(index.root)  # the catalog persists
+    assert reopened.update([a]) == (0, 0, 1)
+    assert len(reopened) == 1 and len(os.listdir(reopened.segments_dir)) == 1
+    assert np.array_equal(reopened.merged["pcs"], [0b10010001])
+
+
+def test_a_changed_file_that_fails_drops_its_segment(tmp_path):
+    path = _session(tmp_path / "corpus_a.json", [C_MAJOR, G_MAJOR])
+    index = HarmonicIndex(str(tmp_path / "index"))
+    assert index.update([path]) == (1, 0, 0)
+    assert len(index.query(contains={0, 4, 7})) == 1
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"rows": [{"#": "1", "PitchClassSet": ')  # cut off mid-write
+    log = []
+    assert index.update([path], log=log.append) == (0, 0, 1)
+    assert log and log[0].startswith("skip")
+    assert index.files == {} and os.listdir(index.segments_dir) == []
+    assert len(index) == 0 and len(index.query(contains={0, 4, 7})) == 0
+    assert HarmonicIndex(index.root).files == {}
@@ -0,0 +1,63 @@
+import json
+import os
+
+from corpusdb.normalize import NormalizedCorpus
+
+ROWS = [{"#": "1", "Bar": "20", "Tempo": "78", "MidNum": "[48, 67]", "ChordCode": "[R0][B0][Code4 - 7][s4]"},
+        {"#": "2", "Bar": "-", "Tempo": "78.5", "MidNum": "[-]", "ChordCode": ""}]
+
+
+def _session(path, rows=ROWS):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(rows), encoding="utf-8")
+    return str(path)
+
+
+def _outputs(corpus):
+    return sorted(os.listdir(corpus.sessions_dir))
+
+
+def test_rows_are_typed(tmp_path):
+    source = _session(tmp_path / "data" / "table_a.json")
+    corpus = NormalizedCorpus(str(tmp_path / "out"))
+    assert corpus.update([source]) == (1, 0, 0)
+    with open(os.path.join(corpus.sessions_dir, corpus.files[os.path.abspath(source)]["output"])) as f:
+        rows = [json.loads(line) for line in f]
+    assert rows[0] == {"#": 1, "Bar": 20, "Tempo": 78.0, "MidNum": [48, 67],
+                       "ChordCode": {"root": 0, "bass": 0, "code": [4, 7], "sop": 4}}
+    assert rows[1]["Bar"] is None and rows[1]["MidNum"] is None and rows[1]["ChordCode"] is None
+
+
+def test_same_basename_in_two_directories(tmp_path):
+    first = _session(tmp_path / "data" / "table_a.json")
+    second = _session(tmp_path / "uploads" / "table_a.json", ROWS[:1])
+    corpus = NormalizedCorpus(str(tmp_path / "out"))
+    corpus.update([first, second])
+    assert len(_outputs(corpus)) == 2
+    # Dropping one input leaves the other's output alone.
+    assert corpus.update([second]) == (0, 1, 1)
+    assert _outputs(corpus) == [corpus.files[os.path.abspath(second)]["output"]]
+
+
+def test_only_changed_content_is_redone(tmp_path):
+    source = _session(tmp_path / "data" / "table_a.json")
+    corpus = NormalizedCorpus(str(tmp_path / "out"))
+    corpus.update([source])
+    assert NormalizedCorpus(corpus.root).update([source]) == (0, 1, 0)
+    _session(tmp_path / "data" / "table_a.json", ROWS[:1])
+    corpus = NormalizedCorpus(corpus.root)
+    assert corpus.update([source]) == (1, 0, 0)
+    assert corpus.files[os.path.abspath(source)]["rows"] == 1
+
+
+def test_failed_file_loses_entry_and_output(tmp_path):
+    source = _session(tmp_path / "data" / "table_a.json")
+    corpus = NormalizedCorpus(str(tmp_path / "out"))
+    corpus.update([source])
+    (tmp_path / "data" / "table_a.json").write_text('"not a session"', encoding="utf-8")
+    log = []
+    corpus = NormalizedCorpus(corpus.root)
+    assert corpus.update([source], log=log.append) == (0, 0, 0)
+    assert log and log[0].startswith("skip")
+    assert _outputs(corpus) == []
+    assert NormalizedCorpus(corpus.root).files == {}
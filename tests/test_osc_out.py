@@ -0,0 +1,76 @@
+import asyncio
+
+from pythonosc.osc_bundle import OscBundle
+from pythonosc.osc_message import OscMessage
+
+from engine.osc_out import OscOutput
+
+TEMPO = "/live/song/set/tempo"
+
+
+class _Client:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, content):
+        if OscBundle.dgram_is_bundle(content.dgram):
+            self.sent.append(("#bundle", OscBundle(content.dgram).num_contents))
+            return
+        message = OscMessage(content.dgram)
+        self.sent.append((message.address, tuple(message.params)))
+
+
+def _output(**kwargs):
+    osc = OscOutput(**kwargs)
+    osc._client = _Client()
+    return osc, osc._client.sent
+
+
+def test_explicit_set_is_never_deduped():
+    osc, sent = _output()
+    osc.set(TEMPO, 120.0)
+    # Ableton's tempo was changed on its own; the browser asks for 120 again.
+    osc.set(TEMPO, 120.0)
+    osc.set("/live/song/set/metronome", 1)
+    osc.set("/live/song/set/metronome", 1)
+    assert sent == [(TEMPO, (120.0,))] * 2 + [("/live/song/set/metronome", (1,))] * 2
+
+
+def test_slider_stream_is_coalesced_and_deduped_within_the_window():
+    osc, sent = _output(window=0.01, dedupe_window=60.0)
+
+    async def run():
+        osc.attach(asyncio.get_running_loop())
+        for bpm in (100.0, 101.0, 102.0):
+            osc.set_coalesced(TEMPO, bpm)
+        await asyncio.sleep(0.05)
+        osc.set_coalesced(TEMPO, 102.0)
+        await asyncio.sleep(0.05)
+        osc.detach()
+
+    asyncio.run(run())
+    assert sent == [(TEMPO, (102.0,))]
+    assert osc.stats["coalesced"] == 2 and osc.stats["deduped"] == 1
+
+
+def test_slider_repeat_goes_out_after_the_window():
+    osc, sent = _output(dedupe_window=0.0)
+    osc.set_coalesced(TEMPO, 90.0)  # not attached: immediate
+    osc._pending[TEMPO] = (90.0,)
+    osc.flush()
+    assert sent == [(TEMPO, (90.0,))] * 2
+
+
+def test_explicit_set_supersedes_a_pending_slider_value():
+    osc, sent = _output()
+    osc._pending[TEMPO] = (95.0,)
+    osc.set(TEMPO, 120.0)
+    osc.flush()
+    assert sent == [(TEMPO, (120.0,))]
+
+
+def test_bundle_is_one_datagram():
+    osc, sent = _output()
+    osc.bundle([("/live/clip/fire", [0, 1]), ("/live/song/set/current_song_time", 4.0)])
+    assert sent == [("#bundle", 2)]
+    assert osc.stats["bundles"] == 1 and osc.stats["messages"] == 2
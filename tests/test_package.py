@@ -0,0 +1,23 @@
+import subprocess
+import sys
+
+
+def test_reader_imports_without_numpy():
+    code = ("import sys, corpusdb; from corpusdb import RowReader, BlobStore; "
+            "assert 'numpy' not in sys.modules, 'numpy imported'")
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_lazy_exports():
+    import corpusdb
+    from corpusdb.index import HarmonicIndex
+    from corpusdb.store import CorpusStore, Session
+
+    assert (corpusdb.HarmonicIndex, corpusdb.CorpusStore, corpusdb.Session) == (HarmonicIndex, CorpusStore,
+                                                                                Session)
+
+
+def test_running_a_module_does_not_warn():
+    result = subprocess.run([sys.executable, "-W", "error::RuntimeWarning", "-m", "corpusdb.index", "--help"],
+                            capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,83 @@
+import glob
+import os
+import random
+
+import pytest
+
+from corpusdb.reader import RowReader
+from corpusdb.values import parse_int, parse_intlist
+from engine.pitchclass import (CHORD_TEMPLATES, MEMBERS, PitchClassState, chord_code, chord_name, chord_of,
+                               pitch_class_mask)
+
+
+def _note_sets(n=500, seed=7):
+    rng = random.Random(seed)
+    return [rng.sample(range(21, 109), rng.randint(0, 8)) for _ in range(n)]
+
+
+# --- the list-based code the tables replaced (base.py) ------------------------
+
+def _old_count_notes(notes, taken_js_ton):
+    count_notes = [0] * 12
+    for note in notes:
+        count_notes[(note % 12 - taken_js_ton) % 12] += 1
+    return count_notes
+
+
+def _old_chord(pcs):
+    pcs = set(pcs)
+    for quality, intervals in CHORD_TEMPLATES:
+        for root in range(12):
+            if {(root + i) % 12 for i in intervals} == pcs:
+                return root, quality
+    return None
+
+
+def test_pitch_class_state_matches_lists():
+    for notes in _note_sets():
+        state = PitchClassState()
+        for note in notes:
+            state.add(note)
+        assert state.to_list() == sorted(set(n % 12 for n in notes))
+        assert len(state) == len(set(n % 12 for n in notes))
+        for shift in (0, 2, 9):
+            moved = state.transposed(shift)
+            assert moved.count_list() == _old_count_notes(notes, shift)
+            assert moved.to_list() == sorted({(n % 12 - shift) % 12 for n in notes})
+
+
+def test_members_table():
+    for mask in range(4096):
+        assert MEMBERS[mask] == tuple(pc for pc in range(12) if mask >> pc & 1)
+
+
+def test_chord_table_matches_template_search():
+    for mask in range(4096):
+        assert chord_of(mask) == _old_chord(MEMBERS[mask])
+    assert chord_name(pitch_class_mask([0, 4, 7])) == "C Major"
+    assert chord_name(pitch_class_mask([0, 1])) == "Unknown"
+
+
+def test_chord_code_format():
+    assert chord_code(pitch_class_mask([7, 11, 2]), 11, 2) == "[R7][B11][Code3 - 8][s2]"
+    assert chord_code(pitch_class_mask([0, 4, 7]), 0, 4) == "[R0][B0][Code4 - 7][s4]"
+    assert chord_code(pitch_class_mask([0, 1]), 0, 1) == ""
+    assert chord_code(pitch_class_mask([0, 4, 7]), None, None) == ""
+
+
+ROOT = os.path.join(os.path.dirname(__file__), os.pardir)
+SESSIONS = (sorted(glob.glob(os.path.join(ROOT, "data", "corpus_*.json")))
+            + sorted(glob.glob(os.path.join(ROOT, "uploads", "table_*.json"))))
+
+
+@pytest.mark.skipif(not SESSIONS, reason="no session files")
+def test_chord_code_matches_the_corpus():
+    checked = 0
+    for path in SESSIONS:
+        for row in RowReader(path, columns=("PitchClassSet", "Bass", "SopPc", "ChordCode")):
+            if not row.get("ChordCode"):
+                continue
+            mask = pitch_class_mask(parse_intlist(row["PitchClassSet"]))
+            assert chord_code(mask, parse_int(row["Bass"]), parse_int(row["SopPc"])) == row["ChordCode"]
+            checked += 1
+    assert checked
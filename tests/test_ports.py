@@ -0,0 +1,63 @@
+from engine.ports import PortTable
+
+PORTS = {"loopMIDI Port 7401 4": "7401", "loopMIDI Port 7402 5": "7402"}
+
+
+def test_ensemble_is_the_union_of_the_shards():
+    table = PortTable(PORTS)
+    table.note_on("7401", 60, mapped=0)
+    table.note_on("7402", 64, mapped=4)
+    table.note_on("7402", 67)
+    ensemble = table.ensemble()
+    assert list(ensemble.notes) == [60, 64, 67]
+    assert ensemble.pcs.to_list() == [0, 4, 7]
+    assert ensemble.counts.count_list()[:5] == [1, 0, 0, 0, 1]
+    assert list(table.shards["7401"].notes) == [60]
+
+
+def test_ensemble_cache_is_dropped_only_when_the_union_changes():
+    table = PortTable(PORTS)
+    table.note_on("7401", 60)
+    ensemble = table.ensemble()
+    assert table.ensemble() is ensemble
+    table.note_on("7402", 60)  # already sounding on 7401
+    assert table.ensemble() is ensemble
+    table.note_on("7402", 72)  # new note, same pitch class
+    assert table.ensemble() is not ensemble
+    assert list(table.ensemble().notes) == [60, 72]
+
+    ensemble = table.ensemble()
+    table.expire_note("7401", 61)  # not sounding: nothing changes
+    assert table.ensemble() is ensemble
+    table.expire_note("7401", 60)
+    assert list(table.ensemble().notes) == [60, 72]  # still held on 7402
+    table.expire_pc("7402", 0)
+    table.expire_pc("7401", 0)
+    assert table.ensemble().pcs.to_list() == []
+
+
+def test_views_rebuild_only_touched_shards():
+    table = PortTable(PORTS)
+    views = table.views()
+    assert [v.label for v in views] == ["7401", "7402"]
+    assert table.views() is views
+    table.note_on("7402", 62)
+    table.note_on("7402", 66)
+    first, second = table.views()
+    assert first is views[0]
+    assert (second.pc_mask, second.sounding, second.note_ons) == (1 << 2 | 1 << 6, 2, 2)
+    table.note_on("replay", 50)  # a label outside the table gets its own shard
+    assert [v.label for v in table.views()] == ["7401", "7402", "replay"]
+
+
+def test_clear_keeps_the_total_and_clear_counts_zeroes_it():
+    table = PortTable(PORTS)
+    table.note_on("7401", 62, mapped=0)
+    table.note_on("7402", 66, mapped=4)
+    table.clear()
+    assert not table.ensemble().notes and not table.ensemble().pcs
+    assert not table.shards["7401"].counts
+    assert table.counts.count_list()[:5] == [1, 0, 0, 0, 1]
+    assert [v.sounding for v in table.views()] == [0, 0]
+    table.clear_counts()
+    assert table.counts.count_list() == [0] * 12
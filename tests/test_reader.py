@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+from corpusdb.reader import RowReader, column_names
+
+ROWS = [
+    {"a": "x", "b": 1.5, "c": -2e3},
+    {"a": "y\\\"z", "b": -2000.0, "c": 12345678901234567890, "d": [1, -2.5, 3e-2]},
+    {"a": "", "b": 0, "c": -0.125, "d": {"n": 1E+2}, "e": True, "f": None},
+    {"#": "1", "Bar": "20", "Photo": "data:image/png;base64," + "A" * 300, "g": 7},
+]
+
+
+def _write(tmp_path, document, text=None):
+    path = tmp_path / "session.json"
+    path.write_text(text if text is not None else json.dumps(document), encoding="utf-8")
+    return path
+
+
+@pytest.mark.parametrize("text", [
+    '[{"a":"x","b":1.5,"c":-2e3}]',
+    '[{"a": "x", "b": -2000.0, "c": 1}, {"b": 1e-5}]',
+    json.dumps(ROWS),
+    json.dumps(ROWS, indent=2),
+    json.dumps({"rows": ROWS, "meta": {"tempo": 78.5, "n": -3}, "version": 2}),
+], ids=["compact", "exponent", "list", "indented", "object"])
+def test_chunk_size_sweep_matches_json_load(tmp_path, text):
+    path = _write(tmp_path, None, text)
+    document = json.loads(text)
+    rows = document["rows"] if isinstance(document, dict) else document
+    for chunk in range(1, len(text) + 2):
+        reader = RowReader(str(path), chunk=chunk)
+        assert list(reader) == rows, chunk
+        if isinstance(document, dict):
+            assert reader.layout == "object"
+            assert reader.meta == {k: v for k, v in document.items() if k != "rows"}
+
+
+def test_projection_skips_values(tmp_path):
+    path = _write(tmp_path, ROWS)
+    for chunk in (1, 7, 64):
+        assert list(RowReader(str(path), columns=("b", "g"), chunk=chunk)) == [
+            {"b": 1.5}, {"b": -2000.0}, {"b": 0}, {"g": 7}]
+        assert [row.get("Photo") for row in RowReader(str(path), skip_heavy=True, chunk=chunk)] == [None] * 4
+    assert column_names(str(path)) == ["a", "b", "c", "d", "e", "f", "#", "Bar", "Photo", "g"]
+
+
+def test_typed_cells(tmp_path):
+    path = _write(tmp_path, [{"Bar": "20", "MidNum": "[48, 67, 72]", "Tempo": "-"}])
+    row = next(iter(RowReader(str(path))))
+    assert row.typed("Bar") == 20
+    assert row.typed("MidNum") == [48, 67, 72]
+    assert row.typed("Tempo", 78.0) == 78.0
+
+
+def test_not_a_session(tmp_path):
+    path = _write(tmp_path, None, '"text"')
+    with pytest.raises(ValueError):
+        list(RowReader(str(path)))
@@ -0,0 +1,125 @@
+import base64
+import datetime
+import json
+import os
+import time
+
+import numpy as np
+import pytest
+
+from corpusdb.reader import RowReader
+from engine import rowlog
+from engine.eeg import BAND_COLUMNS, BANDS, EegPipeline
+from engine.rowlog import CORPUS_COLUMNS, MAGIC, RowRecorder, compact, info, read_log, row_cells
+from engine.snapshot import StateSnapshot
+
+PHOTO = "data:image/jpeg;base64," + base64.b64encode(b"\xff\xd8jpeg bytes\xff\xd9").decode("ascii")
+
+
+def _snapshot(notes=(48, 64, 67), eeg=None):
+    return StateSnapshot(seq=1, tempo=78, sensory_memory=3.076923076923077, numerator=4, denominator=4,
+                         bar=20, notes=notes, pcs=tuple(n % 12 for n in notes),
+                         chord_code="[R0][B0][Code4 - 7][s4]", pc_mask=0, udp_mask=0, counts=(0,) * 12,
+                         scale_mask=0, first_note_scale=None, ports=(), eeg=eeg)
+
+
+def test_row_cells_keep_the_corpus_columns():
+    started = datetime.datetime(2025, 9, 27, 1, 44, 58)
+    row = row_cells(3, started, 1.5, _snapshot(), (20, 2, 0.5), 4, {"FER": "[50]", "0.0–93.8 Hz": "0.5"})
+    assert list(row) == list(CORPUS_COLUMNS) + ["0.0–93.8 Hz"]
+    assert row["#"] == "3"
+    assert row["Performance Date"] == "9/27/2025, 1:44:58 AM"
+    assert (row["Tempo"], row["TimeSig"], row["Bar"], row["Beat"], row["Qua"]) == ("78", "4/4", "20", "2", "3")
+    assert (row["Bass"], row["SopPc"], row["PitchClassSet"]) == ("0", "7", "[0 - 4 - 7]")
+    assert row["MidNum"] == "[48, 64, 67]"
+    assert row["FER"] == "[50]"
+    silent = row_cells(4, started, 2.0, _snapshot(()), (None, 1, 0.0), 4, {})
+    assert (silent["Bar"], silent["Bass"], silent["MidNum"], silent["Photo"]) == ("-", "---", "[-]", "")
+    assert (silent["elec1"], silent["1.0"]) == ("-", "")
+
+
+EEG_SESSION = os.path.join(os.path.dirname(__file__), os.pardir, "uploads", "table_2025-09-29T17-25-25-453Z.json")
+
+
+@pytest.mark.skipif(not os.path.exists(EEG_SESSION), reason="no EEG session file")
+def test_eeg_cells_follow_the_corpus_columns():
+    recorded = next(r for r in RowReader(EEG_SESSION) if r["#"] == "3")
+    elec = [float(recorded[f"elec{i}"]) for i in range(1, 9)]
+    acc = [float(recorded[f"acc{i}"]) for i in range(1, 4)]
+    pipeline = EegPipeline(rate=250.0)
+    rng = np.random.default_rng(3)
+    pipeline.push(np.asarray(elec) + rng.normal(0.0, 50.0, (499, 8)), [acc] * 499)
+    pipeline.push(elec, acc)
+    features = pipeline.features(2.0)
+
+    spectrum = list(recorded)[list(recorded).index("8.0") + 1:]
+    row = row_cells(3, datetime.datetime(2025, 9, 29), 0.5, _snapshot(eeg=features), (1, 1, 0.0), 4,
+                    {name: recorded[name] for name in spectrum})
+    assert list(row) == list(recorded)
+    for name in [f"elec{i}" for i in range(1, 9)] + ["acc1", "acc2", "acc3"]:
+        assert row[name] == recorded[name]
+    for channel, columns in enumerate(BAND_COLUMNS):
+        for name in columns:
+            band = int(name.split(".")[1])
+            if band < len(BANDS):
+                assert float(row[name]) == pytest.approx(features.power[channel, band], rel=1e-3)
+            else:
+                assert row[name] == ""
+    assert row["4.5"] == "" and float(row["1.0"]) > 0
+
+
+def test_write_and_compact_round_trip(tmp_path):
+    path = str(tmp_path / "session.rowlog")
+    rows = [{"#": "1", "Photo": PHOTO, "Bar": "20"},
+            {"#": "2", "Photo": PHOTO, "Bar": "20"},
+            {"#": "3", "Photo": "", "Bar": "21"}]
+    recorder = RowRecorder(path, fsync_interval=0).start()
+    for cells in rows:
+        assert recorder.append(cells)
+    recorder.stop()
+
+    records = list(read_log(path))
+    assert [r["k"] for r in records] == ["meta", "photo", "row", "row", "row"]
+    assert records[2]["cells"]["Photo"].startswith("sha256:")
+    assert info(path)["rows"] == 3 and info(path)["photos"] == 1
+
+    output = str(tmp_path / "session.json")
+    assert compact(path, output) == 3
+    with open(output, encoding="utf-8") as f:
+        text = f.read()
+    assert json.loads(text) == {"rows": rows, "meta": None}
+    assert text == json.dumps({"rows": rows, "meta": None}, indent=2, ensure_ascii=False)
+
+
+def test_resume_drops_a_torn_tail(tmp_path):
+    path = str(tmp_path / "session.rowlog")
+    recorder = RowRecorder(path, fsync_interval=0).start()
+    recorder.append({"#": "1"})
+    recorder.stop()
+    with open(path, "ab") as f:
+        f.write(b"\x00\x00\x01\x00torn")
+    assert info(path)["torn_bytes"] == 8
+
+    recorder = RowRecorder(path, fsync_interval=0).start()
+    assert recorder.rows == 1
+    recorder.append({"#": "2"})
+    recorder.stop()
+    assert info(path)["torn_bytes"] == 0
+    assert [r["cells"]["#"] for r in read_log(path) if r["k"] == "row"] == ["1", "2"]
+    with open(path, "rb") as f:
+        assert f.read(len(MAGIC)) == MAGIC
+
+
+def test_write_error_marks_the_recorder_failed(tmp_path, monkeypatch):
+    def fsync(fd):
+        raise OSError(28, "No space left on device")
+    monkeypatch.setattr(rowlog.os, "fsync", fsync)
+    recorder = RowRecorder(str(tmp_path / "session.rowlog"), fsync_interval=0).start()
+    for _ in range(200):  # the meta record written at start already fails
+        if recorder.failed is not None:
+            break
+        time.sleep(0.01)
+    assert isinstance(recorder.failed, OSError)
+    assert recorder.append({"#": "1"}) is False
+    assert recorder.stats["write_errors"] == 1 and recorder.stats["dropped"] == 1
+    recorder.stop()
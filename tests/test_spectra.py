@@ -0,0 +1,74 @@
+import io
+
+import numpy as np
+import pytest
+
+from corpusdb.spectra import band_aggregate, bar_numbers, per_bar_mean, spectral_stats
+from corpusdb.store import CorpusStore, dump_json
+
+BINS = ["0.0–93.8 Hz", "93.8–187.5 Hz", "187.5–281.2 Hz", "281.2–375.0 Hz"]
+SPECTRA = [["1.00", "3.00", "0.00", "0.00"],
+           ["0.50", "0.50", "0.50", "0.50"],
+           ["", "", "", ""],
+           ["2.25", "-", "0.75", "0.00"]]
+BARS = ["20", "20", "21", "-"]
+
+
+def _session(tmp_path):
+    rows = []
+    for n, (bar, spectrum) in enumerate(zip(BARS, SPECTRA), 1):
+        row = {"#": str(n), "Bar": bar, "1.3": "", "1.0": "0.25" if n % 2 else ""}
+        row.update(zip(BINS, spectrum))
+        rows.append(row)
+    document = {"rows": rows, "meta": None}
+    store = CorpusStore(str(tmp_path / "store"))
+    return store.write_session("s", document), document
+
+
+def test_spectrum_and_block_columns_are_packed(tmp_path):
+    session, document = _session(tmp_path)
+    spectrum = session.matrix("spectrum")
+    assert spectrum.values.dtype == np.float32 and spectrum.values.shape == (4, 4)
+    assert spectrum.labels == BINS
+    assert spectrum.edges.tolist() == [[0.0, 93.8], [93.8, 187.5], [187.5, 281.2], [281.2, 375.0]]
+    assert spectrum.values[0].tolist() == [1.0, 3.0, 0.0, 0.0]
+    assert spectrum.valid()[3].tolist() == [True, False, True, True]
+    assert np.isnan(spectrum.values[2]).all()
+
+    column = session.column("93.8–187.5 Hz")
+    assert np.shares_memory(column.typed(), spectrum.values)  # a view, no copy
+    assert column.cell(3) == "-" and column.cell(0) == "3.00"
+
+    blocks = session.matrix("blocks")
+    assert blocks.labels == ["1.3", "1.0"] and blocks.edges is None
+    assert np.isnan(blocks.values[:, 0]).all() and blocks.values[:, 1][::2].tolist() == [0.25, 0.25]
+
+    out = io.StringIO()
+    dump_json(session.document(), out)
+    expected = io.StringIO()
+    dump_json(document, expected)
+    assert out.getvalue() == expected.getvalue()
+
+
+def test_per_bar_mean_skips_missing_cells(tmp_path):
+    session, _ = _session(tmp_path)
+    bars, means = per_bar_mean(session.matrix("spectrum").values, bar_numbers(session))
+    assert bars.tolist() == [20, 21]
+    assert means[0].tolist() == [0.75, 1.75, 0.25, 0.25]
+    assert np.isnan(means[1]).all()  # bar 21 has no numbers
+
+
+def test_band_aggregate_and_spectral_stats(tmp_path):
+    session, _ = _session(tmp_path)
+    spectrum = session.matrix("spectrum")
+    bands = band_aggregate(spectrum.values, spectrum.edges, {"low": (0.0, 187.5), "high": (187.5, 375.0)})
+    assert bands["low"][:2].tolist() == [4.0, 1.0] and bands["high"][:2].tolist() == [0.0, 1.0]
+    assert np.isnan(bands["low"][2]) and bands["low"][3] == 2.25  # the "-" bin counts as zero
+
+    stats = spectral_stats(spectrum.values, spectrum.edges)
+    centers = spectrum.edges.mean(axis=1)
+    assert stats["total"][0] == 4.0
+    assert stats["centroid"][0] == pytest.approx((centers[0] + 3 * centers[1]) / 4)
+    assert stats["peak"][0] == pytest.approx(centers[1])
+    assert stats["flatness"][1] == pytest.approx(1.0)
+    assert np.isnan(stats["centroid"][2]) and np.isnan(stats["total"][2])
@@ -0,0 +1,96 @@
+import asyncio
+import json
+
+import pytest
+
+from engine.state_protocol import StateChannel
+from engine.ws_sender import WebSocketSender
+
+
+def test_full_mode_sends_frames_as_is():
+    channel = StateChannel()
+    channel.snapshot_due = False
+    frames = [{"type": "updateState", "tempo": 78}]
+    assert [json.loads(p) for p in channel.encode(frames)] == frames
+
+
+def test_delta_mode_snapshot_then_changed_fields():
+    channel = StateChannel()
+    channel.encode([{"type": "updateState", "tempo": 78, "sMCapacity": [0, 4]}])
+    channel.configure("delta")
+    snapshot = json.loads(channel.encode([])[0])
+    assert snapshot["type"] == "stateSnapshot"
+    assert snapshot["state"] == {"tempo": 78, "sMCapacity": [0, 4]}
+
+    delta = json.loads(channel.encode([{"type": "updateState", "tempo": 78, "sMCapacity": [0, 4, 7]}])[0])
+    assert delta == {"type": "stateDelta", "v": StateChannel.VERSION, "seq": snapshot["seq"] + 1,
+                     "set": {"sMCapacity": [0, 4, 7]}}
+    assert channel.encode([{"type": "updateState", "tempo": 78}]) == []
+
+    channel.request_snapshot()
+    assert json.loads(channel.encode([])[0])["type"] == "stateSnapshot"
+
+
+def test_delta_mode_diffs_lists_mutated_in_place():
+    channel = StateChannel()
+    channel.configure("delta")
+    counts = [0] * 12
+    channel.encode([{"type": "updateState", "Total Count": counts}])
+    counts[4] = 1
+    delta = json.loads(channel.encode([{"type": "updateState", "Total Count": counts}])[0])
+    assert delta["set"] == {"Total Count": counts}
+
+
+def test_reset_goes_back_to_full_json_with_every_field():
+    channel = StateChannel()
+    channel.configure("delta")
+    channel.encode([{"type": "updateState", "tempo": 78}, {"type": "updateState", "bassNote": "C3"}])
+    channel.reset()
+    assert (channel.mode, channel.encoding) == ("full", "json")
+    first = channel.encode([{"type": "updateState", "tempo": 80}])
+    assert [json.loads(p) for p in first] == [{"type": "updateState", "tempo": 80, "bassNote": "C3"}]
+    assert [json.loads(p) for p in channel.encode([{"type": "updateState", "tempo": 81}])] == [
+        {"type": "updateState", "tempo": 81}]
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        StateChannel().configure("patch")
+
+
+def test_sender_restarts_each_connection_in_full_mode():
+    import websockets
+
+    received = []
+
+    async def run():
+        async def handler(conn):
+            message = json.loads(await conn.recv())
+            received.append(message)
+            if len(received) == 1:
+                await conn.send(json.dumps({"type": "stateProtocol", "mode": "delta"}))
+                received.append(json.loads(await conn.recv()))
+            await conn.close()
+
+        async with websockets.serve(handler, "127.0.0.1", 0) as server:
+            port = server.sockets[0].getsockname()[1]
+            sender = WebSocketSender(f"ws://127.0.0.1:{port}", retry_initial=0.05, state_rate=0)
+            sender.on_message = lambda message: sender.set_state_protocol(json.loads(message)["mode"])
+            sender.send_state({"type": "updateState", "tempo": 78})
+            sender.start()
+            try:
+                for _ in range(300):
+                    if len(received) >= 3:
+                        break
+                    if sender.connected:
+                        sender.send_state({"type": "updateState", "tempo": 78 + len(received)})
+                    await asyncio.sleep(0.01)
+            finally:
+                await sender.stop()
+
+    asyncio.run(run())
+    assert received[0] == {"type": "updateState", "tempo": 78}
+    assert received[1]["type"] == "stateSnapshot"
+    # Second connection: the page has not asked for deltas, so full JSON with every field.
+    assert received[2]["type"] == "updateState"
+    assert "tempo" in received[2]
@@ -0,0 +1,98 @@
+import base64
+import glob
+import io
+import json
+import os
+
+import numpy as np
+import pytest
+
+from corpusdb.blobs import BlobStore
+from corpusdb.store import CorpusStore, dump_json
+
+JPEG = b"\xff\xd8\xff\xe0 photo bytes \xff\xd9"
+PHOTO = "data:image/jpeg;base64," + base64.b64encode(JPEG).decode("ascii")
+ROWS = [
+    {"#": "1", "FER": "[50]", "Photo": PHOTO, "Tempo": "78", "ms": "1.15", "Bar": "20",
+     "MidNum": "[48, 64, 67]", "PitchClassSet": "[0 - 4 - 7]", "Bass": "0", "Note": "first"},
+    {"#": "2", "FER": "[-]", "Photo": PHOTO, "Tempo": "78.5", "ms": "2.30", "Bar": "-",
+     "MidNum": "[-]", "PitchClassSet": "[-]", "Bass": "---", "Note": "second"},
+    {"#": "3", "FER": "[36]", "Photo": "", "Tempo": "3.076923076923077", "ms": "3.45", "Bar": "21",
+     "MidNum": "[60]", "PitchClassSet": "[0]", "Bass": "0"},  # no Note: a second key order
+]
+
+
+def _write(path, document):
+    with open(path, "w", encoding="utf-8") as f:
+        dump_json(document, f)
+    return str(path)
+
+
+def _exported(store, name):
+    out = io.StringIO()
+    dump_json(store.open(name).document(), out)
+    return out.getvalue()
+
+
+def test_blob_store_writes_each_content_once(tmp_path):
+    blobs = BlobStore(str(tmp_path / "blobs"))
+    digest = blobs.put(JPEG)
+    assert blobs.put(JPEG) == digest
+    assert blobs.stats["written"] == 1 and blobs.stats["deduped"] == 1
+    assert digest.hex() in blobs and blobs.get(digest.hex()) == JPEG
+    assert blobs.path(digest.hex()) == os.path.join(str(tmp_path / "blobs"), digest.hex()[:2], digest.hex())
+
+
+def test_sessions_round_trip_with_photos_by_hash(tmp_path):
+    store = CorpusStore(str(tmp_path / "store"))
+    data = _write(tmp_path / "corpus_a.json", {"rows": ROWS, "meta": None})
+    upload = _write(tmp_path / "table_b.json", ROWS[:2])
+
+    session = store.import_json(data)
+    store.import_json(upload)
+    assert store.sessions() == ["corpus_a", "table_b"]
+    assert store.blobs.stats["written"] == 1  # one photo, four cells
+    for name, path in (("corpus_a", data), ("table_b", upload)):
+        with open(path, encoding="utf-8") as f:
+            assert _exported(store, name) == f.read()
+
+    assert len(session) == 3
+    assert session.photo(0) == JPEG and session.photo(2) is None
+    tempo = session.column("Tempo")
+    assert tempo.typed().dtype == np.float64 and tempo.typed()[1] == 78.5
+    assert session.column("MidNum").items(0).tolist() == [48, 64, 67]
+    assert session.column("Bar").valid().tolist() == [True, False, True]
+    assert session.row(2) == ROWS[2]
+    assert session.row(0, keys={"#", "Note"}) == {"#": "1", "Note": "first"}
+
+    store.export_json("corpus_a", str(tmp_path / "out.json"))
+    with open(tmp_path / "out.json", encoding="utf-8") as f:
+        assert json.load(f) == {"rows": ROWS, "meta": None}
+
+
+def test_reimport_replaces_the_session(tmp_path):
+    store = CorpusStore(str(tmp_path / "store"))
+    path = _write(tmp_path / "corpus_a.json", {"rows": ROWS, "meta": None})
+    store.import_json(path)
+    _write(path, {"rows": ROWS[2:], "meta": {"note": "edited"}})
+    assert len(store.import_json(path)) == 1
+    assert store.open("corpus_a").document() == {"rows": ROWS[2:], "meta": {"note": "edited"}}
+    assert not [n for n in os.listdir(store.sessions_dir) if n.startswith(".") or ".old-" in n]
+
+
+def test_not_a_session(tmp_path):
+    store = CorpusStore(str(tmp_path / "store"))
+    with pytest.raises(ValueError):
+        store.import_json(_write(tmp_path / "settings.json", {"threshold": 3}))
+
+
+SESSIONS = sorted(glob.glob(os.path.join(os.path.dirname(__file__), os.pardir, "data", "corpus_*.json")),
+                  key=os.path.getsize)
+
+
+@pytest.mark.skipif(not SESSIONS, reason="no session files")
+def test_a_recorded_session_round_trips_byte_for_byte(tmp_path):
+    store = CorpusStore(str(tmp_path / "store"))
+    name = store.import_json(SESSIONS[0]).name
+    with open(SESSIONS[0], encoding="utf-8") as f:
+        assert _exported(store, name) == f.read()
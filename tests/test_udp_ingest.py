@@ -0,0 +1,53 @@
+import pytest
+
+from engine.udp_ingest import INT_BAR, MIDI, TEXT_BAR, UNKNOWN, UdpIngest, osc_int_argument
+
+
+def _ingest():
+    events = []
+    ingest = UdpIngest("127.0.0.1", 0,
+                       on_note_on=lambda note, velocity, channel: events.append(("note", note, velocity)),
+                       on_text_bar=lambda bar, raw: events.append(("text", bar)),
+                       on_int_bar=lambda value: events.append(("int", value)))
+    return ingest, events
+
+
+@pytest.mark.parametrize("packet, kind, event", [
+    (b"/bar 12", TEXT_BAR, ("text", 12)),
+    (b"1. 1. 1", TEXT_BAR, ("text", 1)),
+    (b"bar 7\n", TEXT_BAR, ("text", 7)),
+    (b"\x00\x00\x00\x07", INT_BAR, ("int", 7)),
+    (b"\xff\xff\xfc\x19", INT_BAR, ("int", -999)),
+    (b"/bar\x00\x00\x00\x00,i\x00\x00\x00\x00\x00\x0c", INT_BAR, ("int", 12)),
+    (b"/b\x00\x00,i\x00\x00\x00\x00\x00\x31", INT_BAR, ("int", 49)),  # arg byte is ASCII "1"
+    (b"abcd\x00\x00\x00\x05", INT_BAR, ("int", 5)),  # printable, no number: last 4 bytes
+    (b"\x90\x3c\x40", MIDI, ("note", 60, 64)),
+])
+def test_packet_classes(packet, kind, event):
+    ingest, events = _ingest()
+    # The socket path hands over views into the receive buffer.
+    assert ingest.handle_packet(memoryview(bytearray(packet))) == kind
+    assert events == [event]
+
+
+def test_short_and_empty_packets_are_dropped():
+    ingest, events = _ingest()
+    assert ingest.handle_packet(b"") == UNKNOWN
+    assert ingest.handle_packet(b"ab") == UNKNOWN
+    assert events == []
+    assert ingest.drop_count() == 2
+
+
+def test_midi_note_off_and_invalid_events():
+    ingest, events = _ingest()
+    ingest.handle_packet(b"\x90\x3c\x00\x80\x3c\x40\x91\x80\x10")
+    assert events == []
+    assert ingest.stats["midi_events"] == 2
+    assert ingest.stats["midi_invalid"] == 1
+
+
+def test_osc_int_argument():
+    assert osc_int_argument(b"/bar\x00\x00\x00\x00,i\x00\x00\xff\xff\xff\xfe") == -2
+    assert osc_int_argument(b"/bar\x00\x00\x00\x00,f\x00\x00\x3f\x80\x00\x00") is None
+    assert osc_int_argument(b"/bar\x00\x00\x00\x00,i\x00\x00\x00") is None
+    assert osc_int_argument(b"/bar 12") is None
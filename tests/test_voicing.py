@@ -0,0 +1,40 @@
+import random
+
+from engine.pitchclass import pitch_class_mask
+from engine.voicing import VoicingTracker
+
+
+def _note_sets(n=500, seed=7):
+    rng = random.Random(seed)
+    return [rng.sample(range(21, 109), rng.randint(0, 8)) for _ in range(n)]
+
+
+# --- the list-based code the tracker replaced (base.py) -----------------------
+
+def _old_bass_up(midi_notes):
+    sorted_notes = sorted(midi_notes)
+    return sorted(set(n % 12 for n in sorted_notes),
+                  key=lambda x: sorted_notes.index(min(n for n in sorted_notes if n % 12 == x)))
+
+
+def test_voicing_matches_sorted_lists():
+    for notes in _note_sets():
+        tracker = VoicingTracker()
+        for note in notes:
+            tracker.add(note)
+        assert list(tracker) == notes  # insertion order, like midi_notes
+        assert tracker.ascending() == sorted(notes)
+        assert tracker.bass == (min(notes) if notes else None)
+        assert tracker.soprano == (max(notes) if notes else None)
+        assert tracker.pitch_classes_bass_up() == _old_bass_up(notes)
+        assert tracker.pc_mask == pitch_class_mask(notes)
+        if notes:
+            tracker.discard(notes[0])
+            assert tracker.ascending() == sorted(notes[1:])
+            assert tracker.pitch_classes_bass_up() == _old_bass_up(notes[1:])
+
+
+def test_voicing_from_mask():
+    notes = [67, 48, 64]
+    mask = sum(1 << n for n in notes)
+    assert VoicingTracker.from_mask(mask).ascending() == [48, 64, 67]
@@ -0,0 +1,68 @@
+import json
+
+import pytest
+
+from engine.metrics import Metrics
+from engine.ws_dispatch import MessageDispatcher, peek_type
+
+
+@pytest.mark.parametrize("frame, expected", [
+    ('{"type":"barReset"}', "barReset"),
+    (' { "type" : "eeg_sample", "eeg": [1, 2]}', "eeg_sample"),
+    (b'{"type":"eeg_sample","eeg":[1]}', "eeg_sample"),
+    ('{"value": 1, "type": "updateTempo"}', None),  # type not first
+    ('{"type":"bad\\"type"}', None),
+    ("not json", None),
+])
+def test_peek_type(frame, expected):
+    assert peek_type(frame) == expected
+
+
+def _dispatcher():
+    calls = []
+    d = MessageDispatcher(metrics=Metrics())
+    d.register("updateTempo", lambda data: calls.append(("tempo", data["value"])), mark=True)
+    d.register("raw", lambda frame: calls.append(("raw", frame)), parse=False)
+    d.register("broken", lambda data: 1 / 0)
+    d.drop("eeg_sample")
+    return d, calls
+
+
+def _count(d, name, msg_type):
+    return d.metrics.counters[(name, (("type", msg_type),))]
+
+
+def test_routes_by_type():
+    d, calls = _dispatcher()
+    d.dispatch('{"type": "updateTempo", "value": 90}')
+    d.dispatch('{"value": 91, "type": "updateTempo"}')  # no prefix: full parse
+    d.dispatch('{"type": "raw", "x": [1, 2]}')
+    assert calls == [("tempo", 90), ("tempo", 91), ("raw", '{"type": "raw", "x": [1, 2]}')]
+    assert _count(d, "engine_ws_messages_total", "updateTempo") == 2
+    assert [name for _, _, name in d.metrics.events] == ["updateTempo", "updateTempo"]
+
+
+def test_dropped_types_are_not_parsed(monkeypatch):
+    d, calls = _dispatcher()
+    parsed = []
+    loads = json.loads
+    monkeypatch.setattr(json, "loads", lambda s: parsed.append(s) or loads(s))
+    d.dispatch('{"type":"eeg_sample","eeg":[' + ",".join(["1.5"] * 8) + ']}')
+    assert parsed == [] and calls == []
+    assert _count(d, "engine_ws_dropped_total", "eeg_sample") == 1
+    # A dropped type behind an unreadable prefix is still dropped after the parse.
+    d.dispatch('{"eeg": [1], "type": "eeg_sample"}')
+    assert _count(d, "engine_ws_dropped_total", "eeg_sample") == 2
+
+
+def test_invalid_unknown_and_failing_frames():
+    d, calls = _dispatcher()
+    d.dispatch("not json")
+    d.dispatch("[1, 2]")
+    d.dispatch('{"type": "nobodyHandlesThis"}')
+    d.dispatch('{"type": "broken"}')  # logged, does not raise
+    d.dispatch('{"type": "updateTempo", "value": 60}')
+    assert calls == [("tempo", 60)]
+    assert _count(d, "engine_ws_dropped_total", "invalid") == 2
+    assert _count(d, "engine_ws_messages_total", "unknown") == 1
+    assert _count(d, "engine_ws_messages_total", "broken") == 1
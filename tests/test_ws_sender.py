@@ -0,0 +1,51 @@
+import asyncio
+import time
+
+from engine.ws_sender import WebSocketSender
+
+
+class _Timer:
+    def __init__(self):
+        self.flushes = []
+
+    def flushed(self, received, built, flushed, encoded, sent):
+        self.flushes.append((received, sent))
+
+
+def test_offline_stamps_do_not_reach_the_latency_histogram():
+    import websockets
+
+    timer = _Timer()
+
+    async def run():
+        frames = []
+
+        async def handler(conn):
+            async for message in conn:
+                frames.append(message)
+
+        async with websockets.serve(handler, "127.0.0.1", 0) as server:
+            port = server.sockets[0].getsockname()[1]
+            sender = WebSocketSender(f"ws://127.0.0.1:{port}", state_rate=0, timer=timer)
+            # An input handled while no client is connected, long before the connect.
+            sender.send_state({"type": "updateState", "tempo": 78}, received=time.perf_counter() - 60)
+            sender.start()
+            try:
+                for _ in range(200):
+                    if sender.connected and not sender._state:
+                        break
+                    await asyncio.sleep(0.01)
+                connected = time.perf_counter()
+                sender.send_state({"type": "updateState", "tempo": 79}, received=connected)
+                for _ in range(200):
+                    if timer.flushes:
+                        break
+                    await asyncio.sleep(0.01)
+            finally:
+                await sender.stop()
+        return frames
+
+    frames = asyncio.run(run())
+    assert len(frames) == 2
+    assert timer.flushes
+    assert all(sent - received < 5 for received, sent in timer.flushes)
@@ -0,0 +1,71 @@
+import base64
+import hashlib
+import json
+import os
+import zipfile
+
+import pytest
+
+pytest.importorskip("xlsxwriter")
+openpyxl = pytest.importorskip("openpyxl")
+
+from corpusdb.xlsx import export_files, export_xlsx  # noqa: E402
+
+# 1 x 1 PNG
+PNG = base64.b64decode("iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mP8z8BQDwAEhQGAhKmMIQAAAABJRU5ErkJggg==")
+PHOTO = "data:image/png;base64," + base64.b64encode(PNG).decode("ascii")
+ROWS = [
+    {"#": "1", "FER": "[50]", "Photo": PHOTO, "Tempo": "78", "MidNum": "[48, 64, 67]", "0.0–93.8 Hz": ""},
+    {"#": "2", "FER": "[-]", "Photo": PHOTO, "Tempo": "78.50", "MidNum": "[-]", "0.0–93.8 Hz": "0.25"},
+    {"#": "3", "FER": "[36]", "Photo": "", "Tempo": "80", "MidNum": "[60]", "0.0–93.8 Hz": ""},
+]
+
+
+def _session(tmp_path, rows=ROWS):
+    path = tmp_path / "corpus_a.json"
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"rows": rows, "meta": None}, f, indent=2)
+    return str(path)
+
+
+def _cells(output):
+    sheet = openpyxl.load_workbook(output, read_only=True)["Data"]
+    return [list(row) for row in sheet.iter_rows(values_only=True)]
+
+
+def test_cells_keep_their_text_and_photos_are_embedded(tmp_path):
+    output = str(tmp_path / "a.xlsx")
+    assert export_xlsx(_session(tmp_path), output) == 3
+    cells = _cells(output)
+    assert cells[0] == ["#", "FER", "Photo", "Tempo", "MidNum", "0.0–93.8 Hz"]
+    assert cells[1] == ["1", "[50]", None, "78", "[48, 64, 67]", None]
+    assert cells[2] == ["2", "[-]", None, "78.50", "[-]", "0.25"]
+    assert cells[3] == ["3", "[36]", None, "80", "[60]", None]
+    with zipfile.ZipFile(output) as z:
+        drawings = [n for n in z.namelist() if n.startswith("xl/drawings/drawing")]
+        assert z.read(drawings[0]).count(b"<xdr:pic>") == 2
+        assert [n for n in z.namelist() if n.startswith("xl/media/")]
+
+
+def test_photos_as_links_or_left_out(tmp_path):
+    path = _session(tmp_path)
+    linked = str(tmp_path / "linked.xlsx")
+    export_xlsx(path, linked, photos="link")
+    photo = f"{hashlib.sha256(PNG).hexdigest()}.png"
+    assert os.listdir(tmp_path / "linked_photos") == [photo]
+    sheet = openpyxl.load_workbook(linked)["Data"]
+    assert sheet["C2"].value == photo and sheet["C2"].hyperlink.target.replace("\\", "/") == f"linked_photos/{photo}"
+    assert sheet["C4"].value is None
+
+    omitted = str(tmp_path / "omitted.xlsx")
+    export_xlsx(path, omitted, photos="omit")
+    assert _cells(omitted)[0] == ["#", "FER", "Tempo", "MidNum", "0.0–93.8 Hz"]
+
+
+def test_export_files_counts_failures(tmp_path, capsys):
+    settings = tmp_path / "settings.json"
+    settings.write_text('{"threshold": 3}', encoding="utf-8")
+    out = tmp_path / "exports"
+    assert export_files([_session(tmp_path), str(settings)], str(out), jobs=1) == 1
+    assert os.listdir(out) == ["corpus_a.xlsx"]
+    assert "skip   " + str(settings) in capsys.readouterr().out